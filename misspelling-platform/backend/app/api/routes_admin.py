@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from ..profiling import ProfiledRoute
+from ..serialization import FastJSONResponse
+from ..services.profiling_service import get_request_profile_payload_async, list_profile_records_payload_async
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get("/api/admin/profiles")
+async def list_profiles(limit: int = 50, kind: str | None = None):
+    return await list_profile_records_payload_async(limit, kind)
+
+
+@router.get("/api/admin/profiles/{profile_id}", response_class=FastJSONResponse)
+async def get_request_profile(profile_id: int):
+    return FastJSONResponse(await get_request_profile_payload_async(profile_id))
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Response
+
+from ..metrics import render_latest
+from ..profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
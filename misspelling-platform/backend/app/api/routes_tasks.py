@@ -1,52 +1,98 @@
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
-
-from ..db.core import check_db
+from datetime import datetime
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, StreamingResponse
+
+from ..db.core import check_db_async
+from ..profiling import ProfiledRoute
+from ..serialization import FastJSONResponse
+from ..services.admission_service import admit_task
+from ..services.artifact_service import load_artifact_download
+from ..services.cancellation_service import cancel_task
+from ..services.retention_service import restore_task
 from ..services.task_service import (
     build_output_path,
     create_simulation_task,
     create_word_analysis_task,
-    get_task_payload,
-    list_task_payload,
+    get_task_payload_async,
+    list_task_payload_async,
 )
-from ..services.task_event_service import list_task_events_payload
+from ..services.task_event_service import list_task_events_payload_async
 from ..tasks import demo_analysis, simulation_run
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/health")
-def health():
-    return {"status": "ok", "db": check_db()}
+async def health():
+    return {"status": "ok", "db": await check_db_async()}
+
+
+def _client_ip(request: Request) -> str | None:
+    # the socket peer, not X-Forwarded-For: forwarding headers are set by the client
+    return request.client.host if request.client else None
+
+
+def _rejection_response(rejection: dict) -> FastJSONResponse:
+    status_code = rejection.pop("status_code")
+    headers = {"Retry-After": str(rejection["retry_after"])} if "retry_after" in rejection else None
+    return FastJSONResponse(rejection, status_code=status_code, headers=headers)
 
 
 @router.post("/api/tasks/word-analysis")
-def create_task(word: str):
-    return create_word_analysis_task(word, demo_analysis)
+def create_task(request: Request, word: str, profile: bool = False):
+    rejection = admit_task(_client_ip(request), "word-analysis", {"word": word})
+    if rejection is not None:
+        return _rejection_response(rejection)
+    return create_word_analysis_task(word, demo_analysis, profile)
+
+
+@router.get("/api/tasks/{task_id}", response_class=FastJSONResponse)
+async def get_task(task_id: str):
+    return FastJSONResponse(await get_task_payload_async(task_id, demo_analysis.AsyncResult))
+
+
+@router.get("/api/tasks/{task_id}/events", response_class=FastJSONResponse)
+async def get_task_events(
+    task_id: str, limit: int = 200, since: datetime | None = None, until: datetime | None = None
+):
+    return FastJSONResponse(await list_task_events_payload_async(task_id, limit, since, until))
 
 
-@router.get("/api/tasks/{task_id}")
-def get_task(task_id: str):
-    return get_task_payload(task_id, demo_analysis.AsyncResult)
+@router.get("/api/tasks", response_class=FastJSONResponse)
+async def list_tasks(limit: int = 20):
+    return FastJSONResponse(await list_task_payload_async(limit))
 
 
-@router.get("/api/tasks/{task_id}/events")
-def get_task_events(task_id: str, limit: int = 200):
-    return list_task_events_payload(task_id, limit)
+@router.post("/api/tasks/{task_id}/cancel")
+def cancel_running_task(task_id: str):
+    return cancel_task(task_id)
 
 
-@router.get("/api/tasks")
-def list_tasks(limit: int = 20):
-    return list_task_payload(limit)
+@router.post("/api/tasks/{task_id}/restore")
+def restore_archived_task(task_id: str):
+    return restore_task(task_id)
 
 
 @router.post("/api/tasks/simulation-run")
-def create_sim_task(n: int = 30, steps: int = 50):
-    return create_simulation_task(n, steps, simulation_run)
+def create_sim_task(request: Request, n: int = 30, steps: int = 50, profile: bool = False):
+    rejection = admit_task(_client_ip(request), "simulation-run", {"n": n, "steps": steps})
+    if rejection is not None:
+        return _rejection_response(rejection)
+    return create_simulation_task(n, steps, simulation_run, profile)
 
 
 @router.get("/api/files/{task_id}/{filename}")
 def download_file(task_id: str, filename: str):
+    artifact = load_artifact_download(task_id, filename)
+    if artifact is not None:
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+        if artifact["sha256"]:
+            headers["ETag"] = f'"{artifact["sha256"]}"'
+        if artifact["size"] is not None:
+            headers["Content-Length"] = str(artifact["size"])
+        return StreamingResponse(artifact["chunks"], media_type=artifact["content_type"], headers=headers)
+    # files written before the artifact store, or never registered as artifacts
     p = build_output_path(task_id, filename)
     if not p.exists():
         return {"error": "file not found"}
@@ -1,15 +1,38 @@
-from fastapi import APIRouter
+from datetime import date
 
-from ..services.timeseries_service import get_task_timeseries_points, get_task_timeseries_summary
+from fastapi import APIRouter, Query
 
-router = APIRouter()
+from ..profiling import ProfiledRoute
+from ..serialization import FastJSONResponse
+from ..services.similarity_service import find_similar_series
+from ..services.timeseries_service import get_task_timeseries_points_async, get_task_timeseries_summary_async
 
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.get("/api/time-series/{task_id}")
-def get_time_series(task_id: str):
-    return get_task_timeseries_summary(task_id)
+GRANULARITY_PATTERN = "^(day|week|month|year)$"
 
 
-@router.get("/api/time-series/{task_id}/points")
-def get_time_series_points(task_id: str, variant: str = "correct"):
-    return get_task_timeseries_points(task_id, variant)
+@router.get("/api/time-series/{task_id}", response_class=FastJSONResponse)
+async def get_time_series(task_id: str, granularity: str = Query("day", pattern=GRANULARITY_PATTERN)):
+    return FastJSONResponse(await get_task_timeseries_summary_async(task_id, granularity))
+
+
+@router.get("/api/time-series/{task_id}/points", response_class=FastJSONResponse)
+async def get_time_series_points(
+    task_id: str,
+    variant: str = "correct",
+    granularity: str = Query("day", pattern=GRANULARITY_PATTERN),
+    start: date | None = None,
+    end: date | None = None,
+):
+    return FastJSONResponse(await get_task_timeseries_points_async(task_id, variant, granularity, start, end))
+
+
+# numpy scoring over the vector index is CPU-bound, so this one stays on the threadpool
+@router.get("/api/time-series/{task_id}/similar")
+def get_similar_time_series(
+    task_id: str,
+    variant: str = "misspelling_ratio",
+    k: int = 10,
+):
+    return find_similar_series(task_id, variant, k)
@@ -0,0 +1,194 @@
+"""Content-addressed blob store for task artifacts.
+
+A blob's key is derived from the SHA-256 of its uncompressed bytes, so identical outputs from
+different tasks (the same simulation parameters, an unchanged profile) are stored once and only
+``task_artifacts`` rows multiply. Compressible content types are stored as zstd frames::
+
+    blobs/<sha[:2]>/<sha[2:4]>/<sha>        stored as-is (PNG and other already-compressed kinds)
+    blobs/<sha[:2]>/<sha[2:4]>/<sha>.zst    zstd-compressed (CSV, JSON, text)
+
+``ARTIFACT_STORE`` selects the backend: ``local`` (a directory, ``ARTIFACT_STORE_ROOT``) or ``s3``
+(any S3-compatible service; point ``ARTIFACT_S3_ENDPOINT_URL`` at MinIO to run it locally).
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+import zstandard
+
+ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "local")
+# outside the /app/outputs tree, which /api/files serves and cleanup removes per task
+ARTIFACT_STORE_ROOT = Path(os.getenv("ARTIFACT_STORE_ROOT", "/app/artifacts"))
+ARTIFACT_ZSTD_LEVEL = int(os.getenv("ARTIFACT_ZSTD_LEVEL", "6"))
+ARTIFACT_S3_BUCKET = os.getenv("ARTIFACT_S3_BUCKET", "artifacts")
+ARTIFACT_S3_PREFIX = os.getenv("ARTIFACT_S3_PREFIX", "")
+ARTIFACT_S3_ENDPOINT_URL = os.getenv("ARTIFACT_S3_ENDPOINT_URL") or None
+ARTIFACT_S3_REGION = os.getenv("ARTIFACT_S3_REGION", "us-east-1")
+
+ZSTD_CODEC = "zstd"
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "image/svg+xml")
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    base = content_type.split(";", 1)[0].strip().lower()
+    return base.startswith("text/") or base in COMPRESSIBLE_TYPES
+
+
+def blob_key(sha256: str, codec: str | None) -> str:
+    suffix = ".zst" if codec == ZSTD_CODEC else ""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+
+def encode_blob(data: bytes, content_type: str | None) -> tuple[str, str | None, bytes]:
+    """``(sha256, codec, stored bytes)`` for ``data``; the codec depends only on the content type.
+
+    Deciding per type rather than per payload keeps the key a pure function of content and type,
+    so every task that writes the same bytes lands on the same blob.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    if is_compressible(content_type):
+        stored = zstandard.ZstdCompressor(level=ARTIFACT_ZSTD_LEVEL).compress(data)
+        return sha256, ZSTD_CODEC, stored
+    return sha256, None, data
+
+
+def decode_stream(stream: BinaryIO, codec: str | None) -> BinaryIO:
+    """Wrap an open blob so reads return the original bytes; closing it closes ``stream``."""
+    if codec == ZSTD_CODEC:
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return stream
+
+
+class LocalArtifactStore:
+    """Blobs as files under ``root``; writes go through a temp file so readers never see a partial blob."""
+
+    name = "local"
+
+    def __init__(self, root: Path = ARTIFACT_STORE_ROOT):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def put(self, key: str, data: bytes) -> bool:
+        """Store ``data`` under ``key``; ``False`` if the blob was already there."""
+        path = self._path(key)
+        if path.is_file():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return True
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def open(self, key: str) -> BinaryIO | None:
+        try:
+            return self._path(key).open("rb")
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+
+class S3ArtifactStore:
+    """Blobs as objects in an S3-compatible bucket (AWS S3, MinIO, ...); needs ``boto3``.
+
+    Credentials come from the usual ``AWS_*`` environment variables or instance profile.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str = ARTIFACT_S3_BUCKET,
+        prefix: str = ARTIFACT_S3_PREFIX,
+        endpoint_url: str | None = ARTIFACT_S3_ENDPOINT_URL,
+        region: str = ARTIFACT_S3_REGION,
+        client=None,
+    ):
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _missing(self, exc) -> bool:
+        code = str(exc.response.get("Error", {}).get("Code", ""))
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except ClientError as exc:
+            if self._missing(exc):
+                return False
+            raise
+
+    def put(self, key: str, data: bytes) -> bool:
+        if self.exists(key):
+            return False
+        # objects hold the stored (possibly compressed) bytes; the artifact's content type lives in the DB
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+        return True
+
+    def get(self, key: str) -> bytes | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as exc:
+            if self._missing(exc):
+                return None
+            raise
+
+    def open(self, key: str) -> BinaryIO | None:
+        """The object body as a stream; nothing is read until the caller reads it."""
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except ClientError as exc:
+            if self._missing(exc):
+                return None
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+
+_store = None
+
+
+def get_artifact_store():
+    """Process-wide store for ``ARTIFACT_STORE`` (created on first use)."""
+    global _store
+    if _store is None:
+        if ARTIFACT_STORE == "s3":
+            _store = S3ArtifactStore()
+        elif ARTIFACT_STORE == "local":
+            _store = LocalArtifactStore()
+        else:
+            raise ValueError(f"unknown ARTIFACT_STORE: {ARTIFACT_STORE}")
+    return _store
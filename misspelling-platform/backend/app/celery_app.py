@@ -1,10 +1,13 @@
 import os
 from celery import Celery
 
+from .embedded import EMBEDDED_MODE
+
 celery_app = Celery(
     "misspelling_platform",
-    broker=os.getenv("CELERY_BROKER_URL"),
-    backend=os.getenv("CELERY_RESULT_BACKEND"),
+    # embedded mode runs tasks through Task.apply; the in-memory transports keep Celery from dialing out
+    broker=os.getenv("CELERY_BROKER_URL") or ("memory://" if EMBEDDED_MODE else None),
+    backend=os.getenv("CELERY_RESULT_BACKEND") or ("cache+memory://" if EMBEDDED_MODE else None),
     include=["app.tasks"],  # 关键：显式加载任务模块
 )
 
@@ -12,4 +15,27 @@ celery_app.conf.update(
     task_track_started=True,
     result_expires=3600,
     broker_connection_retry_on_startup=True,
+    task_always_eager=os.getenv("CELERY_TASK_ALWAYS_EAGER", "") == "1",
+    beat_schedule={
+        "ingest-data-sources": {
+            "task": "app.tasks.ingest_data_sources",
+            "schedule": float(os.getenv("INGEST_INTERVAL_SECONDS", "3600")),
+        },
+        "refresh-similarity-index": {
+            "task": "app.tasks.refresh_similarity_vectors",
+            "schedule": float(os.getenv("SIMILARITY_REFRESH_SECONDS", "300")),
+        },
+        "apply-retention-policies": {
+            "task": "app.tasks.apply_retention_policies",
+            "schedule": float(os.getenv("RETENTION_INTERVAL_SECONDS", "86400")),
+        },
+        "maintain-partitions": {
+            "task": "app.tasks.maintain_table_partitions",
+            "schedule": float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "86400")),
+        },
+        "reap-overdue-tasks": {
+            "task": "app.tasks.reap_overdue_task_runs",
+            "schedule": float(os.getenv("TASK_REAPER_SECONDS", "60")),
+        },
+    },
 )
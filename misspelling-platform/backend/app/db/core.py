@@ -1,22 +1,274 @@
 import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date, datetime
+from pathlib import Path
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..embedded import EMBEDDED_DB_PATH, EMBEDDED_MODE
+from ..metrics import DB_POOL_CHECKOUT_SECONDS
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
-engine = create_engine(DATABASE_URL or "sqlite+pysqlite:///:memory:", pool_pre_ping=True)
+# optional replica for read-only repo calls; unset means reads go to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+MEMORY_URL = "sqlite+pysqlite:///:memory:"
+# SQLite counterpart of db/init/001_schema.sql, applied by init_embedded_db()
+EMBEDDED_SCHEMA = Path(__file__).with_name("embedded_schema.sql")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async-engine counterpart of :class:`TimedQueuePool`."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _is_sqlite_file(url) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _register_sqlite_types() -> None:
+    # DATE/TIMESTAMP columns come back as date/datetime, as they do from MySQL, so services need no
+    # per-backend parsing; aggregates (MIN(t)) carry no declared type and stay ISO text
+    sqlite3.register_adapter(date, date.isoformat)
+    sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+    sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+    sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+def engine_options(url, poolclass) -> dict:
+    """Pool settings from ``DB_POOL_*``; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    parsed = make_url(url)
+    options: dict = {"pool_pre_ping": True}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    if _is_sqlite_file(url):
+        _register_sqlite_types()
+        options["connect_args"] = {"detect_types": sqlite3.PARSE_DECLTYPES}
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def async_database_url(url: str):
+    """Same database as ``url`` through an asyncio driver (aiomysql / aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "mysql":
+        return parsed.set(drivername="mysql+aiomysql")
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite")
+    return parsed
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers run alongside the single writer; NORMAL fsyncs at checkpoints only
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def install_sqlite_pragmas(sync_engine: Engine, immediate: bool = False) -> None:
+    """Per-connection SQLite settings; ``immediate`` takes the write lock at BEGIN.
+
+    Write transactions that read first (get-or-create, select-then-delete) would otherwise fail with
+    SQLITE_BUSY when another writer commits in between, instead of waiting on ``busy_timeout``.
+    """
+    event.listen(sync_engine, "connect", _sqlite_pragmas)
+    if not immediate:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _autocommit_driver(dbapi_connection, connection_record):
+        # pysqlite's own implicit BEGIN is replaced by the one below
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sync_engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+_primary_url = DATABASE_URL or (f"sqlite+pysqlite:///{EMBEDDED_DB_PATH}" if EMBEDDED_MODE else MEMORY_URL)
+engine = create_engine(_primary_url, **engine_options(_primary_url, TimedQueuePool))
+if _is_sqlite_file(_primary_url):
+    # engines connect lazily, so the directory only has to exist before the first query
+    Path(make_url(_primary_url).database).parent.mkdir(parents=True, exist_ok=True)
+    install_sqlite_pragmas(engine, immediate=True)
+read_engine = (
+    create_engine(DATABASE_READ_URL, **engine_options(DATABASE_READ_URL, TimedQueuePool))
+    if DATABASE_READ_URL
+    else engine
+)
+
+_async_engines: dict[str, AsyncEngine] = {}
+_replica_down_until = 0.0
+_health = {"ok": False, "checked_at": None}
 
 
 def get_engine() -> Engine:
     return engine
 
 
+def get_read_engine() -> Engine:
+    return read_engine
+
+
+def _get_async(role: str, url: str) -> AsyncEngine:
+    if role not in _async_engines:
+        async_url = async_database_url(url)
+        _async_engines[role] = create_async_engine(async_url, **engine_options(async_url, TimedAsyncQueuePool))
+        if _is_sqlite_file(async_url):
+            # async callers only read, so they keep deferred transactions and never wait on the writer
+            install_sqlite_pragmas(_async_engines[role].sync_engine)
+    return _async_engines[role]
+
+
+def get_async_engine() -> AsyncEngine:
+    """Engine for ``async def`` routes; created on first use so workers never load the async driver."""
+    return _get_async("primary", _primary_url)
+
+
+def get_async_read_engine() -> AsyncEngine:
+    if not DATABASE_READ_URL:
+        return get_async_engine()
+    return _get_async("read", DATABASE_READ_URL)
+
+
+def _replica_available() -> bool:
+    return bool(DATABASE_READ_URL) and time.monotonic() >= _replica_down_until
+
+
+def _mark_replica_down() -> None:
+    global _replica_down_until
+    _replica_down_until = time.monotonic() + DB_REPLICA_RETRY_SECONDS
+
+
+@contextmanager
+def read_connection():
+    """Connection for read-only repo calls: the replica while it is reachable, otherwise the primary.
+
+    A failed replica connect sends reads to the primary for ``DB_REPLICA_RETRY_SECONDS``.
+    """
+    conn = None
+    if _replica_available():
+        try:
+            conn = read_engine.connect()
+        except DBAPIError:
+            _mark_replica_down()
+    if conn is None:
+        conn = engine.connect()
+    with conn:
+        yield conn
+
+
+@asynccontextmanager
+async def async_read_connection():
+    conn = None
+    if _replica_available():
+        try:
+            conn = await get_async_read_engine().connect()
+        except DBAPIError:
+            _mark_replica_down()
+    if conn is None:
+        conn = await get_async_engine().connect()
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+def _cached_health():
+    checked_at = _health["checked_at"]
+    if checked_at is not None and time.monotonic() - checked_at < HEALTH_CACHE_SECONDS:
+        return _health["ok"]
+    return None
+
+
+def _store_health(ok: bool) -> bool:
+    _health.update(ok=ok, checked_at=time.monotonic())
+    return ok
+
+
 def check_db() -> bool:
-    if not DATABASE_URL:
+    if not (DATABASE_URL or EMBEDDED_MODE):
         return False
+    cached = _cached_health()
+    if cached is not None:
+        return cached
     try:
         with get_engine().connect() as conn:
             conn.execute(text("SELECT 1"))
-        return True
+        return _store_health(True)
     except Exception:
+        return _store_health(False)
+
+
+def init_embedded_db() -> bool:
+    """Create the SQLite schema on the primary database (idempotent); ``False`` for other backends."""
+    if engine.dialect.name != "sqlite":
+        return False
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.executescript(EMBEDDED_SCHEMA.read_text(encoding="utf-8"))
+        raw.commit()
+    finally:
+        raw.close()
+    return True
+
+
+async def dispose_async_engine() -> None:
+    # closes pooled connections; the engines themselves stay usable and keep their event listeners
+    for async_engine in _async_engines.values():
+        await async_engine.dispose()
+
+
+async def check_db_async() -> bool:
+    if not (DATABASE_URL or EMBEDDED_MODE):
         return False
+    cached = _cached_health()
+    if cached is not None:
+        return cached
+    try:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return _store_health(True)
+    except Exception:
+        return _store_health(False)
@@ -2,22 +2,49 @@ import json
 
 from sqlalchemy import text
 
+from ..metrics import timed_repo
 from .core import get_engine
+from .dialect import excluded, upsert_id
 
 
+@timed_repo
 def ensure_data_source(name: str = "stub_local", granularity: str = "day") -> int:
     with get_engine().begin() as conn:
-        conn.execute(
-            text(
-                """
-                INSERT INTO data_sources (name, default_granularity, is_enabled, config_json)
-                VALUES (:name, :granularity, 1, :config_json)
-                ON DUPLICATE KEY UPDATE
-                  id=LAST_INSERT_ID(id),
-                  default_granularity=VALUES(default_granularity),
-                  updated_at=CURRENT_TIMESTAMP
-                """
-            ),
+        return upsert_id(
+            conn,
+            """
+            INSERT INTO data_sources (name, default_granularity, is_enabled, config_json)
+            VALUES (:name, :granularity, 1, :config_json)
+            """,
             {"name": name, "granularity": granularity, "config_json": json.dumps({"stub": True})},
+            ("name",),
+            {"default_granularity": excluded("default_granularity"), "updated_at": "CURRENT_TIMESTAMP"},
+        )
+
+
+@timed_repo
+def list_enabled_sources():
+    with get_engine().begin() as conn:
+        return (
+            conn.execute(
+                text(
+                    """
+                    SELECT id, name, default_granularity, config_json, last_sync_at
+                    FROM data_sources
+                    WHERE is_enabled = 1
+                    ORDER BY id
+                    """
+                )
+            )
+            .mappings()
+            .all()
+        )
+
+
+@timed_repo
+def mark_source_synced(source_id: int, synced_at) -> None:
+    with get_engine().begin() as conn:
+        conn.execute(
+            text("UPDATE data_sources SET last_sync_at=:synced_at WHERE id=:source_id"),
+            {"source_id": source_id, "synced_at": synced_at},
         )
-        return int(conn.execute(text("SELECT LAST_INSERT_ID()")).scalar_one())
@@ -0,0 +1,89 @@
+"""SQL fragments that differ between MySQL and SQLite (embedded mode).
+
+Repositories build MySQL-only constructs (JSON paths, upserts, ``DELETE ... LIMIT``, date
+arithmetic) through these helpers, so the same statements run on either backend. The dialect is
+the primary engine's, fixed at import time like the module-level statements that use it.
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+from .core import get_engine
+
+DIALECT = get_engine().dialect.name
+IS_MYSQL = DIALECT == "mysql"
+
+
+def as_date(value) -> date | None:
+    """A DATE result as ``date``; SQLite returns ISO text for expressions such as ``MIN(t)``."""
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def json_text(column: str, key: str) -> str:
+    """Top-level string member ``key`` of a JSON column as SQL text (NULL when absent)."""
+    if IS_MYSQL:
+        return f"JSON_UNQUOTE(JSON_EXTRACT({column}, '$.{key}'))"
+    # SQLite's json_extract already returns strings unquoted
+    return f"json_extract({column}, '$.{key}')"
+
+
+def greatest(*args: str) -> str:
+    return f"{'GREATEST' if IS_MYSQL else 'MAX'}({', '.join(args)})"
+
+
+def least(*args: str) -> str:
+    return f"{'LEAST' if IS_MYSQL else 'MIN'}({', '.join(args)})"
+
+
+def excluded(column: str) -> str:
+    """The value the conflicting INSERT tried to write, for use in :func:`on_conflict_update`."""
+    return f"VALUES({column})" if IS_MYSQL else f"excluded.{column}"
+
+
+def on_conflict_update(conflict: tuple[str, ...], assignments: dict[str, str]) -> str:
+    """Upsert clause; ``conflict`` names the unique key MySQL infers and SQLite needs spelled out."""
+    sets = ",\n  ".join(f"{column}={expr}" for column, expr in assignments.items())
+    if IS_MYSQL:
+        return f"ON DUPLICATE KEY UPDATE\n  {sets}"
+    return f"ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET\n  {sets}"
+
+
+def upsert_id(conn, insert_sql: str, params: dict, conflict: tuple[str, ...], assignments: dict[str, str]) -> int:
+    """Run ``insert_sql`` as an upsert and return the id of the new or the existing row."""
+    if IS_MYSQL:
+        # LAST_INSERT_ID(id) makes the duplicate branch report the existing row's id
+        clause = on_conflict_update(conflict, {"id": "LAST_INSERT_ID(id)", **assignments})
+        conn.execute(text(f"{insert_sql}\n{clause}"), params)
+        return int(conn.execute(text("SELECT LAST_INSERT_ID()")).scalar_one())
+    # DO NOTHING returns no row, so a no-op assignment keeps RETURNING working on conflict
+    clause = on_conflict_update(conflict, assignments or {conflict[-1]: conflict[-1]})
+    return int(conn.execute(text(f"{insert_sql}\n{clause}\nRETURNING id"), params).scalar_one())
+
+
+def limited_delete(table: str, where: str, limit_param: str = "batch_size") -> str:
+    """``DELETE`` of at most ``:limit_param`` rows matching ``where``."""
+    if IS_MYSQL:
+        return f"DELETE FROM {table} WHERE {where} LIMIT :{limit_param}"
+    # stock SQLite builds lack DELETE ... LIMIT
+    return f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT :{limit_param})"
+
+
+# first day of the week (Monday), month and year containing a DATE column
+_BUCKET_SQL = {
+    "mysql": {
+        "week": "DATE_SUB({c}, INTERVAL WEEKDAY({c}) DAY)",
+        "month": "DATE_SUB({c}, INTERVAL DAYOFMONTH({c}) - 1 DAY)",
+        "year": "MAKEDATE(YEAR({c}), 1)",
+    },
+    "sqlite": {
+        "week": "date({c}, '-' || ((CAST(strftime('%w', {c}) AS INTEGER) + 6) % 7) || ' days')",
+        "month": "date({c}, 'start of month')",
+        "year": "date({c}, 'start of year')",
+    },
+}
+
+
+def date_bucket(column: str, granularity: str) -> str:
+    return _BUCKET_SQL["mysql" if IS_MYSQL else "sqlite"][granularity].format(c=column)
@@ -0,0 +1,280 @@
+-- SQLite schema for embedded mode (EMBEDDED_MODE=1), idempotent; mirrors db/init/001_schema.sql.
+-- JSON columns are TEXT (read with json_extract), INTEGER PRIMARY KEY is the rowid alias that
+-- AUTO_INCREMENT maps to, and triggers stand in for ON UPDATE CURRENT_TIMESTAMP. Tables whose rows
+-- retention archives and restores with their original ids add AUTOINCREMENT: a plain rowid alias
+-- hands out the highest deleted id again, and the restore would then collide with it.
+
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY,
+  username VARCHAR(64) NOT NULL UNIQUE,
+  password_hash VARCHAR(255) NOT NULL,
+  display_name VARCHAR(128) NULL,
+  email VARCHAR(255) NULL,
+  is_active TINYINT NOT NULL DEFAULT 1,
+  is_admin TINYINT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_users_active ON users (is_active);
+
+CREATE TABLE IF NOT EXISTS roles (
+  id INTEGER PRIMARY KEY,
+  name VARCHAR(64) NOT NULL UNIQUE,
+  description VARCHAR(255) NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS permissions (
+  id INTEGER PRIMARY KEY,
+  code VARCHAR(64) NOT NULL UNIQUE,
+  description VARCHAR(255) NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_roles (
+  user_id BIGINT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  role_id BIGINT NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (user_id, role_id)
+);
+CREATE INDEX IF NOT EXISTS idx_user_roles_role ON user_roles (role_id);
+
+CREATE TABLE IF NOT EXISTS role_permissions (
+  role_id BIGINT NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+  permission_id BIGINT NOT NULL REFERENCES permissions(id) ON DELETE CASCADE,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (role_id, permission_id)
+);
+CREATE INDEX IF NOT EXISTS idx_role_permissions_perm ON role_permissions (permission_id);
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+  id INTEGER PRIMARY KEY,
+  actor_user_id BIGINT NULL REFERENCES users(id) ON DELETE SET NULL,
+  action VARCHAR(64) NOT NULL,
+  target_type VARCHAR(64) NULL,
+  target_id VARCHAR(128) NULL,
+  meta_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_audit_action ON audit_logs (action);
+CREATE INDEX IF NOT EXISTS idx_audit_created ON audit_logs (created_at);
+
+CREATE TABLE IF NOT EXISTS data_sources (
+  id INTEGER PRIMARY KEY,
+  name VARCHAR(64) NOT NULL UNIQUE,
+  base_url VARCHAR(512) NULL,
+  is_enabled TINYINT NOT NULL DEFAULT 1,
+  default_granularity VARCHAR(16) NOT NULL DEFAULT 'day',
+  config_json TEXT NULL,
+  last_sync_at TIMESTAMP NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_data_sources_enabled ON data_sources (is_enabled);
+
+CREATE TABLE IF NOT EXISTS lexicon_versions (
+  id INTEGER PRIMARY KEY,
+  name VARCHAR(128) NOT NULL UNIQUE,
+  note VARCHAR(255) NULL,
+  is_active TINYINT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_lexicon_versions_active ON lexicon_versions (is_active);
+
+CREATE TABLE IF NOT EXISTS lexicon_terms (
+  id INTEGER PRIMARY KEY,
+  canonical VARCHAR(255) NOT NULL,
+  category VARCHAR(32) NULL,
+  language VARCHAR(16) NULL,
+  meta_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT uq_lexicon_terms_canonical UNIQUE (canonical)
+);
+CREATE INDEX IF NOT EXISTS idx_lexicon_terms_category ON lexicon_terms (category);
+
+CREATE TABLE IF NOT EXISTS lexicon_variants (
+  id INTEGER PRIMARY KEY,
+  term_id BIGINT NOT NULL REFERENCES lexicon_terms(id) ON DELETE CASCADE,
+  variant VARCHAR(255) NOT NULL,
+  variant_type VARCHAR(32) NULL,
+  source VARCHAR(64) NULL,
+  version_id BIGINT NULL REFERENCES lexicon_versions(id) ON DELETE SET NULL,
+  meta_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT uq_lexicon_variants_term_variant UNIQUE (term_id, variant)
+);
+CREATE INDEX IF NOT EXISTS idx_lexicon_variants_version ON lexicon_variants (version_id);
+
+CREATE TABLE IF NOT EXISTS lexicon_import_jobs (
+  id INTEGER PRIMARY KEY,
+  actor_user_id BIGINT NULL REFERENCES users(id) ON DELETE SET NULL,
+  source VARCHAR(64) NOT NULL,
+  input_artifact VARCHAR(255) NULL,
+  status VARCHAR(32) NOT NULL DEFAULT 'CREATED',
+  summary_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_lexicon_import_jobs_status ON lexicon_import_jobs (status);
+
+CREATE TABLE IF NOT EXISTS tasks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  task_id VARCHAR(255) NOT NULL UNIQUE,
+  task_type VARCHAR(64) NOT NULL,
+  status VARCHAR(32) NOT NULL,
+  params_json TEXT NULL,
+  result_json TEXT NULL,
+  error_text TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks (task_type);
+CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks (created_at);
+
+CREATE TABLE IF NOT EXISTS task_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  task_id VARCHAR(255) NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+  ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  level VARCHAR(16) NOT NULL DEFAULT 'INFO',
+  message VARCHAR(1024) NOT NULL,
+  meta_json TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events (task_id);
+CREATE INDEX IF NOT EXISTS idx_task_events_ts ON task_events (ts);
+CREATE INDEX IF NOT EXISTS idx_task_events_level ON task_events (level);
+
+CREATE TABLE IF NOT EXISTS task_artifacts (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  task_id VARCHAR(255) NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+  kind VARCHAR(32) NOT NULL,
+  filename VARCHAR(255) NOT NULL,
+  path VARCHAR(512) NOT NULL,
+  meta_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  CONSTRAINT uq_task_artifacts_unique UNIQUE (task_id, kind, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_task_artifacts_kind ON task_artifacts (kind);
+CREATE INDEX IF NOT EXISTS idx_task_artifacts_path ON task_artifacts (path);
+
+CREATE TABLE IF NOT EXISTS time_series (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  term_id BIGINT NOT NULL REFERENCES lexicon_terms(id) ON DELETE CASCADE,
+  variant_id BIGINT NULL REFERENCES lexicon_variants(id) ON DELETE SET NULL,
+  source_id BIGINT NOT NULL REFERENCES data_sources(id) ON DELETE RESTRICT,
+  granularity VARCHAR(16) NOT NULL,
+  window_start DATE NULL,
+  window_end DATE NULL,
+  units VARCHAR(32) NULL,
+  meta_json TEXT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  source_key VARCHAR(128) NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_time_series_term ON time_series (term_id);
+CREATE INDEX IF NOT EXISTS idx_time_series_variant ON time_series (variant_id);
+CREATE INDEX IF NOT EXISTS idx_time_series_source ON time_series (source_id);
+CREATE INDEX IF NOT EXISTS idx_time_series_granularity ON time_series (granularity);
+-- MySQL scans meta_json for these lookups too; SQLite can index the expression directly
+CREATE INDEX IF NOT EXISTS idx_time_series_task ON time_series (json_extract(meta_json, '$.task_id'));
+
+CREATE TABLE IF NOT EXISTS time_series_points (
+  series_id BIGINT NOT NULL REFERENCES time_series(id) ON DELETE CASCADE,
+  t DATE NOT NULL,
+  value DOUBLE NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (series_id, t)
+);
+CREATE INDEX IF NOT EXISTS idx_time_series_points_t ON time_series_points (t);
+
+CREATE TABLE IF NOT EXISTS time_series_rollups (
+  series_id BIGINT NOT NULL REFERENCES time_series(id) ON DELETE CASCADE,
+  granularity VARCHAR(16) NOT NULL,
+  bucket_start DATE NOT NULL,
+  point_count INT NOT NULL,
+  value_sum DOUBLE NOT NULL,
+  value_min DOUBLE NOT NULL,
+  value_max DOUBLE NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (series_id, granularity, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS task_archives (
+  id INTEGER PRIMARY KEY,
+  task_id VARCHAR(255) NOT NULL UNIQUE,
+  task_type VARCHAR(64) NOT NULL,
+  status VARCHAR(32) NOT NULL,
+  path VARCHAR(512) NOT NULL,
+  sha256 CHAR(64) NOT NULL,
+  size_bytes BIGINT NOT NULL,
+  counts_json TEXT NULL,
+  task_created_at TIMESTAMP NULL,
+  archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  restored_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_archives_type ON task_archives (task_type);
+CREATE INDEX IF NOT EXISTS idx_task_archives_archived ON task_archives (archived_at);
+
+CREATE TABLE IF NOT EXISTS request_profiles (
+  id INTEGER PRIMARY KEY,
+  kind VARCHAR(32) NOT NULL,
+  method VARCHAR(16) NOT NULL,
+  path VARCHAR(512) NOT NULL,
+  route VARCHAR(255) NULL,
+  status_code INTEGER NOT NULL,
+  duration_ms DOUBLE NOT NULL,
+  report_json TEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_request_profiles_kind ON request_profiles (kind);
+CREATE INDEX IF NOT EXISTS idx_request_profiles_created ON request_profiles (created_at);
+
+-- ON UPDATE CURRENT_TIMESTAMP: bump updated_at unless the statement set it itself
+CREATE TRIGGER IF NOT EXISTS trg_users_updated_at AFTER UPDATE ON users
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE users SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_data_sources_updated_at AFTER UPDATE ON data_sources
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE data_sources SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lexicon_terms_updated_at AFTER UPDATE ON lexicon_terms
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE lexicon_terms SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_lexicon_import_jobs_updated_at AFTER UPDATE ON lexicon_import_jobs
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE lexicon_import_jobs SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tasks_updated_at AFTER UPDATE ON tasks
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_time_series_updated_at AFTER UPDATE ON time_series
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE time_series SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_time_series_rollups_updated_at AFTER UPDATE ON time_series_rollups
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN UPDATE time_series_rollups SET updated_at = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END;
+
+INSERT OR IGNORE INTO data_sources (name, default_granularity, is_enabled) VALUES
+  ('GDELT', 'day', 1),
+  ('GBNC', 'year', 1);
+
+INSERT OR IGNORE INTO lexicon_versions (name, note, is_active) VALUES
+  ('v1-initial', 'Initial lexicon version created by M2 bootstrap', 1);
+
+INSERT OR IGNORE INTO roles (name, description) VALUES
+  ('admin', 'Administrator role'),
+  ('user', 'Normal user role');
+
+INSERT OR IGNORE INTO permissions (code, description) VALUES
+  ('admin.lexicon.write', 'Manage lexicon terms and variants'),
+  ('admin.datasource.write', 'Manage external data sources'),
+  ('task.read', 'Read tasks and artifacts'),
+  ('task.create', 'Create tasks');
+
+INSERT OR IGNORE INTO role_permissions (role_id, permission_id)
+SELECT r.id, p.id FROM roles r CROSS JOIN permissions p WHERE r.name = 'admin';
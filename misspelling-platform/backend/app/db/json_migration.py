@@ -0,0 +1,62 @@
+"""One-time fix for JSON columns holding double-encoded values.
+
+Older hotfix branches wrote ``json.dumps(json.dumps(obj))``, which MySQL stores as a JSON
+*string* containing the document. Each UPDATE unwraps one level and the batch loop runs
+until no row matches, so a row encoded three or more times is re-selected until it holds the
+document itself. Run once after deploying the shared serializer::
+
+    python -m app.db.json_migration
+"""
+from sqlalchemy import text
+
+from ..metrics import timed_repo
+from .core import get_engine
+from .dialect import IS_MYSQL
+
+# (table, column, has updated_at that must not be bumped)
+JSON_COLUMNS = (
+    ("tasks", "params_json", True),
+    ("tasks", "result_json", True),
+    ("task_events", "meta_json", False),
+    ("task_artifacts", "meta_json", False),
+)
+BATCH_SIZE = 5000
+
+
+@timed_repo
+def unwrap_double_encoded(table: str, column: str, keep_updated_at: bool, batch_size: int = BATCH_SIZE) -> int:
+    keep = ", updated_at = updated_at" if keep_updated_at else ""
+    # a '"' start is a further encoded level (triple encoding and deeper); it matches again next batch
+    statement = text(
+        f"""
+        UPDATE {table}
+        SET {column} = CAST(JSON_UNQUOTE({column}) AS JSON){keep}
+        WHERE JSON_TYPE({column}) = 'STRING'
+          AND JSON_VALID(JSON_UNQUOTE({column}))
+          AND LEFT(TRIM(JSON_UNQUOTE({column})), 1) IN ('{{', '[', '"')
+        LIMIT :batch_size
+        """
+    )
+    fixed = 0
+    # a row counts once per level unwrapped; stop only when a batch changes nothing
+    while True:
+        with get_engine().begin() as conn:
+            count = conn.execute(statement, {"batch_size": batch_size}).rowcount
+        fixed += count
+        if count == 0:
+            return fixed
+
+
+def fix_double_encoded_json() -> dict[str, int]:
+    if not IS_MYSQL:
+        # only the MySQL hotfix branches double-encoded; embedded databases start clean
+        return {}
+    return {
+        f"{table}.{column}": unwrap_double_encoded(table, column, keep_updated_at)
+        for table, column, keep_updated_at in JSON_COLUMNS
+    }
+
+
+if __name__ == "__main__":
+    for name, count in fix_double_encoded_json().items():
+        print(f"{name}: {count} levels unwrapped")
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from ..metrics import timed_repo
+from .core import get_engine
+from .dialect import IS_MYSQL
+
+# partitioned table -> how its range bounds are written (see db/partitioned/002_partitioning.sql)
+PARTITIONED_TABLES = {
+    "time_series_points": "columns",  # RANGE COLUMNS (t): DATE literals
+    "task_events": "unix_timestamp",  # RANGE (UNIX_TIMESTAMP(ts)): integer seconds
+}
+FUTURE_PARTITION = "p_future"
+
+
+def bound_sql(kind: str, upper: date) -> str:
+    if kind == "columns":
+        return f"('{upper.isoformat()}')"
+    return f"(UNIX_TIMESTAMP('{upper.isoformat()} 00:00:00'))"
+
+
+def maxvalue_sql(kind: str) -> str:
+    return "(MAXVALUE)" if kind == "columns" else "MAXVALUE"
+
+
+def parse_bound(kind: str, description: str | None) -> date | None:
+    """Upper bound of a partition as a date, ``None`` for MAXVALUE."""
+    if description is None or description.upper() == "MAXVALUE":
+        return None
+    if kind == "columns":
+        return date.fromisoformat(description.strip("'"))
+    # bounds were computed in the session time zone; snap to the nearest midnight
+    return (datetime.fromtimestamp(int(description), tz=timezone.utc) + timedelta(hours=12)).date()
+
+
+def partition_definitions(kind: str, partitions: list[tuple[str, date]], with_future: bool = True) -> str:
+    parts = [f"PARTITION {name} VALUES LESS THAN {bound_sql(kind, upper)}" for name, upper in partitions]
+    if with_future:
+        parts.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN {maxvalue_sql(kind)}")
+    return ",\n  ".join(parts)
+
+
+@timed_repo
+def list_partitions(table: str):
+    if not IS_MYSQL:
+        # embedded SQLite tables are never partitioned, so maintenance has nothing to do
+        return []
+    with get_engine().begin() as conn:
+        return (
+            conn.execute(
+                text(
+                    """
+                    SELECT
+                      PARTITION_NAME AS name,
+                      PARTITION_DESCRIPTION AS description,
+                      TABLE_ROWS AS approx_rows
+                    FROM information_schema.PARTITIONS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+                    ORDER BY PARTITION_ORDINAL_POSITION
+                    """
+                ),
+                {"table": table},
+            )
+            .mappings()
+            .all()
+        )
+
+
+@timed_repo
+def partition_has_rows(table: str, name: str) -> bool:
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"not a partitioned table: {table}")
+    with get_engine().begin() as conn:
+        return conn.execute(text(f"SELECT 1 FROM {table} PARTITION ({name}) LIMIT 1")).first() is not None
+
+
+@timed_repo
+def split_future_partition(table: str, partitions: list[tuple[str, date]]) -> None:
+    """Carve new ranges out of ``p_future``; instant while ``p_future`` holds no rows."""
+    kind = PARTITIONED_TABLES[table]
+    with get_engine().begin() as conn:
+        conn.execute(
+            text(
+                f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n  "
+                f"{partition_definitions(kind, partitions)}\n)"
+            )
+        )
+
+
+@timed_repo
+def drop_partitions(table: str, names: list[str]) -> None:
+    if table not in PARTITIONED_TABLES or not names:
+        return
+    with get_engine().begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}"))
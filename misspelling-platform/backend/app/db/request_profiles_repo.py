@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+
+from ..metrics import timed_repo
+from .core import async_read_connection, engine
+from .dialect import limited_delete
+
+LIST_REQUEST_PROFILES_SQL = text(
+    """
+    SELECT id, kind, method, path, route, status_code, duration_ms, created_at
+    FROM request_profiles
+    WHERE kind IN :kinds
+    ORDER BY id DESC
+    LIMIT :limit
+    """
+).bindparams(bindparam("kinds", expanding=True))
+
+
+@timed_repo
+def insert_request_profile(
+    kind: str,
+    method: str,
+    path: str,
+    route: str | None,
+    status_code: int,
+    duration_ms: float,
+    report_json: str,
+) -> int:
+    with engine.begin() as conn:
+        result = conn.execute(
+            text(
+                """
+                INSERT INTO request_profiles (kind, method, path, route, status_code, duration_ms, report_json)
+                VALUES (:kind, :method, :path, :route, :status_code, :duration_ms, :report_json)
+                """
+            ),
+            {
+                "kind": kind,
+                "method": method,
+                "path": path[:512],
+                "route": route,
+                "status_code": status_code,
+                "duration_ms": duration_ms,
+                "report_json": report_json,
+            },
+        )
+        return int(result.lastrowid)
+
+
+@timed_repo
+async def list_request_profiles_async(kinds: list[str], limit: int = 50):
+    async with async_read_connection() as conn:
+        result = await conn.execute(LIST_REQUEST_PROFILES_SQL, {"kinds": list(kinds), "limit": limit})
+        return result.mappings().all()
+
+
+@timed_repo
+async def get_request_profile_report_async(profile_id: int):
+    async with async_read_connection() as conn:
+        result = await conn.execute(
+            text("SELECT report_json FROM request_profiles WHERE id = :id"), {"id": profile_id}
+        )
+        return result.scalar()
+
+
+@timed_repo
+def delete_request_profiles_before(cutoff: datetime, batch_size: int = 5000) -> int:
+    # one short transaction per batch so row locks are released between batches
+    sql = text(limited_delete("request_profiles", "created_at < :cutoff"))
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            count = conn.execute(sql, {"cutoff": cutoff, "batch_size": batch_size}).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
@@ -0,0 +1,236 @@
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+
+from ..metrics import timed_repo
+from .core import get_engine
+from .dialect import excluded, json_text, limited_delete, on_conflict_update
+
+# tables a task archive bundle may contain, in restore (parent-first) order
+ARCHIVE_TABLES = ("tasks", "task_events", "task_artifacts", "time_series", "time_series_points")
+
+
+@timed_repo
+def list_task_types() -> list[str]:
+    with get_engine().begin() as conn:
+        return [r[0] for r in conn.execute(text("SELECT DISTINCT task_type FROM tasks")).all()]
+
+
+@timed_repo
+def list_expired_tasks(task_type: str, statuses: tuple[str, ...], cutoff: datetime, limit: int):
+    with get_engine().begin() as conn:
+        return (
+            conn.execute(
+                text(
+                    """
+                    SELECT task_id, task_type, status, created_at
+                    FROM tasks
+                    WHERE task_type = :task_type AND status IN :statuses AND updated_at < :cutoff
+                    ORDER BY id
+                    LIMIT :limit
+                    """
+                ).bindparams(bindparam("statuses", expanding=True)),
+                {"task_type": task_type, "statuses": list(statuses), "cutoff": cutoff, "limit": limit},
+            )
+            .mappings()
+            .all()
+        )
+
+
+@timed_repo
+def load_task_bundle(task_id: str) -> dict[str, list[dict]]:
+    """All rows owned by one task, keyed by table (rollups are derived and rebuilt on restore)."""
+    with get_engine().begin() as conn:
+        series = [
+            dict(r)
+            for r in conn.execute(
+                text(
+                    f"""
+                    SELECT id, term_id, variant_id, source_id, granularity, window_start, window_end,
+                           units, meta_json, created_at, updated_at
+                    FROM time_series
+                    WHERE {json_text("meta_json", "task_id")} = :task_id
+                    ORDER BY id
+                    """
+                ),
+                {"task_id": task_id},
+            ).mappings()
+        ]
+        points = []
+        if series:
+            points = [
+                dict(r)
+                for r in conn.execute(
+                    text(
+                        """
+                        SELECT series_id, t, value, created_at
+                        FROM time_series_points
+                        WHERE series_id IN :series_ids
+                        ORDER BY series_id, t
+                        """
+                    ).bindparams(bindparam("series_ids", expanding=True)),
+                    {"series_ids": [s["id"] for s in series]},
+                ).mappings()
+            ]
+        params = {"task_id": task_id}
+        return {
+            "tasks": [
+                dict(r)
+                for r in conn.execute(text("SELECT * FROM tasks WHERE task_id = :task_id"), params).mappings()
+            ],
+            "task_events": [
+                dict(r)
+                for r in conn.execute(
+                    text("SELECT * FROM task_events WHERE task_id = :task_id ORDER BY id"), params
+                ).mappings()
+            ],
+            "task_artifacts": [
+                dict(r)
+                for r in conn.execute(
+                    text("SELECT * FROM task_artifacts WHERE task_id = :task_id ORDER BY id"), params
+                ).mappings()
+            ],
+            "time_series": series,
+            "time_series_points": points,
+        }
+
+
+def _delete_in_batches(sql: str, params: dict, batch_size: int) -> int:
+    # one short transaction per batch so row locks are released between batches
+    deleted = 0
+    while True:
+        with get_engine().begin() as conn:
+            count = conn.execute(text(sql), {**params, "batch_size": batch_size}).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+@timed_repo
+def delete_task_rows(task_id: str, series_ids: list[int], batch_size: int = 5000) -> dict[str, int]:
+    counts = {"time_series_points": 0, "task_events": 0}
+    for series_id in series_ids:
+        counts["time_series_points"] += _delete_in_batches(
+            limited_delete("time_series_points", "series_id = :series_id"),
+            {"series_id": series_id},
+            batch_size,
+        )
+    if series_ids:
+        with get_engine().begin() as conn:
+            # rollups go with their series (ON DELETE CASCADE)
+            counts["time_series"] = conn.execute(
+                text("DELETE FROM time_series WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": series_ids},
+            ).rowcount
+    counts["task_events"] = _delete_in_batches(
+        limited_delete("task_events", "task_id = :task_id"), {"task_id": task_id}, batch_size
+    )
+    with get_engine().begin() as conn:
+        # task_artifacts go with the task (ON DELETE CASCADE)
+        counts["tasks"] = conn.execute(
+            text("DELETE FROM tasks WHERE task_id = :task_id"), {"task_id": task_id}
+        ).rowcount
+    return counts
+
+
+_ARCHIVE_ASSIGNMENTS = {
+    **{c: excluded(c) for c in ("status", "path", "sha256", "size_bytes", "counts_json")},
+    "archived_at": "CURRENT_TIMESTAMP",
+    "restored_at": "NULL",
+}
+
+
+@timed_repo
+def upsert_archive(
+    task_id: str,
+    task_type: str,
+    status: str,
+    path: str,
+    sha256: str,
+    size_bytes: int,
+    counts_json: str,
+    task_created_at,
+) -> None:
+    with get_engine().begin() as conn:
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO task_archives (
+                  task_id, task_type, status, path, sha256, size_bytes, counts_json, task_created_at
+                ) VALUES (
+                  :task_id, :task_type, :status, :path, :sha256, :size_bytes, :counts_json, :task_created_at
+                )
+                {on_conflict_update(("task_id",), _ARCHIVE_ASSIGNMENTS)}
+                """
+            ),
+            {
+                "task_id": task_id,
+                "task_type": task_type,
+                "status": status,
+                "path": path,
+                "sha256": sha256,
+                "size_bytes": size_bytes,
+                "counts_json": counts_json,
+                "task_created_at": task_created_at,
+            },
+        )
+
+
+@timed_repo
+def get_archive(task_id: str):
+    with get_engine().begin() as conn:
+        return (
+            conn.execute(
+                text(
+                    """
+                    SELECT
+                      task_id, task_type, status, path, sha256, size_bytes, counts_json, archived_at, restored_at
+                    FROM task_archives
+                    WHERE task_id = :task_id
+                    """
+                ),
+                {"task_id": task_id},
+            )
+            .mappings()
+            .first()
+        )
+
+
+def _insert_rows(conn, table: str, rows: list[dict], batch_size: int) -> int:
+    if table not in ARCHIVE_TABLES:
+        raise ValueError(f"unknown archive table: {table}")
+    if not rows:
+        return 0
+    columns = list(rows[0])
+    statement = text(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"
+    )
+    for i in range(0, len(rows), batch_size):
+        conn.execute(statement, rows[i : i + batch_size])
+    return len(rows)
+
+
+@timed_repo
+def restore_bundle(task_id: str, tables: dict[str, list[dict]], batch_size: int = 5000) -> dict[str, int]:
+    """Re-insert a task's archived rows and mark its archive restored, all in one transaction.
+
+    A failure part-way leaves nothing behind, so the restore can simply be retried.
+    """
+    with get_engine().begin() as conn:
+        restored = {
+            table: _insert_rows(conn, table, tables.get(table, []), batch_size) for table in ARCHIVE_TABLES
+        }
+        _mark_restored(conn, task_id)
+    return restored
+
+
+def _mark_restored(conn, task_id: str) -> None:
+    conn.execute(
+        text("UPDATE task_archives SET restored_at = CURRENT_TIMESTAMP WHERE task_id = :task_id"),
+        {"task_id": task_id},
+    )
+    # restart the retention clock so the restored task is not archived again on the next run
+    conn.execute(
+        text("UPDATE tasks SET updated_at = CURRENT_TIMESTAMP WHERE task_id = :task_id"),
+        {"task_id": task_id},
+    )
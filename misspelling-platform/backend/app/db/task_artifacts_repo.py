@@ -1,8 +1,45 @@
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
-from .core import engine
+from ..metrics import timed_repo
+from .core import async_read_connection, engine, read_connection
+from .dialect import excluded, on_conflict_update
 
+LIST_ARTIFACTS_SQL = text(
+    """
+    SELECT task_id, kind, filename, path, meta_json, created_at
+    FROM task_artifacts
+    WHERE task_id=:task_id
+    ORDER BY id ASC
+    """
+)
+LIST_ARTIFACTS_BY_KIND_SQL = text(
+    """
+    SELECT a.task_id, t.task_type, a.kind, a.filename, a.path, a.meta_json, a.created_at
+    FROM task_artifacts a
+    JOIN tasks t ON t.task_id = a.task_id
+    WHERE a.kind IN :kinds
+    ORDER BY a.id DESC
+    LIMIT :limit
+    """
+).bindparams(bindparam("kinds", expanding=True))
 
+GET_ARTIFACT_SQL = text(
+    """
+    SELECT task_id, kind, filename, path, meta_json, created_at
+    FROM task_artifacts
+    WHERE task_id=:task_id AND filename=:filename
+    ORDER BY id ASC
+    LIMIT 1
+    """
+)
+REFERENCED_PATHS_SQL = text("SELECT DISTINCT path FROM task_artifacts WHERE path IN :paths").bindparams(
+    bindparam("paths", expanding=True)
+)
+
+_ARTIFACT_ASSIGNMENTS = {"path": excluded("path"), "meta_json": excluded("meta_json")}
+
+
+@timed_repo
 def upsert_artifact(
     task_id: str,
     kind: str,
@@ -13,12 +50,10 @@ def upsert_artifact(
     with engine.begin() as conn:
         conn.execute(
             text(
-                """
+                f"""
                 INSERT INTO task_artifacts (task_id, kind, filename, path, meta_json)
                 VALUES (:task_id, :kind, :filename, :path, :meta_json)
-                ON DUPLICATE KEY UPDATE
-                  path=VALUES(path),
-                  meta_json=VALUES(meta_json)
+                {on_conflict_update(("task_id", "kind", "filename"), _ARTIFACT_ASSIGNMENTS)}
                 """
             ),
             {
@@ -31,20 +66,55 @@ def upsert_artifact(
         )
 
 
-def list_artifacts(task_id: str):
+@timed_repo
+def delete_artifacts(task_id: str) -> int:
     with engine.begin() as conn:
-        return (
-            conn.execute(
-                text(
-                    """
-                    SELECT task_id, kind, filename, path, meta_json, created_at
-                    FROM task_artifacts
-                    WHERE task_id=:task_id
-                    ORDER BY id ASC
-                    """
-                ),
-                {"task_id": task_id},
-            )
-            .mappings()
-            .all()
-        )
+        result = conn.execute(text("DELETE FROM task_artifacts WHERE task_id=:task_id"), {"task_id": task_id})
+        return result.rowcount
+
+
+@timed_repo
+def get_artifact(task_id: str, filename: str):
+    with read_connection() as conn:
+        return conn.execute(GET_ARTIFACT_SQL, {"task_id": task_id, "filename": filename}).mappings().first()
+
+
+@timed_repo
+def list_artifact_paths(task_id: str) -> list[str]:
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT path FROM task_artifacts WHERE task_id=:task_id"), {"task_id": task_id})
+        return list(rows.scalars().all())
+
+
+@timed_repo
+def referenced_paths(paths: list[str]) -> set[str]:
+    """The subset of ``paths`` still recorded by some artifact row (read on the primary)."""
+    if not paths:
+        return set()
+    with engine.connect() as conn:
+        return set(conn.execute(REFERENCED_PATHS_SQL, {"paths": list(paths)}).scalars().all())
+
+
+@timed_repo
+def list_artifacts(task_id: str):
+    with read_connection() as conn:
+        return conn.execute(LIST_ARTIFACTS_SQL, {"task_id": task_id}).mappings().all()
+
+
+@timed_repo
+async def list_artifacts_async(task_id: str):
+    async with async_read_connection() as conn:
+        return (await conn.execute(LIST_ARTIFACTS_SQL, {"task_id": task_id})).mappings().all()
+
+
+@timed_repo
+def list_artifacts_by_kind(kinds: list[str], limit: int = 50):
+    with read_connection() as conn:
+        return conn.execute(LIST_ARTIFACTS_BY_KIND_SQL, {"kinds": list(kinds), "limit": limit}).mappings().all()
+
+
+@timed_repo
+async def list_artifacts_by_kind_async(kinds: list[str], limit: int = 50):
+    async with async_read_connection() as conn:
+        result = await conn.execute(LIST_ARTIFACTS_BY_KIND_SQL, {"kinds": list(kinds), "limit": limit})
+        return result.mappings().all()
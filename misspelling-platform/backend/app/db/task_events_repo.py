@@ -1,8 +1,40 @@
+from datetime import datetime, timedelta
+
 from sqlalchemy import text
 
-from .core import engine
+from ..metrics import timed_repo
+from .core import async_read_connection, engine, read_connection
+
+INSERT_EVENT_SQL = text(
+    """
+    INSERT INTO task_events (task_id, level, message, meta_json)
+    VALUES (:task_id, :level, :message, :meta_json)
+    """
+)
+LIST_EVENTS_SQL = text(
+    """
+    SELECT task_id, ts, level, message, meta_json
+    FROM task_events
+    WHERE task_id=:task_id
+      AND (:since IS NULL OR ts >= :since)
+      AND (:until IS NULL OR ts < :until)
+    ORDER BY id ASC
+    LIMIT :limit
+    """
+)
+TASK_CREATED_AT_SQL = text("SELECT created_at FROM tasks WHERE task_id=:task_id")
+# a task's events are written at or after its row, so its created_at is a safe lower bound on ts;
+# a constant bound lets the partitioned task_events prune months before the task existed
+EVENTS_SINCE_MARGIN = timedelta(minutes=1)
+
+
+def _events_params(task_id: str, limit: int, since, until, created_at) -> dict:
+    if since is None and created_at is not None:
+        since = created_at - EVENTS_SINCE_MARGIN
+    return {"task_id": task_id, "limit": limit, "since": since, "until": until}
 
 
+@timed_repo
 def insert_event(
     task_id: str,
     event_type: str,
@@ -11,12 +43,7 @@ def insert_event(
 ) -> None:
     with engine.begin() as conn:
         conn.execute(
-            text(
-                """
-                INSERT INTO task_events (task_id, level, message, meta_json)
-                VALUES (:task_id, :level, :message, :meta_json)
-                """
-            ),
+            INSERT_EVENT_SQL,
             {
                 "task_id": task_id,
                 "level": event_type,
@@ -26,21 +53,19 @@ def insert_event(
         )
 
 
-def list_events(task_id: str, limit: int = 200):
-    with engine.begin() as conn:
-        return (
-            conn.execute(
-                text(
-                    """
-                    SELECT task_id, ts, level, message, meta_json
-                    FROM task_events
-                    WHERE task_id=:task_id
-                    ORDER BY id ASC
-                    LIMIT :limit
-                    """
-                ),
-                {"task_id": task_id, "limit": limit},
-            )
-            .mappings()
-            .all()
-        )
+@timed_repo
+def list_events(task_id: str, limit: int = 200, since: datetime | None = None, until: datetime | None = None):
+    with read_connection() as conn:
+        created_at = None if since else conn.execute(TASK_CREATED_AT_SQL, {"task_id": task_id}).scalar()
+        params = _events_params(task_id, limit, since, until, created_at)
+        return conn.execute(LIST_EVENTS_SQL, params).mappings().all()
+
+
+@timed_repo
+async def list_events_async(
+    task_id: str, limit: int = 200, since: datetime | None = None, until: datetime | None = None
+):
+    async with async_read_connection() as conn:
+        created_at = None if since else (await conn.execute(TASK_CREATED_AT_SQL, {"task_id": task_id})).scalar()
+        params = _events_params(task_id, limit, since, until, created_at)
+        return (await conn.execute(LIST_EVENTS_SQL, params)).mappings().all()
@@ -1,8 +1,28 @@
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
-from .core import engine
+from ..metrics import timed_repo
+from .core import async_read_connection, engine, get_async_engine, read_connection
+from .dialect import excluded, on_conflict_update
+from .task_events_repo import INSERT_EVENT_SQL
 
+GET_TASK_SQL = text(
+    """
+    SELECT task_id, task_type, status, params_json, result_json, error_text
+    FROM tasks
+    WHERE task_id=:task_id
+    """
+)
+LIST_TASKS_SQL = text(
+    """
+    SELECT task_id, task_type, status, params_json, created_at, updated_at
+    FROM tasks
+    ORDER BY id DESC
+    LIMIT :limit
+    """
+)
 
+
+@timed_repo
 def insert_task(task_id: str, task_type: str, status: str, params_json: str) -> None:
     with engine.begin() as conn:
         conn.execute(
@@ -21,74 +41,104 @@ def insert_task(task_id: str, task_type: str, status: str, params_json: str) ->
         )
 
 
+# status polls right after enqueue must see the QUEUED row, so single-task reads stay on the primary
+@timed_repo
 def get_task(task_id: str):
     with engine.begin() as conn:
-        return (
-            conn.execute(
-                text(
-                    """
-                    SELECT task_id, status, params_json, result_json, error_text
-                    FROM tasks
-                    WHERE task_id=:task_id
-                    """
-                ),
-                {"task_id": task_id},
-            )
-            .mappings()
-            .first()
-        )
+        return conn.execute(GET_TASK_SQL, {"task_id": task_id}).mappings().first()
+
+
+@timed_repo
+async def get_task_async(task_id: str):
+    async with get_async_engine().connect() as conn:
+        return (await conn.execute(GET_TASK_SQL, {"task_id": task_id})).mappings().first()
 
 
+@timed_repo
 def list_tasks(limit: int):
-    with engine.begin() as conn:
-        return (
-            conn.execute(
-                text(
-                    """
-                    SELECT task_id, task_type, status, params_json, created_at, updated_at
-                    FROM tasks
-                    ORDER BY id DESC
-                    LIMIT :limit
-                    """
-                ),
-                {"limit": limit},
-            )
-            .mappings()
-            .all()
-        )
+    with read_connection() as conn:
+        return conn.execute(LIST_TASKS_SQL, {"limit": limit}).mappings().all()
 
 
-def set_task_running(task_id: str) -> None:
-    with engine.begin() as conn:
-        conn.execute(
-            text("UPDATE tasks SET status='RUNNING' WHERE task_id=:task_id"),
-            {"task_id": task_id},
-        )
+@timed_repo
+async def list_tasks_async(limit: int):
+    async with async_read_connection() as conn:
+        return (await conn.execute(LIST_TASKS_SQL, {"limit": limit})).mappings().all()
+
+
+# target status -> statuses it may be entered from. A write whose task has already moved on (a late
+# RUNNING after SUCCESS, a FAILURE after SUCCESS from a redelivered message) matches no row and is dropped.
+ALLOWED_TRANSITIONS = {
+    "RUNNING": ("QUEUED", "RUNNING"),
+    "SUCCESS": ("QUEUED", "RUNNING"),
+    "FAILURE": ("QUEUED", "RUNNING"),
+    "CANCELLED": ("QUEUED", "RUNNING"),
+}
 
 
-def set_task_success(task_id: str, result_json: str) -> None:
+_REQUEUE_ASSIGNMENTS = {
+    "status": excluded("status"),
+    "params_json": excluded("params_json"),
+    "updated_at": "CURRENT_TIMESTAMP",
+}
+
+
+@timed_repo
+def insert_queued_task(task_id: str, task_type: str, params_json: str, message: str, meta_json: str) -> None:
+    """Create the QUEUED row and its QUEUED event in one transaction."""
     with engine.begin() as conn:
         conn.execute(
             text(
-                """
-                UPDATE tasks
-                SET status='SUCCESS', result_json=:result_json, error_text=NULL
-                WHERE task_id=:task_id
+                f"""
+                INSERT INTO tasks (task_id, task_type, status, params_json)
+                VALUES (:task_id, :task_type, 'QUEUED', :params_json)
+                {on_conflict_update(("task_id",), _REQUEUE_ASSIGNMENTS)}
                 """
             ),
-            {"task_id": task_id, "result_json": result_json},
+            {"task_id": task_id, "task_type": task_type, "params_json": params_json},
+        )
+        conn.execute(
+            INSERT_EVENT_SQL, {"task_id": task_id, "level": "QUEUED", "message": message, "meta_json": meta_json}
         )
 
 
-def set_task_failure(task_id: str, error_text: str) -> None:
+@timed_repo
+def transition_task(
+    task_id: str,
+    status: str,
+    message: str,
+    meta_json: str | None = None,
+    result_json: str | None = None,
+    error_text: str | None = None,
+    allowed_from: tuple[str, ...] | None = None,
+) -> bool:
+    """Move a task to ``status`` and append the matching lifecycle event atomically.
+
+    Returns ``False`` (and writes nothing) when the task does not exist or its current status is not
+    allowed to move to ``status``. ``allowed_from`` narrows the source states for this one call.
+    """
+    allowed = [s for s in ALLOWED_TRANSITIONS[status] if allowed_from is None or s in allowed_from]
+    assignments = ["status=:status"]
+    if status == "SUCCESS":
+        assignments += ["result_json=:result_json", "error_text=NULL"]
+    elif error_text is not None:
+        assignments.append("error_text=:error_text")
     with engine.begin() as conn:
-        conn.execute(
+        updated = conn.execute(
             text(
-                """
-                UPDATE tasks
-                SET status='FAILURE', error_text=:error_text
-                WHERE task_id=:task_id
-                """
-            ),
-            {"task_id": task_id, "error_text": error_text},
+                f"UPDATE tasks SET {', '.join(assignments)} WHERE task_id=:task_id AND status IN :allowed"
+            ).bindparams(bindparam("allowed", expanding=True)),
+            {
+                "task_id": task_id,
+                "status": status,
+                "result_json": result_json,
+                "error_text": error_text,
+                "allowed": allowed,
+            },
+        ).rowcount
+        if not updated:
+            return False
+        conn.execute(
+            INSERT_EVENT_SQL, {"task_id": task_id, "level": status, "message": message, "meta_json": meta_json}
         )
+    return True
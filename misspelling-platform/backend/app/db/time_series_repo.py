@@ -1,51 +1,106 @@
 import json
 from datetime import date
 
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
-from .core import get_engine
+from ..metrics import timed_repo
+from .core import async_read_connection, get_engine, read_connection
+from .dialect import as_date, excluded, greatest, json_text, least, on_conflict_update, upsert_id
+from .time_series_rollups_repo import list_rollups, list_rollups_async, refresh_rollups
 
+TASK_ID_SQL = json_text("meta_json", "task_id")
+VARIANT_SQL = f"COALESCE({json_text('meta_json', 'variant')}, 'correct')"
 
+LIST_SERIES_BY_TASK_SQL = text(
+    f"""
+    SELECT
+      ts.id AS series_id,
+      ds.name AS source_name,
+      lt.canonical,
+      ts.granularity,
+      ts.window_start,
+      ts.window_end,
+      COALESCE({json_text('ts.meta_json', 'variant')}, 'correct') AS variant,
+      (SELECT COUNT(*) FROM time_series_points p WHERE p.series_id = ts.id) AS point_count
+    FROM time_series ts
+    JOIN data_sources ds ON ds.id = ts.source_id
+    JOIN lexicon_terms lt ON lt.id = ts.term_id
+    WHERE {json_text('ts.meta_json', 'task_id')} = :task_id
+    ORDER BY ts.id
+    """
+)
+FIND_TASK_SERIES_SQL = text(
+    f"""
+    SELECT id, window_start, window_end
+    FROM time_series
+    WHERE {TASK_ID_SQL} = :task_id
+      AND {VARIANT_SQL} = :variant
+    ORDER BY id
+    LIMIT 1
+    """
+)
+# the t range lets MySQL prune time_series_points partitions (db/partitioned/002_partitioning.sql)
+LIST_SERIES_POINTS_SQL = text(
+    """
+    SELECT t, value
+    FROM time_series_points
+    WHERE series_id = :series_id
+      AND (:lo IS NULL OR t >= :lo)
+      AND (:hi IS NULL OR t <= :hi)
+    ORDER BY t
+    """
+)
+COUNT_ROLLUPS_SQL = text(
+    """
+    SELECT series_id, COUNT(*) AS bucket_count
+    FROM time_series_rollups
+    WHERE series_id IN :series_ids AND granularity = :granularity
+    GROUP BY series_id
+    """
+).bindparams(bindparam("series_ids", expanding=True))
+
+
+@timed_repo
 def ensure_term(canonical: str, category: str = "custom", language: str = "en") -> int:
     with get_engine().begin() as conn:
-        conn.execute(
-            text(
-                """
-                INSERT INTO lexicon_terms (canonical, category, language, meta_json)
-                VALUES (:canonical, :category, :language, :meta_json)
-                ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id), updated_at=CURRENT_TIMESTAMP
-                """
-            ),
+        return upsert_id(
+            conn,
+            """
+            INSERT INTO lexicon_terms (canonical, category, language, meta_json)
+            VALUES (:canonical, :category, :language, :meta_json)
+            """,
             {
                 "canonical": canonical[:255],
                 "category": category,
                 "language": language,
                 "meta_json": json.dumps({"stub": True}),
             },
+            ("canonical",),
+            {"updated_at": "CURRENT_TIMESTAMP"},
         )
-        return int(conn.execute(text("SELECT LAST_INSERT_ID()")).scalar_one())
 
 
+@timed_repo
 def ensure_variant(term_id: int, variant: str, variant_type: str = "generated") -> int:
     with get_engine().begin() as conn:
-        conn.execute(
-            text(
-                """
-                INSERT INTO lexicon_variants (term_id, variant, variant_type, source, meta_json)
-                VALUES (:term_id, :variant, :variant_type, 'stub', :meta_json)
-                ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)
-                """
-            ),
+        return upsert_id(
+            conn,
+            """
+            INSERT INTO lexicon_variants (term_id, variant, variant_type, source, meta_json)
+            VALUES (:term_id, :variant, :variant_type, 'stub', :meta_json)
+            """,
             {
                 "term_id": term_id,
                 "variant": variant[:255],
                 "variant_type": variant_type,
                 "meta_json": json.dumps({"stub": True}),
             },
+            ("term_id", "variant"),
+            {},
         )
-        return int(conn.execute(text("SELECT LAST_INSERT_ID()")).scalar_one())
 
 
+@timed_repo
 def create_series(
     term_id: int,
     variant_id,
@@ -81,77 +136,439 @@ def create_series(
         return int(result.lastrowid)
 
 
+def _insert_points(conn, series_id: int, points) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO time_series_points (series_id, t, value)
+            VALUES (:series_id, :t, :value)
+            """
+        ),
+        [{"series_id": series_id, "t": p["t"], "value": p["value"]} for p in points],
+    )
+    ts = [p["t"] for p in points]
+    refresh_rollups(conn, {series_id: (min(ts), max(ts))})
+
+
+@timed_repo
 def insert_series_points(series_id: int, points):
     if not points:
         return
     with get_engine().begin() as conn:
+        _insert_points(conn, series_id, points)
+
+
+@timed_repo
+def replace_task_series(
+    task_id: str,
+    variant: str,
+    term_id: int,
+    source_id: int,
+    granularity: str,
+    units: str,
+    meta: dict,
+    points,
+) -> int:
+    """Swap the task's ``variant`` series for a fresh one with ``points`` in one transaction.
+
+    Derived series are rewritten on every run (and Celery retry), so any earlier copy is dropped first.
+    """
+    with get_engine().begin() as conn:
+        stale = (
+            conn.execute(
+                text(f"SELECT id FROM time_series WHERE {TASK_ID_SQL} = :task_id AND {VARIANT_SQL} = :variant"),
+                {"task_id": task_id, "variant": variant},
+            )
+            .scalars()
+            .all()
+        )
+        if stale:
+            ids = bindparam("ids", expanding=True)
+            params = {"ids": list(stale)}
+            conn.execute(text("DELETE FROM time_series_points WHERE series_id IN :ids").bindparams(ids), params)
+            conn.execute(text("DELETE FROM time_series WHERE id IN :ids").bindparams(ids), params)
+        series_id = int(
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO time_series (
+                      term_id, variant_id, source_id, granularity, window_start, window_end, units, meta_json
+                    ) VALUES (
+                      :term_id, NULL, :source_id, :granularity, :window_start, :window_end, :units, :meta_json
+                    )
+                    """
+                ),
+                {
+                    "term_id": term_id,
+                    "source_id": source_id,
+                    "granularity": granularity,
+                    "window_start": points[0]["t"],
+                    "window_end": points[-1]["t"],
+                    "units": units,
+                    "meta_json": json.dumps({**meta, "task_id": task_id, "variant": variant}),
+                },
+            ).lastrowid
+        )
+        _insert_points(conn, series_id, points)
+        return series_id
+
+
+@timed_repo
+def list_series_by_task(task_id: str):
+    with read_connection() as conn:
+        return conn.execute(LIST_SERIES_BY_TASK_SQL, {"task_id": task_id}).mappings().all()
+
+
+@timed_repo
+async def list_series_by_task_async(task_id: str):
+    async with async_read_connection() as conn:
+        return (await conn.execute(LIST_SERIES_BY_TASK_SQL, {"task_id": task_id})).mappings().all()
+
+
+def _find_task_series(conn, task_id: str, variant: str):
+    return conn.execute(FIND_TASK_SERIES_SQL, {"task_id": task_id, "variant": variant}).mappings().first()
+
+
+async def _find_task_series_async(conn, task_id: str, variant: str):
+    result = await conn.execute(FIND_TASK_SERIES_SQL, {"task_id": task_id, "variant": variant})
+    return result.mappings().first()
+
+
+def _find_task_series_id(conn, task_id: str, variant: str):
+    row = _find_task_series(conn, task_id, variant)
+    return int(row["id"]) if row else None
+
+
+async def _find_task_series_id_async(conn, task_id: str, variant: str):
+    row = await _find_task_series_async(conn, task_id, variant)
+    return int(row["id"]) if row else None
+
+
+def _points_window(series, start: date | None, end: date | None) -> dict:
+    # always bound t by the series window, even for a full read, so only the months it spans are scanned
+    lo, hi = as_date(series["window_start"]), as_date(series["window_end"])
+    if start is not None:
+        lo = start if lo is None else max(lo, start)
+    if end is not None:
+        hi = end if hi is None else min(hi, end)
+    return {"series_id": int(series["id"]), "lo": lo, "hi": hi}
+
+
+@timed_repo
+def get_task_series_id(task_id: str, variant: str = "correct"):
+    with read_connection() as conn:
+        return _find_task_series_id(conn, task_id, variant)
+
+
+@timed_repo
+def get_series_points_for_task(
+    task_id: str, variant: str = "correct", start: date | None = None, end: date | None = None
+):
+    with read_connection() as conn:
+        series = _find_task_series(conn, task_id, variant)
+        if series is None:
+            return None, []
+        params = _points_window(series, start, end)
+        return params["series_id"], conn.execute(LIST_SERIES_POINTS_SQL, params).mappings().all()
+
+
+@timed_repo
+async def get_series_points_for_task_async(
+    task_id: str, variant: str = "correct", start: date | None = None, end: date | None = None
+):
+    async with async_read_connection() as conn:
+        series = await _find_task_series_async(conn, task_id, variant)
+        if series is None:
+            return None, []
+        params = _points_window(series, start, end)
+        result = await conn.execute(LIST_SERIES_POINTS_SQL, params)
+        return params["series_id"], result.mappings().all()
+
+
+@timed_repo
+def get_series_rollups_for_task(
+    task_id: str, variant: str, granularity: str, start: date | None = None, end: date | None = None
+):
+    with read_connection() as conn:
+        series_id = _find_task_series_id(conn, task_id, variant)
+        if series_id is None:
+            return None, []
+        return series_id, list_rollups(conn, series_id, granularity, start, end)
+
+
+@timed_repo
+async def get_series_rollups_for_task_async(
+    task_id: str, variant: str, granularity: str, start: date | None = None, end: date | None = None
+):
+    async with async_read_connection() as conn:
+        series_id = await _find_task_series_id_async(conn, task_id, variant)
+        if series_id is None:
+            return None, []
+        return series_id, await list_rollups_async(conn, series_id, granularity, start, end)
+
+
+@timed_repo
+def delete_series_for_task(task_id: str) -> int:
+    with get_engine().begin() as conn:
+        series_ids = (
+            conn.execute(
+                text(f"SELECT id FROM time_series WHERE {TASK_ID_SQL} = :task_id"),
+                {"task_id": task_id},
+            )
+            .scalars()
+            .all()
+        )
+        if not series_ids:
+            return 0
+        ids = bindparam("ids", expanding=True)
+        params = {"ids": list(series_ids)}
+        # points explicitly (no FK cascade on the partitioned variant); rollups cascade from time_series
+        conn.execute(text("DELETE FROM time_series_points WHERE series_id IN :ids").bindparams(ids), params)
+        return conn.execute(text("DELETE FROM time_series WHERE id IN :ids").bindparams(ids), params).rowcount
+
+
+@timed_repo
+def count_rollups_by_series(series_ids: list[int], granularity: str) -> dict[int, int]:
+    if not series_ids:
+        return {}
+    with read_connection() as conn:
+        result = conn.execute(COUNT_ROLLUPS_SQL, {"series_ids": series_ids, "granularity": granularity})
+        rows = result.mappings().all()
+    return {int(r["series_id"]): int(r["bucket_count"]) for r in rows}
+
+
+@timed_repo
+async def count_rollups_by_series_async(series_ids: list[int], granularity: str) -> dict[int, int]:
+    if not series_ids:
+        return {}
+    async with async_read_connection() as conn:
+        result = await conn.execute(COUNT_ROLLUPS_SQL, {"series_ids": series_ids, "granularity": granularity})
+        rows = result.mappings().all()
+    return {int(r["series_id"]): int(r["bucket_count"]) for r in rows}
+
+
+@timed_repo
+def list_terms_with_variants():
+    with read_connection() as conn:
+        return (
+            conn.execute(
+                text(
+                    """
+                    SELECT lt.id AS term_id, lt.canonical, lv.id AS variant_id, lv.variant
+                    FROM lexicon_terms lt
+                    LEFT JOIN lexicon_variants lv ON lv.term_id = lt.id
+                    ORDER BY lt.id, lv.id
+                    """
+                )
+            )
+            .mappings()
+            .all()
+        )
+
+
+def source_series_key(term_id: int, variant_id, source_id: int, granularity: str) -> str:
+    variant = "-" if variant_id is None else int(variant_id)
+    return f"{int(source_id)}:{int(term_id)}:{variant}:{granularity}"
+
+
+@timed_repo
+def ensure_source_series(
+    term_id: int,
+    variant_id,
+    source_id: int,
+    granularity: str,
+    units: str,
+    meta: dict,
+) -> int:
+    """Id of the ingested series for (term, variant, source, granularity), created on first use.
+
+    An upsert on ``source_key`` rather than SELECT-then-INSERT, so overlapping syncs share one series.
+    """
+    with get_engine().begin() as conn:
+        return upsert_id(
+            conn,
+            """
+            INSERT INTO time_series (term_id, variant_id, source_id, granularity, units, meta_json, source_key)
+            VALUES (:term_id, :variant_id, :source_id, :granularity, :units, :meta_json, :source_key)
+            """,
+            {
+                "term_id": term_id,
+                "variant_id": variant_id,
+                "source_id": source_id,
+                "granularity": granularity,
+                "units": units,
+                "meta_json": json.dumps(meta),
+                "source_key": source_series_key(term_id, variant_id, source_id, granularity),
+            },
+            ("source_key",),
+            {},
+        )
+
+
+@timed_repo
+def upsert_series_points(rows, batch_size: int = 5000) -> int:
+    """Bulk upsert ``{"series_id", "t", "value"}`` rows, widen each series window and refresh rollups."""
+    if not rows:
+        return 0
+    windows: dict[int, list] = {}
+    for r in rows:
+        lo_hi = windows.setdefault(r["series_id"], [r["t"], r["t"]])
+        lo_hi[0] = min(lo_hi[0], r["t"])
+        lo_hi[1] = max(lo_hi[1], r["t"])
+    with get_engine().begin() as conn:
+        for i in range(0, len(rows), batch_size):
+            conn.execute(
+                text(
+                    f"""
+                    INSERT INTO time_series_points (series_id, t, value)
+                    VALUES (:series_id, :t, :value)
+                    {on_conflict_update(("series_id", "t"), {"value": excluded("value")})}
+                    """
+                ),
+                rows[i : i + batch_size],
+            )
         conn.execute(
             text(
-                """
-                INSERT INTO time_series_points (series_id, t, value)
-                VALUES (:series_id, :t, :value)
+                f"""
+                UPDATE time_series
+                SET window_start = {least("COALESCE(window_start, :lo)", ":lo")},
+                    window_end = {greatest("COALESCE(window_end, :hi)", ":hi")},
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = :series_id
                 """
             ),
-            [{"series_id": series_id, "t": p["t"], "value": p["value"]} for p in points],
+            [{"series_id": sid, "lo": lo, "hi": hi} for sid, (lo, hi) in windows.items()],
         )
+        refresh_rollups(conn, {sid: (lo, hi) for sid, (lo, hi) in windows.items()})
+    return len(rows)
 
 
-def list_series_by_task(task_id: str):
+@timed_repo
+def list_task_variant_points(task_ids: list[str], exclude_variants: tuple[str, ...] = ()):
+    """All points of every variant series for ``task_ids`` in one round trip."""
+    if not task_ids:
+        return []
     with get_engine().begin() as conn:
         return (
             conn.execute(
                 text(
-                    """
+                    f"""
                     SELECT
-                      ts.id AS series_id,
-                      ds.name AS source_name,
-                      lt.canonical,
-                      ts.granularity,
-                      ts.window_start,
-                      ts.window_end,
-                      COALESCE(JSON_UNQUOTE(JSON_EXTRACT(ts.meta_json, '$.variant')), 'correct') AS variant,
-                      (SELECT COUNT(*) FROM time_series_points p WHERE p.series_id = ts.id) AS point_count
-                    FROM time_series ts
-                    JOIN data_sources ds ON ds.id = ts.source_id
-                    JOIN lexicon_terms lt ON lt.id = ts.term_id
-                    WHERE JSON_UNQUOTE(JSON_EXTRACT(ts.meta_json, '$.task_id')) = :task_id
-                    ORDER BY ts.id
+                      s.task_id, s.variant, s.series_id, s.term_id, s.source_id, p.t, p.value
+                    FROM (
+                      SELECT
+                        id AS series_id,
+                        term_id,
+                        source_id,
+                        {TASK_ID_SQL} AS task_id,
+                        {VARIANT_SQL} AS variant
+                      FROM time_series
+                      WHERE {TASK_ID_SQL} IN :task_ids
+                    ) s
+                    JOIN time_series_points p ON p.series_id = s.series_id
+                    WHERE s.variant NOT IN :exclude_variants
+                    ORDER BY s.series_id, p.t
                     """
+                ).bindparams(
+                    bindparam("task_ids", expanding=True),
+                    bindparam("exclude_variants", expanding=True),
                 ),
-                {"task_id": task_id},
+                {"task_ids": list(task_ids), "exclude_variants": list(exclude_variants) or [""]},
             )
-            .mappings()
             .all()
         )
 
 
-def get_series_points_for_task(task_id: str, variant: str = "correct"):
-    with get_engine().begin() as conn:
-        series = (
+@timed_repo
+def list_series_changed_since(
+    cursor: int,
+    max_indexed_id: int,
+    updated_since,
+    granularity: str = "day",
+    limit: int = 2000,
+):
+    """Series ids after ``cursor`` that are new (id > max_indexed_id) or updated since ``updated_since``."""
+    with read_connection() as conn:
+        return (
             conn.execute(
                 text(
                     """
                     SELECT id
                     FROM time_series
-                    WHERE JSON_UNQUOTE(JSON_EXTRACT(meta_json, '$.task_id')) = :task_id
-                      AND COALESCE(JSON_UNQUOTE(JSON_EXTRACT(meta_json, '$.variant')), 'correct') = :variant
+                    WHERE granularity = :granularity
+                      AND id > :cursor
+                      AND (id > :max_indexed_id OR updated_at >= :updated_since)
                     ORDER BY id
-                    LIMIT 1
+                    LIMIT :limit
                     """
                 ),
-                {"task_id": task_id, "variant": variant},
+                {
+                    "granularity": granularity,
+                    "cursor": cursor,
+                    "max_indexed_id": max_indexed_id,
+                    "updated_since": updated_since,
+                    "limit": limit,
+                },
             )
-            .mappings()
-            .first()
+            .scalars()
+            .all()
         )
-        if not series:
-            return None, []
-        rows = (
+
+
+@timed_repo
+def list_series_ids(max_id: int, granularity: str = "day") -> list[int]:
+    """Ids of all ``granularity`` series up to ``max_id``, for dropping deleted series from the index."""
+    with read_connection() as conn:
+        result = conn.execute(
+            text("SELECT id FROM time_series WHERE granularity = :granularity AND id <= :max_id"),
+            {"granularity": granularity, "max_id": max_id},
+        )
+        return list(result.scalars().all())
+
+
+@timed_repo
+def list_points_for_series(series_ids: list[int]):
+    if not series_ids:
+        return []
+    with read_connection() as conn:
+        return conn.execute(
+            text(
+                """
+                SELECT series_id, t, value
+                FROM time_series_points
+                WHERE series_id IN :series_ids
+                ORDER BY series_id, t
+                """
+            ).bindparams(bindparam("series_ids", expanding=True)),
+            {"series_ids": list(series_ids)},
+        ).all()
+
+
+@timed_repo
+def describe_series(series_ids: list[int]):
+    if not series_ids:
+        return []
+    with read_connection() as conn:
+        return (
             conn.execute(
-                text("SELECT t, value FROM time_series_points WHERE series_id = :series_id ORDER BY t"),
-                {"series_id": series["id"]},
+                text(
+                    f"""
+                    SELECT
+                      ts.id AS series_id,
+                      lt.canonical,
+                      ds.name AS source_name,
+                      {json_text('ts.meta_json', 'task_id')} AS task_id,
+                      COALESCE({json_text('ts.meta_json', 'variant')}, 'correct') AS variant,
+                      ts.window_start,
+                      ts.window_end
+                    FROM time_series ts
+                    JOIN data_sources ds ON ds.id = ts.source_id
+                    JOIN lexicon_terms lt ON lt.id = ts.term_id
+                    WHERE ts.id IN :series_ids
+                    """
+                ).bindparams(bindparam("series_ids", expanding=True)),
+                {"series_ids": list(series_ids)},
             )
             .mappings()
             .all()
         )
-        return int(series["id"]), rows
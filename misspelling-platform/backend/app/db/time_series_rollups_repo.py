@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from ..metrics import timed_repo
+from .core import get_engine
+from .dialect import as_date, date_bucket, excluded, on_conflict_update
+
+ROLLUP_GRANULARITIES = ("week", "month", "year")
+
+LIST_ROLLUPS_SQL = text(
+    """
+    SELECT bucket_start AS t, point_count, value_sum, value_min, value_max
+    FROM time_series_rollups
+    WHERE series_id = :series_id AND granularity = :granularity
+      AND (:start IS NULL OR bucket_start >= :start)
+      AND (:end IS NULL OR bucket_start <= :end)
+    ORDER BY bucket_start
+    """
+)
+
+
+def bucket_start(d: date, granularity: str) -> date:
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    if granularity == "year":
+        return d.replace(month=1, day=1)
+    return d
+
+
+def bucket_end(d: date, granularity: str) -> date:
+    if granularity == "week":
+        return bucket_start(d, "week") + timedelta(days=6)
+    if granularity == "month":
+        first_next = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return first_next - timedelta(days=1)
+    if granularity == "year":
+        return d.replace(month=12, day=31)
+    return d
+
+
+_ROLLUP_ASSIGNMENTS = {c: excluded(c) for c in ("point_count", "value_sum", "value_min", "value_max")}
+
+
+@timed_repo
+def refresh_rollups(conn, windows: dict[int, tuple[date, date]]) -> None:
+    """Re-aggregate every rollup bucket touched by ``windows`` ({series_id: (lo, hi)}).
+
+    Runs on the caller's connection so rollups commit atomically with the point write.
+    """
+    for granularity in ROLLUP_GRANULARITIES:
+        bucket = date_bucket("t", granularity)
+        params = [
+            {
+                "series_id": series_id,
+                "granularity": granularity,
+                "lo": bucket_start(lo, granularity),
+                "hi": bucket_end(hi, granularity),
+            }
+            for series_id, (lo, hi) in windows.items()
+        ]
+        if not params:
+            continue
+        conn.execute(
+            text(
+                f"""
+                INSERT INTO time_series_rollups (
+                  series_id, granularity, bucket_start, point_count, value_sum, value_min, value_max
+                )
+                SELECT
+                  series_id, :granularity, {bucket} AS b, COUNT(*), SUM(value), MIN(value), MAX(value)
+                FROM time_series_points
+                WHERE series_id = :series_id AND t BETWEEN :lo AND :hi
+                GROUP BY series_id, b
+                {on_conflict_update(("series_id", "granularity", "bucket_start"), _ROLLUP_ASSIGNMENTS)}
+                """
+            ),
+            params,
+        )
+
+
+@timed_repo
+def rebuild_series_rollups(series_id: int | None = None) -> int:
+    with get_engine().begin() as conn:
+        rows = (
+            conn.execute(
+                text(
+                    """
+                    SELECT series_id, MIN(t) AS lo, MAX(t) AS hi
+                    FROM time_series_points
+                    WHERE :series_id IS NULL OR series_id = :series_id
+                    GROUP BY series_id
+                    """
+                ),
+                {"series_id": series_id},
+            )
+            .mappings()
+            .all()
+        )
+        refresh_rollups(conn, {int(r["series_id"]): (as_date(r["lo"]), as_date(r["hi"])) for r in rows})
+    return len(rows)
+
+
+def _rollup_params(series_id: int, granularity: str, start: date | None, end: date | None) -> dict:
+    # a bucket is included when it overlaps [start, end]
+    return {
+        "series_id": series_id,
+        "granularity": granularity,
+        "start": bucket_start(start, granularity) if start is not None else None,
+        "end": end,
+    }
+
+
+@timed_repo
+def list_rollups(conn, series_id: int, granularity: str, start: date | None = None, end: date | None = None):
+    return conn.execute(LIST_ROLLUPS_SQL, _rollup_params(series_id, granularity, start, end)).mappings().all()
+
+
+@timed_repo
+async def list_rollups_async(
+    conn, series_id: int, granularity: str, start: date | None = None, end: date | None = None
+):
+    result = await conn.execute(LIST_ROLLUPS_SQL, _rollup_params(series_id, granularity, start, end))
+    return result.mappings().all()
@@ -0,0 +1,17 @@
+from sqlalchemy import text
+
+from ..metrics import timed_repo
+from .core import read_connection
+
+
+@timed_repo
+def get_user_by_username(username: str):
+    with read_connection() as conn:
+        return (
+            conn.execute(
+                text("SELECT id, username, is_active, is_admin FROM users WHERE username = :username"),
+                {"username": username},
+            )
+            .mappings()
+            .first()
+        )
@@ -0,0 +1,148 @@
+"""Embedded single-node mode (``EMBEDDED_MODE=1``): the whole platform in one process.
+
+The database becomes a SQLite file in WAL mode (``EMBEDDED_DB_PATH``, unless ``DATABASE_URL`` is
+set), tasks run on a local thread pool through Celery's ``Task.apply`` instead of a broker, the beat
+schedule runs on a timer thread, and the Redis coordination keys (cancel flags, progress, admission
+buckets) live in process memory unless ``REDIS_URL`` is set.
+
+Threads, not processes: cancel flags and progress live in this process, and the task bodies spend
+most of their time in SQLite and numpy, which release the GIL.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+EMBEDDED_MODE = os.getenv("EMBEDDED_MODE", "") == "1"
+EMBEDDED_DB_PATH = os.getenv("EMBEDDED_DB_PATH", "/app/data/embedded.db")
+EMBEDDED_WORKERS = int(os.getenv("EMBEDDED_WORKERS", str(min(4, os.cpu_count() or 1))))
+EMBEDDED_BEAT = os.getenv("EMBEDDED_BEAT", "1") == "1"
+
+
+class LocalExecutor:
+    """Thread pool running Celery tasks in-process; tracks queued task ids so they can be revoked."""
+
+    def __init__(self, workers: int = EMBEDDED_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="embedded-task")
+        self._queued: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _run(self, celery_task, args, task_id: str, headers: dict | None):
+        with self._lock:
+            self._queued.pop(task_id, None)
+        # apply() fires the same prerun/postrun signals a worker does; exceptions stay in the result
+        return celery_task.apply(args=args, task_id=task_id, headers=headers)
+
+    def submit(self, celery_task, args=None, task_id: str | None = None, headers: dict | None = None) -> Future:
+        with self._lock:
+            future = self._pool.submit(self._run, celery_task, list(args or []), task_id, headers)
+            if task_id is not None and not future.done():
+                self._queued[task_id] = future
+        return future
+
+    def revoke(self, task_id: str) -> bool:
+        """Drop a task that has not started yet; ``False`` once it is running or unknown."""
+        with self._lock:
+            future = self._queued.pop(task_id, None)
+        return future is not None and future.cancel()
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class LocalBeat:
+    """Runs ``celery_app.conf.beat_schedule`` entries (interval schedules) on the local executor."""
+
+    def __init__(self, executor: LocalExecutor):
+        self.executor = executor
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "LocalBeat":
+        self._thread = threading.Thread(target=self._loop, name="embedded-beat", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        from .celery_app import celery_app
+
+        now = time.monotonic()
+        entries = [
+            (name, entry["task"], float(entry["schedule"]))
+            for name, entry in celery_app.conf.beat_schedule.items()
+            if isinstance(entry["schedule"], (int, float)) and float(entry["schedule"]) > 0
+        ]
+        # like celery beat: first run one interval after startup
+        due = {name: now + interval for name, _, interval in entries}
+        while entries and not self._stop.is_set():
+            now = time.monotonic()
+            for name, task_name, interval in entries:
+                if due[name] <= now:
+                    due[name] = now + interval
+                    self.executor.submit(celery_app.tasks[task_name])
+            self._stop.wait(max(0.05, min(due.values()) - time.monotonic()))
+
+
+_executor: LocalExecutor | None = None
+_beat: LocalBeat | None = None
+
+
+def get_executor() -> LocalExecutor:
+    global _executor
+    if _executor is None:
+        _executor = LocalExecutor()
+    return _executor
+
+
+def enqueue_task(celery_task, args: list, task_id: str, headers: dict, **options) -> None:
+    """``apply_async`` through the broker, or onto the local executor in embedded mode.
+
+    The local executor ignores Celery's ``soft_time_limit``/``time_limit``; running tasks still stop
+    at their own ``CancellationToken`` deadline and the reaper handles anything past the hard limit.
+    """
+    from .celery_app import celery_app
+
+    # CELERY_TASK_ALWAYS_EAGER still means "run inline in the caller", as without embedded mode
+    if EMBEDDED_MODE and not celery_app.conf.task_always_eager:
+        get_executor().submit(celery_task, args, task_id, headers)
+        return
+    celery_task.apply_async(args=args, task_id=task_id, headers=headers, **options)
+
+
+def revoke_task(task_id: str) -> None:
+    if EMBEDDED_MODE:
+        get_executor().revoke(task_id)
+        return
+    from .celery_app import celery_app
+
+    celery_app.control.revoke(task_id)
+
+
+def local_queue_depth() -> int:
+    return get_executor().queue_depth()
+
+
+def start_embedded() -> None:
+    """Start the in-process beat (the executor starts lazily on first submit)."""
+    global _beat
+    if EMBEDDED_BEAT and _beat is None:
+        _beat = LocalBeat(get_executor()).start()
+
+
+def stop_embedded() -> None:
+    global _beat, _executor
+    if _beat is not None:
+        _beat.stop()
+        _beat = None
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
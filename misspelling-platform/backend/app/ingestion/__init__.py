@@ -0,0 +1,20 @@
+"""Pluggable data-source adapters for time series ingestion."""
+
+from typing import Any
+
+from .base import SourceAdapter
+from .local_dir import LocalDirectoryAdapter
+
+ADAPTERS: dict[str, type[SourceAdapter]] = {
+    LocalDirectoryAdapter.name: LocalDirectoryAdapter,
+}
+
+
+def build_adapter(config: dict[str, Any]) -> SourceAdapter | None:
+    adapter_cls = ADAPTERS.get(str(config.get("adapter") or ""))
+    if adapter_cls is None:
+        return None
+    return adapter_cls(config)
+
+
+__all__ = ["ADAPTERS", "LocalDirectoryAdapter", "SourceAdapter", "build_adapter"]
@@ -0,0 +1,27 @@
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any
+
+
+class SourceAdapter(ABC):
+    """Reads per-term frequency counts from one external data source.
+
+    Adapters are built from ``data_sources.config_json`` and must be safe to call
+    from several threads at once, since ingestion fetches terms concurrently.
+    """
+
+    name = "base"
+
+    def __init__(self, config: dict[str, Any]):
+        self.config = config
+
+    @abstractmethod
+    def latest_date(self) -> date | None:
+        """Return the most recent date the source has data for."""
+
+    @abstractmethod
+    def fetch_counts(self, term: str, start: date, end: date) -> list[dict[str, Any]]:
+        """Return ``[{"t": date, "value": float}, ...]`` for ``start <= t <= end``."""
+
+    def close(self) -> None:
+        return None
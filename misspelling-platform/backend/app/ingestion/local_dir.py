@@ -0,0 +1,68 @@
+import csv
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from .base import SourceAdapter
+
+
+class LocalDirectoryAdapter(SourceAdapter):
+    """Offline stand-in for a remote source.
+
+    Expects one file per day named ``YYYY-MM-DD.csv`` (or ``.tsv``) under
+    ``config["path"]``, each with a ``term,count`` header.
+    """
+
+    name = "local_dir"
+
+    def __init__(self, config: dict[str, Any]):
+        super().__init__(config)
+        self.root = Path(config.get("path") or "/app/data/sources")
+        self._files: dict[date, Path] | None = None
+        self._cache: dict[date, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _index(self) -> dict[date, Path]:
+        if self._files is None:
+            files = {}
+            if self.root.is_dir():
+                for p in self.root.iterdir():
+                    if p.suffix not in (".csv", ".tsv"):
+                        continue
+                    try:
+                        files[date.fromisoformat(p.stem)] = p
+                    except ValueError:
+                        continue
+            self._files = files
+        return self._files
+
+    def _load_day(self, day: date) -> dict[str, float]:
+        cached = self._cache.get(day)
+        if cached is not None:
+            return cached
+        path = self._index()[day]
+        counts: dict[str, float] = {}
+        with path.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f, delimiter="\t" if path.suffix == ".tsv" else ",")
+            for row in reader:
+                term = (row.get("term") or "").strip().lower()
+                if not term:
+                    continue
+                counts[term] = counts.get(term, 0.0) + float(row.get("count") or 0)
+        with self._lock:
+            return self._cache.setdefault(day, counts)
+
+    def latest_date(self) -> date | None:
+        with self._lock:
+            days = self._index()
+        return max(days) if days else None
+
+    def fetch_counts(self, term: str, start: date, end: date) -> list[dict[str, Any]]:
+        with self._lock:
+            days = sorted(d for d in self._index() if start <= d <= end)
+        key = term.strip().lower()
+        return [{"t": d, "value": self._load_day(d).get(key, 0.0)} for d in days]
+
+    def close(self) -> None:
+        self._cache.clear()
@@ -1,13 +1,49 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from .api.routes_admin import router as admin_router
+from .api.routes_metrics import router as metrics_router
 from .api.routes_tasks import router as tasks_router
 from .api.routes_timeseries import router as timeseries_router
+from .db.core import (
+    dispose_async_engine,
+    get_async_engine,
+    get_async_read_engine,
+    get_engine,
+    get_read_engine,
+    init_embedded_db,
+)
+from .embedded import EMBEDDED_MODE, start_embedded, stop_embedded
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware, install_sql_capture
+from .services.cancellation_service import fail_interrupted_tasks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if EMBEDDED_MODE:
+        init_embedded_db()
+        fail_interrupted_tasks()
+        start_embedded()
+    yield
+    if EMBEDDED_MODE:
+        stop_embedded()
+    await dispose_async_engine()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Misspelling Platform API (MVP)")
+    app = FastAPI(title="Misspelling Platform API (MVP)", lifespan=lifespan)
     app.include_router(tasks_router)
     app.include_router(timeseries_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
+    install_sql_capture(get_engine())
+    install_sql_capture(get_async_engine().sync_engine)
+    install_sql_capture(get_read_engine())
+    install_sql_capture(get_async_read_engine().sync_engine)
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(MetricsMiddleware)
     return app
 
 
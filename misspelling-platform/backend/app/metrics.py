@@ -0,0 +1,182 @@
+"""Prometheus metrics shared by the API and the Celery worker.
+
+The API serves them on ``GET /metrics``; the worker runs a small exporter on
+``WORKER_METRICS_PORT``. With a prefork worker set ``PROMETHEUS_MULTIPROC_DIR`` so
+child processes write to shared files the exporter can aggregate.
+"""
+import functools
+import inspect
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from .embedded import EMBEDDED_MODE, local_queue_depth
+from .redis_client import get_broker_redis
+
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_TASK_BUCKETS = (0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=_FAST_BUCKETS,
+)
+DB_CALL_SECONDS = Histogram(
+    "db_repo_call_duration_seconds",
+    "Wall time of app.db repository functions (connection checkout included)",
+    ["function"],
+    buckets=_FAST_BUCKETS,
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a SQLAlchemy pool connection",
+    buckets=_FAST_BUCKETS,
+)
+TASK_LIFECYCLE_SECONDS = Histogram(
+    "task_lifecycle_duration_seconds",
+    "Time between task lifecycle transitions (QUEUED->RUNNING is queue wait)",
+    ["task_type", "from_state", "to_state"],
+    buckets=_TASK_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "task_admission_rejections_total",
+    "Task creations refused by admission control",
+    ["task_type", "reason"],
+)
+RENDER_SECONDS = Histogram(
+    "matplotlib_render_duration_seconds",
+    "Time to render and save a chart",
+    ["chart"],
+    buckets=_TASK_BUCKETS,
+)
+
+
+def timed_repo(fn):
+    """Observe the wall time of a repository function under ``<module>.<function>``."""
+    child = DB_CALL_SECONDS.labels(function=f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}")
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def observe_task_transition(task_type: str, from_state: str, to_state: str, seconds: float) -> None:
+    if seconds >= 0:
+        TASK_LIFECYCLE_SECONDS.labels(task_type=task_type, from_state=from_state, to_state=to_state).observe(seconds)
+
+
+class _RuntimeCollector:
+    """Scrape-time gauges: SQLAlchemy pool usage and Celery queue depth in Redis."""
+
+    def describe(self):
+        # registration calls this instead of collect(), which would import db.core mid-import
+        yield GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out")
+        yield GaugeMetricFamily("db_pool_size", "Configured pool size")
+        yield GaugeMetricFamily("celery_queue_depth", "Messages waiting in the broker queue", labels=["queue"])
+
+    def collect(self):
+        from .db.core import get_engine
+
+        pool = get_engine().pool
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out")
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size")
+        if hasattr(pool, "checkedout"):
+            checked_out.add_metric([], pool.checkedout())
+            size.add_metric([], pool.size())
+        yield checked_out
+        yield size
+
+        depth = GaugeMetricFamily("celery_queue_depth", "Messages waiting in the broker queue", labels=["queue"])
+        client = get_broker_redis()
+        if EMBEDDED_MODE:
+            depth.add_metric(["embedded"], local_queue_depth())
+        elif client is not None:
+            for queue in os.getenv("CELERY_QUEUES", "celery").split(","):
+                try:
+                    depth.add_metric([queue], client.llen(queue))
+                except Exception:
+                    continue
+        yield depth
+
+
+_runtime_collector = _RuntimeCollector()
+REGISTRY.register(_runtime_collector)
+
+
+def _multiprocess_registry() -> CollectorRegistry | None:
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return None
+    from prometheus_client import multiprocess
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_runtime_collector)
+    return registry
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(_multiprocess_registry() or REGISTRY), CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter() -> None:
+    port = int(os.getenv("WORKER_METRICS_PORT", "9808"))
+    if port > 0:
+        start_http_server(port, registry=_multiprocess_registry() or REGISTRY)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency labelled with the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            ).observe(time.perf_counter() - started)
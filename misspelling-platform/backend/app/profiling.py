@@ -0,0 +1,292 @@
+"""Opt-in request/task profiling and slow-query capture.
+
+Every API request and Celery task runs inside a lightweight :class:`Capture` that only
+records executed SQL statements with their timings. A stack-sampling profiler is added
+when profiling is requested (``X-Profile: 1`` header, ``PROFILE_SAMPLE_RATE`` for
+requests, ``profile`` enqueue header or ``PROFILE_TASK_SAMPLE_RATE`` for tasks).
+Profiled runs, and runs that are slow or executed a slow statement, are saved: task
+captures as artifacts via ``register_artifact``, request captures in ``request_profiles``.
+"""
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TASK_SAMPLE_RATE = float(os.getenv("PROFILE_TASK_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_TASK_MS = float(os.getenv("SLOW_TASK_MS", "60000"))
+MAX_SQL_RECORDS = 500
+MAX_STACKS = 50
+
+PROFILE_KINDS = ("profile", "slow-query", "slow-request", "slow-task")
+
+_APP_DIR = str(Path(__file__).resolve().parent)
+_current: ContextVar["Capture | None"] = ContextVar("profiling_capture", default=None)
+
+
+class StackSampler:
+    """Samples the Python stacks of the threads ``owns`` accepts every ``interval`` seconds and folds them.
+
+    Only stacks that pass through ``app/`` are kept so library internals waiting on I/O do not
+    drown the run being profiled.
+    """
+
+    def __init__(self, interval: float, owns: Callable[[int], bool]):
+        self.interval = interval
+        self.owns = owns
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if not self.owns(ident):
+                    continue
+                names = []
+                in_app = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(_APP_DIR)
+                    names.append(f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}")
+                    frame = frame.f_back
+                if in_app:
+                    self.stacks[";".join(reversed(names))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1)
+
+
+class Capture:
+    """One request or task run.
+
+    The sampler only looks at threads working for this run: the thread that started it, except that
+    an event-loop thread counts only while it is running the starting asyncio task (other requests
+    share the loop), plus threads lent to the run through :func:`capture_thread`.
+    """
+
+    def __init__(self, kind: str, name: str, profile: bool = False):
+        self.kind = kind
+        self.name = name
+        self.profile = profile
+        self.sql: list[dict[str, Any]] = []
+        self.sql_total = 0
+        self.sql_ms = 0.0
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.duration_ms = 0.0
+        self.threads = {threading.get_ident()}
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.current_task()
+            self._loop_thread = threading.get_ident()
+        except RuntimeError:
+            self._loop = self._task = self._loop_thread = None
+        self._sampler = StackSampler(PROFILE_INTERVAL_MS / 1000.0, self.owns_thread).start() if profile else None
+
+    def owns_thread(self, ident: int) -> bool:
+        if ident not in self.threads:
+            return False
+        if ident == self._loop_thread:
+            # read from the sampler thread; a switch right after the snapshot costs one stray sample
+            return asyncio.current_task(self._loop) is self._task
+        return True
+
+    def record_sql(self, statement: str, ms: float, rowcount: int) -> None:
+        self.sql_total += 1
+        self.sql_ms += ms
+        if len(self.sql) < MAX_SQL_RECORDS:
+            self.sql.append({"sql": " ".join(statement.split())[:1000], "ms": round(ms, 3), "rows": rowcount})
+
+    def finish(self) -> "Capture":
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if self._sampler is not None:
+            self._sampler.stop()
+        return self
+
+    @property
+    def slow_queries(self) -> list[dict[str, Any]]:
+        return [q for q in self.sql if q["ms"] >= SLOW_QUERY_MS]
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "kind": self.kind,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "sql_count": self.sql_total,
+            "sql_ms": round(self.sql_ms, 3),
+            "slow_query_ms": SLOW_QUERY_MS,
+            "slow_queries": self.slow_queries,
+            "sql": self.sql,
+            **extra,
+        }
+        if self._sampler is not None:
+            out["profile"] = {
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": self._sampler.samples,
+                "stacks": [
+                    {"stack": stack, "count": count}
+                    for stack, count in self._sampler.stacks.most_common(MAX_STACKS)
+                ],
+            }
+        return out
+
+
+def start_capture(kind: str, name: str, profile: bool = False):
+    capture = Capture(kind, name, profile)
+    return capture, _current.set(capture)
+
+
+def stop_capture(capture: Capture, token) -> Capture:
+    _current.reset(token)
+    return capture.finish()
+
+
+@contextmanager
+def capture_thread():
+    """Count the current thread as the current capture's while inside (a pool thread doing its work)."""
+    capture = _current.get()
+    ident = threading.get_ident()
+    if capture is None or ident in capture.threads:
+        yield
+        return
+    capture.threads.add(ident)
+    try:
+        yield
+    finally:
+        capture.threads.discard(ident)
+
+
+class ProfiledRoute(APIRoute):
+    """Route class that lends the threadpool thread running a sync endpoint to the request's capture."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        # include_router re-creates each route from the already wrapped endpoint
+        if not asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "_capture_thread", False):
+            endpoint = _in_capture_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _in_capture_thread(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(endpoint)
+    def run(*args: Any, **kwargs: Any) -> Any:
+        with capture_thread():
+            return endpoint(*args, **kwargs)
+
+    run._capture_thread = True
+    return run
+
+
+def should_profile_request(header_value: str | None) -> bool:
+    if header_value and header_value.strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def should_profile_task(requested: Any) -> bool:
+    if requested in (True, 1, "1", "true"):
+        return True
+    return PROFILE_TASK_SAMPLE_RATE > 0 and random.random() < PROFILE_TASK_SAMPLE_RATE
+
+
+def capture_kind(capture: Capture, slow_ms: float, slow_kind: str) -> str | None:
+    """Which artifact kind (if any) a finished capture should be saved as."""
+    if capture.profile:
+        return "profile"
+    if capture.duration_ms >= slow_ms:
+        return slow_kind
+    if capture.slow_queries:
+        return "slow-query"
+    return None
+
+
+def install_sql_capture(engine) -> None:
+    if getattr(engine, "_profiling_installed", False):
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profiling_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        capture = _current.get()
+        if capture is None:
+            return
+        stack = conn.info.get("profiling_t0")
+        if not stack:
+            return
+        ms = (time.perf_counter() - stack.pop()) * 1000
+        capture.record_sql(statement, ms, getattr(cursor, "rowcount", -1))
+
+    engine._profiling_installed = True
+
+
+class ProfilingMiddleware:
+    """ASGI middleware wrapping each request in a capture and saving profiled or slow ones."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope.get("headers") or []).get(b"x-profile")
+        capture, token = start_capture(
+            "request",
+            f"{scope['method']} {scope['path']}",
+            should_profile_request(header.decode("latin-1") if header else None),
+        )
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_capture(capture, token)
+            kind = capture_kind(capture, SLOW_REQUEST_MS, "slow-request")
+            if kind is not None:
+                from starlette.concurrency import run_in_threadpool
+
+                from .services.profiling_service import save_request_capture
+
+                route = scope.get("route")
+                meta = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status_code": status["code"],
+                }
+                try:
+                    await run_in_threadpool(save_request_capture, capture, kind, meta)
+                except Exception:
+                    pass
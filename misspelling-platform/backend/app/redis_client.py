@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from .embedded import EMBEDDED_MODE
+
+REDIS_URL = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL", "")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+
+_clients: dict = {}
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+class LocalRedis:
+    """In-process stand-in for the Redis commands used by coordination keys (embedded mode).
+
+    Values come back as bytes, like redis-py without ``decode_responses``.
+    """
+
+    def __init__(self):
+        self._data: dict[str, object] = {}
+        self._expires: dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _alive(self, key: str) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def exists(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._alive(key))
+
+    def get(self, key: str):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = _encode(value)
+            self._expires.pop(key, None)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            deleted = sum(1 for key in keys if self._alive(key))
+            for key in keys:
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return deleted
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expires[key] = time.monotonic() + seconds
+            return True
+
+    def hset(self, key: str, mapping: dict) -> int:
+        with self._lock:
+            current = self._data.get(key) if self._alive(key) else None
+            if not isinstance(current, dict):
+                current = self._data[key] = {}
+            added = sum(1 for field in mapping if _encode(field) not in current)
+            current.update({_encode(field): _encode(value) for field, value in mapping.items()})
+            return added
+
+    def hgetall(self, key: str) -> dict[bytes, bytes]:
+        with self._lock:
+            current = self._data.get(key) if self._alive(key) else None
+            return dict(current) if isinstance(current, dict) else {}
+
+    def pipeline(self, transaction: bool = True) -> "_LocalPipeline":
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    def __init__(self, client: LocalRedis):
+        self._client = client
+        self._calls: list = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> list:
+        calls, self._calls = self._calls, []
+        with self._client._lock:
+            return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+_local = LocalRedis()
+
+
+def _client_for(url: str):
+    if not urlparse(url).scheme.startswith("redis"):
+        return None
+    if url not in _clients:
+        import redis
+
+        _clients[url] = redis.Redis.from_url(
+            url, socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+        )
+    return _clients[url]
+
+
+def get_redis():
+    """Shared Redis client for task coordination keys, or ``None`` when no Redis URL is configured.
+
+    In embedded mode without a Redis URL the keys live in process memory (:class:`LocalRedis`).
+    """
+    if EMBEDDED_MODE and not REDIS_URL:
+        return _local
+    return _client_for(REDIS_URL)
+
+
+def get_broker_redis():
+    """Client for the Celery broker database (queue lengths), or ``None`` for a non-Redis broker."""
+    return _client_for(os.getenv("CELERY_BROKER_URL", ""))
@@ -0,0 +1,97 @@
+"""JSON encoding shared by the API, services and the worker.
+
+JSON columns (``params_json``, ``result_json``, ``meta_json``) are written once through
+:func:`dumps`, so a stored value is always canonical single-encoded JSON. Reads that only
+forward a column to the client wrap it in :func:`raw_json`; :class:`FastJSONResponse`
+then splices the stored text into the response body without decoding it.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _default_str(value: Any) -> Any:
+    try:
+        return _default(value)
+    except TypeError:
+        return str(value)
+
+
+def dumps_bytes(value: Any, *, lenient: bool = False) -> bytes:
+    return orjson.dumps(value, default=_default_str if lenient else _default, option=_OPTIONS)
+
+
+def dumps(value: Any, *, lenient: bool = False) -> str:
+    """Encode ``value`` for a JSON column; already-encoded JSON text is stored as-is, never re-quoted."""
+    if isinstance(value, (str, bytes)):
+        value = normalize_jsonish(value)
+    return dumps_bytes(value, lenient=lenient).decode("utf-8")
+
+
+def loads(value: str | bytes) -> Any:
+    return orjson.loads(value)
+
+
+def _looks_like_json(text_value: str) -> bool:
+    return text_value.startswith("{") or text_value.startswith("[")
+
+
+def normalize_jsonish(value: Any) -> Any:
+    """Decode a stored JSON column, tolerating legacy double-encoded rows."""
+    if value is None or isinstance(value, (dict, list, int, float, bool)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        try:
+            value = bytes(value).decode("utf-8")
+        except UnicodeDecodeError:
+            return str(value)
+    if not isinstance(value, str):
+        return str(value)
+    text_value = value.strip()
+    # one decode for canonical rows, a second one only for rows written before the migration
+    for _ in range(2):
+        if not _looks_like_json(text_value) and not text_value.startswith('"'):
+            break
+        try:
+            decoded = orjson.loads(text_value)
+        except orjson.JSONDecodeError:
+            break
+        if isinstance(decoded, str):
+            text_value = decoded.strip()
+            continue
+        return decoded
+    return text_value
+
+
+def raw_json(value: Any) -> Any:
+    """Pass a stored JSON column through to :class:`FastJSONResponse` without decoding it.
+
+    Only values that are a JSON object or array are spliced verbatim; anything else (a legacy
+    double-encoded string, plain text) falls back to :func:`normalize_jsonish`.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        value = bytes(value).decode("utf-8", "replace")
+    if isinstance(value, str) and _looks_like_json(value.lstrip()):
+        return orjson.Fragment(value)
+    return normalize_jsonish(value)
+
+
+class FastJSONResponse(Response):
+    """orjson response; return it directly from a route so FastAPI skips ``jsonable_encoder``."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content, lenient=True)
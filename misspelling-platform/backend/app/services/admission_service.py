@@ -0,0 +1,210 @@
+"""Admission control for task creation: token buckets in Redis plus a broker queue-depth guard.
+
+Each request costs tokens from two buckets, the caller's and a global one. The caller is an
+authenticated user when the route has one, otherwise the client IP; client-supplied headers never
+pick the bucket or the admin tier. A Lua script refills both buckets from Redis ``TIME`` and deducts
+the cost only if both can pay, so concurrent API processes cannot overspend. Simulations cost
+``n * steps / SIMULATION_COST_UNIT`` tokens, capped at the bucket burst. Once the broker queue passes
+``ADMISSION_MAX_QUEUE_DEPTH`` new work is refused, and expensive requests are refused earlier, at
+``ADMISSION_EXPENSIVE_QUEUE_FRACTION`` of the limit. Cheap work keeps flowing while heavy work backs off.
+
+Admission fails open: without Redis, or on a Redis error, the request is admitted. In embedded mode
+the buckets live in process memory and the queue depth is the local executor's backlog.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from ..db.users_repo import get_user_by_username
+from ..embedded import EMBEDDED_MODE, local_queue_depth
+from ..metrics import ADMISSION_REJECTIONS
+from ..redis_client import LocalRedis, get_broker_redis, get_redis
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "2"))  # tokens per second
+USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "20"))
+ADMIN_MULTIPLIER = float(os.getenv("ADMISSION_ADMIN_MULTIPLIER", "5"))
+ANON_RATE = float(os.getenv("ADMISSION_ANON_RATE", "1"))
+ANON_BURST = float(os.getenv("ADMISSION_ANON_BURST", "10"))
+GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "50"))
+GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "200"))
+SIMULATION_COST_UNIT = float(os.getenv("SIMULATION_COST_UNIT", "100000"))
+ADMISSION_QUEUE = os.getenv("ADMISSION_QUEUE", "celery")
+MAX_QUEUE_DEPTH = int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "1000"))
+EXPENSIVE_QUEUE_FRACTION = float(os.getenv("ADMISSION_EXPENSIVE_QUEUE_FRACTION", "0.5"))
+QUEUE_RETRY_SECONDS = int(os.getenv("ADMISSION_QUEUE_RETRY_SECONDS", "5"))
+QUEUE_DEPTH_CACHE_SECONDS = float(os.getenv("ADMISSION_QUEUE_DEPTH_CACHE_SECONDS", "1"))
+USER_CACHE_SECONDS = float(os.getenv("ADMISSION_USER_CACHE_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.getenv("ADMISSION_USER_CACHE_SIZE", "1024"))
+LOCAL_BUCKETS_MAX = int(os.getenv("ADMISSION_LOCAL_BUCKETS_MAX", "10000"))
+
+USER_BUCKET_KEY = "admission:user:{username}"
+CLIENT_BUCKET_KEY = "admission:client:{client_ip}"
+ANON_BUCKET_KEY = "admission:anon"
+GLOBAL_BUCKET_KEY = "admission:global"
+
+# KEYS: caller bucket, global bucket. ARGV: caller rate, caller burst, global rate, global burst, cost, ttl.
+# Returns {1, "0"} when admitted, else {0, "<seconds until both buckets can pay>"}.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cost = tonumber(ARGV[5])
+local function level(key, rate, burst)
+  local b = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(b[1]) or burst
+  local ts = tonumber(b[2]) or now
+  return math.min(burst, tokens + math.max(0, now - ts) * rate)
+end
+local rates = {tonumber(ARGV[1]), tonumber(ARGV[3])}
+local levels = {level(KEYS[1], rates[1], tonumber(ARGV[2])), level(KEYS[2], rates[2], tonumber(ARGV[4]))}
+local wait = 0
+for i = 1, 2 do
+  if levels[i] < cost then
+    wait = math.max(wait, (cost - levels[i]) / rates[i])
+  end
+end
+if wait > 0 then
+  return {0, tostring(wait)}
+end
+for i = 1, 2 do
+  redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[i], ARGV[6])
+end
+return {1, '0'}
+"""
+
+_script = None
+# both caches are LRU-bounded: the bucket map gains an entry per client IP in embedded mode
+_users: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+_users_lock = threading.Lock()
+_queue_depth: tuple[float, int | None] = (0.0, None)
+_local_buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def task_cost(task_type: str, params: dict[str, Any]) -> float:
+    if task_type == "simulation-run":
+        return max(1.0, int(params.get("n", 0)) * int(params.get("steps", 0)) / SIMULATION_COST_UNIT)
+    return 1.0
+
+
+def _lookup_user(username: str):
+    now = time.monotonic()
+    with _users_lock:
+        cached = _users.get(username)
+        if cached is not None and cached[0] > now:
+            _users.move_to_end(username)
+            return cached[1]
+    row = get_user_by_username(username)
+    user = dict(row) if row is not None else None
+    with _users_lock:
+        _users[username] = (now + USER_CACHE_SECONDS, user)
+        _users.move_to_end(username)
+        while len(_users) > USER_CACHE_SIZE:
+            _users.popitem(last=False)
+    return user
+
+
+def _caller_bucket(client_ip: str | None, username: str | None) -> tuple[str, float, float] | dict[str, Any]:
+    user = _lookup_user(username) if username else None
+    if user is None:
+        if client_ip:
+            return CLIENT_BUCKET_KEY.format(client_ip=client_ip), ANON_RATE, ANON_BURST
+        return ANON_BUCKET_KEY, ANON_RATE, ANON_BURST
+    if not user["is_active"]:
+        return {"status_code": 403, "error": "user is inactive", "reason": "inactive_user"}
+    scale = ADMIN_MULTIPLIER if user["is_admin"] else 1.0
+    return USER_BUCKET_KEY.format(username=user["username"]), USER_RATE * scale, USER_BURST * scale
+
+
+def _current_queue_depth() -> int | None:
+    global _queue_depth
+    now = time.monotonic()
+    if _queue_depth[0] > now:
+        return _queue_depth[1]
+    if EMBEDDED_MODE:
+        depth = local_queue_depth()
+    else:
+        depth = None
+        client = get_broker_redis()
+        if client is not None:
+            try:
+                depth = int(client.llen(ADMISSION_QUEUE))
+            except Exception:
+                depth = None
+    _queue_depth = (now + QUEUE_DEPTH_CACHE_SECONDS, depth)
+    return depth
+
+
+def _take_local_tokens(keys: list[str], rates: list[float], bursts: list[float], cost: float) -> float:
+    """TOKEN_BUCKET_LUA for the in-process store: same refill and all-or-nothing deduction."""
+    with _local_lock:
+        now = time.monotonic()
+        levels = []
+        for key, rate, burst in zip(keys, rates, bursts):
+            tokens, ts = _local_buckets.get(key, (burst, now))
+            levels.append(min(burst, tokens + max(0.0, now - ts) * rate))
+        wait = max(((cost - level) / rate for level, rate in zip(levels, rates) if level < cost), default=0.0)
+        if wait > 0:
+            return wait
+        for key, level in zip(keys, levels):
+            _local_buckets[key] = (level - cost, now)
+            _local_buckets.move_to_end(key)
+        while len(_local_buckets) > LOCAL_BUCKETS_MAX:
+            _local_buckets.popitem(last=False)
+        return 0.0
+
+
+def _take_tokens(bucket: tuple[str, float, float], cost: float) -> float:
+    """Seconds to wait before retrying, 0.0 when the tokens were taken."""
+    global _script
+    client = get_redis()
+    if client is None:
+        return 0.0
+    key, rate, burst = bucket
+    cost = min(cost, burst, GLOBAL_BURST)
+    if isinstance(client, LocalRedis):
+        return _take_local_tokens([key, GLOBAL_BUCKET_KEY], [rate, GLOBAL_RATE], [burst, GLOBAL_BURST], cost)
+    ttl = int(math.ceil(max(burst / rate, GLOBAL_BURST / GLOBAL_RATE))) + 60
+    try:
+        if _script is None:
+            _script = client.register_script(TOKEN_BUCKET_LUA)
+        allowed, wait = _script(
+            keys=[key, GLOBAL_BUCKET_KEY], args=[rate, burst, GLOBAL_RATE, GLOBAL_BURST, cost, ttl]
+        )
+    except Exception:
+        return 0.0
+    return 0.0 if int(allowed) else float(wait)
+
+
+def _rejected(task_type: str, reason: str, error: str, retry_after: float) -> dict[str, Any]:
+    ADMISSION_REJECTIONS.labels(task_type=task_type, reason=reason).inc()
+    return {"status_code": 429, "error": error, "reason": reason, "retry_after": max(1, math.ceil(retry_after))}
+
+
+def admit_task(
+    client_ip: str | None, task_type: str, params: dict[str, Any], username: str | None = None
+) -> dict[str, Any] | None:
+    """``None`` when the task may be enqueued, otherwise the rejection (``status_code``, ``error``, ...).
+
+    ``username`` must come from authentication, never from a request header or parameter.
+    """
+    if not ADMISSION_ENABLED:
+        return None
+    bucket = _caller_bucket(client_ip, username)
+    if isinstance(bucket, dict):
+        ADMISSION_REJECTIONS.labels(task_type=task_type, reason=bucket["reason"]).inc()
+        return bucket
+    cost = task_cost(task_type, params)
+    depth = _current_queue_depth()
+    if depth is not None:
+        limit = MAX_QUEUE_DEPTH * (EXPENSIVE_QUEUE_FRACTION if cost > 1 else 1.0)
+        if depth >= limit:
+            return _rejected(task_type, "queue_depth", "task queue is full", QUEUE_RETRY_SECONDS)
+    wait = _take_tokens(bucket, cost)
+    if wait > 0:
+        return _rejected(task_type, "rate_limit", "rate limit exceeded", wait)
+    return None
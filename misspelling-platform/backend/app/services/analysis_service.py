@@ -0,0 +1,221 @@
+from datetime import date, timedelta
+from typing import Any
+
+import numpy as np
+
+from ..db.time_series_repo import list_task_variant_points, replace_task_series
+
+RATIO_VARIANT = "misspelling_ratio"
+ROLLING_WINDOW = 7
+MIN_CHANGEPOINT_SEGMENT = 3
+
+_EPOCH = date(1970, 1, 1)
+
+
+def load_variant_arrays(task_ids: list[str]) -> dict[str, Any]:
+    """Load every variant series of ``task_ids`` into one aligned ``(tasks, variants, days)`` array.
+
+    ``correct`` sorts first and misspellings follow in name order; ``correct_slot`` holds the
+    slot of each task's ``correct`` series, or -1 when the task has none. Missing days and
+    missing variants are 0 in ``values`` and False in ``present``.
+    """
+    rows = list_task_variant_points(task_ids, exclude_variants=(RATIO_VARIANT,))
+    tasks = list(dict.fromkeys(task_ids))
+    task_index = {t: i for i, t in enumerate(tasks)}
+    variants_by_task: dict[str, list[str]] = {t: [] for t in tasks}
+    series_meta: dict[str, dict[str, int]] = {}
+    for r in rows:
+        names = variants_by_task[r.task_id]
+        if r.variant not in names:
+            names.append(r.variant)
+            series_meta.setdefault(r.task_id, {"term_id": int(r.term_id), "source_id": int(r.source_id)})
+    for names in variants_by_task.values():
+        names.sort(key=lambda v: (v != "correct", v))
+    width = max([len(v) for v in variants_by_task.values()] + [1])
+    slot = {(t, v): i for t, names in variants_by_task.items() for i, v in enumerate(names)}
+    correct_slot = np.array([slot.get((t, "correct"), -1) for t in tasks], dtype=np.int64)
+
+    if rows:
+        task_idx = np.fromiter((task_index[r.task_id] for r in rows), dtype=np.int64, count=len(rows))
+        var_idx = np.fromiter((slot[(r.task_id, r.variant)] for r in rows), dtype=np.int64, count=len(rows))
+        day_ord = np.fromiter(((r._mapping["t"] - _EPOCH).days for r in rows), dtype=np.int64, count=len(rows))
+        vals = np.fromiter((float(r.value) for r in rows), dtype=np.float64, count=len(rows))
+        days, day_idx = np.unique(day_ord, return_inverse=True)
+    else:
+        task_idx = var_idx = day_idx = days = np.zeros(0, dtype=np.int64)
+        vals = np.zeros(0, dtype=np.float64)
+
+    values = np.zeros((len(tasks), width, len(days)), dtype=np.float64)
+    present = np.zeros(values.shape, dtype=bool)
+    values[task_idx, var_idx, day_idx] = vals
+    present[task_idx, var_idx, day_idx] = True
+    return {
+        "tasks": tasks,
+        "variants": variants_by_task,
+        "series_meta": series_meta,
+        "correct_slot": correct_slot,
+        "days": days,
+        "values": values,
+        "present": present,
+    }
+
+
+def _nanmean(x: np.ndarray, axis: int = -1, keepdims: bool = False) -> np.ndarray:
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=axis, keepdims=keepdims)
+    total = np.where(valid, x, 0.0).sum(axis=axis, keepdims=keepdims)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / n
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last axis, ignoring NaN; NaN until ``window`` values are seen."""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=-1)
+    ccnt = np.cumsum(valid, axis=-1)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    csum = np.concatenate([pad, csum], axis=-1)
+    ccnt = np.concatenate([pad, ccnt], axis=-1)
+    lo = np.maximum(np.arange(x.shape[-1]) + 1 - window, 0)
+    hi = np.arange(x.shape[-1]) + 1
+    n = ccnt[..., hi] - ccnt[..., lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (csum[..., hi] - csum[..., lo]) / n
+    out[n < min(window, x.shape[-1])] = np.nan
+    return out
+
+
+def trend_slope(y: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row (units per day), ignoring NaN."""
+    valid = ~np.isnan(y)
+    x = np.broadcast_to(np.arange(y.shape[-1], dtype=np.float64), y.shape)
+    n = valid.sum(axis=-1)
+    yv = np.where(valid, y, 0.0)
+    xv = np.where(valid, x, 0.0)
+    sx, sy = xv.sum(axis=-1), yv.sum(axis=-1)
+    sxx, sxy = (xv * xv).sum(axis=-1), (xv * yv).sum(axis=-1)
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / denom
+    slope[(n < 2) | (denom == 0)] = np.nan
+    return slope
+
+
+def mean_shift_changepoint(y: np.ndarray, min_segment: int = MIN_CHANGEPOINT_SEGMENT) -> dict[str, np.ndarray]:
+    """Best single mean-shift split per row (max between-segment sum of squares)."""
+    rows, length = y.shape
+    if length < 2:
+        empty = np.full(rows, np.nan)
+        return {"index": np.full(rows, -1), "before": empty, "after": empty, "score": empty}
+    filled = np.where(np.isnan(y), np.nan_to_num(_nanmean(y, keepdims=True)), y)
+    csum = np.cumsum(filled, axis=-1)
+    k = np.arange(1, length, dtype=np.float64)
+    before = csum[:, :-1] / k
+    after = (csum[:, -1:] - csum[:, :-1]) / (length - k)
+    score = k * (length - k) / length * (after - before) ** 2
+    score[:, (k < min_segment) | (length - k < min_segment)] = -np.inf
+    best = np.argmax(score, axis=-1)[:, None]
+    ok = np.take_along_axis(score, best, axis=-1)[:, 0] > 0
+
+    def pick(a: np.ndarray) -> np.ndarray:
+        return np.where(ok, np.take_along_axis(a, best, axis=-1)[:, 0], np.nan)
+
+    return {
+        "index": np.where(ok, best[:, 0] + 1, -1),
+        "before": pick(before),
+        "after": pick(after),
+        "score": pick(score),
+    }
+
+
+def _day(ordinal) -> date:
+    return _EPOCH + timedelta(days=int(ordinal))
+
+
+def _as_float(x) -> float | None:
+    x = float(x)
+    return None if np.isnan(x) else round(x, 6)
+
+
+def compute_misspelling_metrics(arrays: dict[str, Any], window: int = ROLLING_WINDOW) -> dict[str, dict[str, Any]]:
+    values, present, days = arrays["values"], arrays["present"], arrays["days"]
+    correct_slot = arrays["correct_slot"]
+    total = values.sum(axis=1)
+    observed = present.any(axis=1)
+    # a task without a correct series has no baseline, so its ratio stays NaN rather than 1.0
+    misspelled = np.arange(values.shape[1])[None, :] != correct_slot[:, None]
+    has_correct = (correct_slot >= 0)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(observed[:, None, :] & (total[:, None, :] > 0), values / total[:, None, :], np.nan)
+    ratio = np.where(
+        has_correct & observed & (total > 0),
+        (values * misspelled[:, :, None]).sum(axis=1) / np.where(total > 0, total, 1),
+        np.nan,
+    )
+    rolling = rolling_mean(ratio, window)
+    slope = trend_slope(ratio)
+    change = mean_shift_changepoint(ratio)
+    mean_share = _nanmean(share)
+    mean_ratio = _nanmean(ratio)
+
+    out: dict[str, dict[str, Any]] = {}
+    for i, task_id in enumerate(arrays["tasks"]):
+        names = arrays["variants"][task_id]
+        valid_days = np.flatnonzero(~np.isnan(ratio[i]))
+        if not names or valid_days.size == 0:
+            error = "no correct series" if names and correct_slot[i] < 0 else "no series data"
+            out[task_id] = {"days": 0, "variants": {}, "ratio": [], "error": error}
+            continue
+        first, last = valid_days[0], valid_days[-1]
+        cp = int(change["index"][i])
+        out[task_id] = {
+            "days": int(valid_days.size),
+            "window": [str(_day(days[first])), str(_day(days[last]))],
+            "variants": {name: {"mean_share": _as_float(mean_share[i, j])} for j, name in enumerate(names)},
+            "misspelling_ratio": {
+                "mean": _as_float(mean_ratio[i]),
+                "last": _as_float(ratio[i, last]),
+                "rolling_window": window,
+                "rolling_last": _as_float(rolling[i, last]),
+            },
+            "trend": {"slope_per_day": _as_float(slope[i])},
+            "changepoint": None
+            if cp < 0
+            else {
+                "date": str(_day(days[cp])),
+                "before_mean": _as_float(change["before"][i]),
+                "after_mean": _as_float(change["after"][i]),
+                "shift": _as_float(change["after"][i] - change["before"][i]),
+            },
+            "ratio": [{"t": _day(days[d]), "value": float(ratio[i, d])} for d in valid_days],
+        }
+    return out
+
+
+def _persist_ratio_series(task_id: str, task_type: str, meta: dict[str, int], points: list[dict[str, Any]]) -> int:
+    return replace_task_series(
+        task_id,
+        RATIO_VARIANT,
+        term_id=meta["term_id"],
+        source_id=meta["source_id"],
+        granularity="day",
+        units="ratio",
+        meta={"derived": True, "task_type": task_type},
+        points=points,
+    )
+
+
+def run_misspelling_analysis(task_ids: list[str], task_type: str = "word-analysis") -> dict[str, dict[str, Any]]:
+    """Analyse a batch of tasks with one load query and vectorized metrics.
+
+    Writes (or replaces) a derived ``misspelling_ratio`` series per task and returns
+    the ``result_json``-ready metrics keyed by task id.
+    """
+    arrays = load_variant_arrays(task_ids)
+    metrics = compute_misspelling_metrics(arrays)
+    for task_id, result in metrics.items():
+        points = result.pop("ratio")
+        meta = arrays["series_meta"].get(task_id)
+        if points and meta:
+            result["ratio_series_id"] = _persist_ratio_series(task_id, task_type, meta, points)
+    return metrics
@@ -1,10 +1,26 @@
-import json
 import csv
+import mimetypes
+import os
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import BinaryIO, Iterator
+from uuid import uuid4
 
-from ..db.task_artifacts_repo import list_artifacts, upsert_artifact
+from ..artifact_store import blob_key, decode_stream, encode_blob, get_artifact_store
+from ..db.task_artifacts_repo import get_artifact, list_artifacts, referenced_paths, upsert_artifact
+from ..metrics import RENDER_SECONDS
+from ..redis_client import get_redis
+from ..serialization import dumps, loads
 
 OUTPUT_ROOT = Path("/app/outputs")
+BLOB_LOCK_SECONDS = int(os.getenv("ARTIFACT_BLOB_LOCK_SECONDS", "30"))
+BLOB_LOCK_KEY = "artifact:blob:lock:{key}"
+BLOB_LOCK_POLL_SECONDS = 0.05
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+_local_blob_lock = threading.Lock()
 
 
 def build_output_dir(task_id: str) -> Path:
@@ -34,17 +50,81 @@ def write_simulation_preview_png(series: list[dict], out_png: Path) -> None:
     y_correct = [row["correct"] for row in series]
     y_errors = [row["errors"] for row in series]
 
-    fig, ax = plt.subplots(figsize=(6, 3))
-    ax.plot(x, y_correct, label="correct", linewidth=2)
-    ax.plot(x, y_errors, label="errors", linewidth=1.5)
-    ax.set_xlabel("step")
-    ax.set_ylabel("value")
-    ax.set_title("Simulation Preview")
-    ax.legend(loc="best")
-    ax.grid(alpha=0.25)
-    fig.tight_layout()
-    fig.savefig(out_png, format="png", dpi=120)
-    plt.close(fig)
+    with RENDER_SECONDS.labels(chart="simulation_preview").time():
+        fig, ax = plt.subplots(figsize=(6, 3))
+        ax.plot(x, y_correct, label="correct", linewidth=2)
+        ax.plot(x, y_errors, label="errors", linewidth=1.5)
+        ax.set_xlabel("step")
+        ax.set_ylabel("value")
+        ax.set_title("Simulation Preview")
+        ax.legend(loc="best")
+        ax.grid(alpha=0.25)
+        fig.tight_layout()
+        fig.savefig(out_png, format="png", dpi=120)
+        plt.close(fig)
+
+
+@contextmanager
+def blob_lock(key: str):
+    """Hold the lock of one blob while its reference is written or its deletion is decided.
+
+    Without it ``release_blobs`` could find no reference, a task could then reuse the existing blob and
+    write its row, and the delete would leave that row pointing at nothing. The lock is a Redis key when
+    Redis is configured (API and workers on several hosts), otherwise a process-local lock.
+    """
+    client = get_redis()
+    if client is None:
+        with _local_blob_lock:
+            yield
+        return
+    lock_key = BLOB_LOCK_KEY.format(key=key)
+    token = uuid4().hex
+    # a holder that died lets go after BLOB_LOCK_SECONDS, so waiting that long always succeeds
+    deadline = time.monotonic() + BLOB_LOCK_SECONDS + 1
+    while not client.set(lock_key, token, ex=BLOB_LOCK_SECONDS, nx=True):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"blob lock busy: {key}")
+        time.sleep(BLOB_LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        # only release our own lock, not one taken over after ours expired
+        if client.get(lock_key) == token.encode():
+            client.delete(lock_key)
+
+
+def store_blob(key: str, stored: bytes) -> bool:
+    """Put a blob whose reference is already committed; the lock orders it after any release in flight."""
+    with blob_lock(key):
+        return get_artifact_store().put(key, stored)
+
+
+def register_artifact_bytes(
+    task_id: str,
+    kind: str,
+    filename: str,
+    data: bytes,
+    content_type: str | None = None,
+) -> str:
+    """Record ``data`` as an artifact of the task and store it as a content-addressed blob; returns its key."""
+    sha256, codec, stored = encode_blob(data, content_type)
+    key = blob_key(sha256, codec)
+    store = get_artifact_store()
+    meta = {
+        "store": store.name,
+        "sha256": sha256,
+        "codec": codec,
+        "bytes": len(data),
+        "stored_bytes": len(stored),
+    }
+    if content_type:
+        meta["content_type"] = content_type
+    # upload first so the row never points at a missing blob; the lock keeps release_blobs from
+    # deleting an existing blob between the upload (a no-op for shared content) and the row
+    with blob_lock(key):
+        store.put(key, stored)
+        upsert_artifact(task_id=task_id, kind=kind, filename=filename, path=key, meta_json=dumps(meta))
+    return key
 
 
 def register_artifact(
@@ -54,19 +134,67 @@ def register_artifact(
     path: Path,
     content_type: str | None = None,
 ) -> None:
-    size = path.stat().st_size if path.exists() else None
-    meta = {}
-    if content_type:
-        meta["content_type"] = content_type
-    if size is not None:
-        meta["bytes"] = size
-    upsert_artifact(
-        task_id=task_id,
-        kind=kind,
-        filename=filename,
-        path=str(path),
-        meta_json=json.dumps(meta) if meta else None,
-    )
+    """Move a file the task wrote into the artifact store; the scratch file is removed afterwards."""
+    if not path.exists():
+        upsert_artifact(task_id=task_id, kind=kind, filename=filename, path=str(path), meta_json=None)
+        return
+    register_artifact_bytes(task_id, kind, filename, path.read_bytes(), content_type)
+    path.unlink(missing_ok=True)
+
+
+def open_artifact(row) -> BinaryIO | None:
+    """Decoded content of an artifact row as a stream: from the blob store, or the file on disk for rows
+    written before it."""
+    meta = loads(row["meta_json"]) if row["meta_json"] else {}
+    if "sha256" not in meta:
+        legacy = Path(row["path"])
+        return legacy.open("rb") if legacy.is_file() else None
+    stream = get_artifact_store().open(row["path"])
+    return None if stream is None else decode_stream(stream, meta.get("codec"))
+
+
+def iter_chunks(stream: BinaryIO, chunk_bytes: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    try:
+        while chunk := stream.read(chunk_bytes):
+            yield chunk
+    finally:
+        stream.close()
+
+
+def load_artifact_download(task_id: str, filename: str) -> dict | None:
+    """``{"chunks", "size", "content_type", "sha256"}`` for a registered artifact, ``None`` if unknown or missing.
+
+    ``chunks`` streams the content, so a download holds one chunk in memory whatever the artifact's size.
+    """
+    row = get_artifact(task_id, filename)
+    if row is None:
+        return None
+    stream = open_artifact(row)
+    if stream is None:
+        return None
+    meta = loads(row["meta_json"]) if row["meta_json"] else {}
+    content_type = meta.get("content_type") or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return {
+        "chunks": iter_chunks(stream),
+        "size": meta.get("bytes"),
+        "content_type": content_type,
+        "sha256": meta.get("sha256"),
+    }
+
+
+def release_blobs(keys: list[str]) -> int:
+    """Delete the blobs no artifact row references any more (after their rows were deleted)."""
+    keys = [key for key in set(keys) if key.startswith("blobs/")]
+    store = get_artifact_store()
+    released = 0
+    for key in sorted(set(keys) - referenced_paths(keys)):
+        with blob_lock(key):
+            # re-checked under the lock: another task may have registered the same content since
+            if referenced_paths([key]):
+                continue
+            store.delete(key)
+        released += 1
+    return released
 
 
 def register_simulation_artifacts(task_id: str, out_csv: Path, out_png: Path) -> None:
@@ -0,0 +1,189 @@
+"""Task cancellation and per-task-type deadlines.
+
+A cancel request sets the Redis flag ``task:cancel:<task_id>``. A QUEUED task is marked CANCELLED
+right away and its message revoked. A RUNNING task sees the flag at its next
+``CancellationToken.check()`` (throttled to one Redis read per ``CANCEL_CHECK_SECONDS``), deletes its
+partial outputs and records CANCELLED, which frees the worker slot immediately.
+
+Deadlines are ``(soft, hard)`` seconds per task type. The soft limit is checked by the same token
+(and passed to Celery as ``soft_time_limit`` for prefork workers); the hard limit is Celery's
+``time_limit``, which kills the child process. Tasks killed that way are left RUNNING, so the
+``reap_overdue_tasks`` beat job cancels and cleans up anything RUNNING past its hard limit.
+"""
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from ..db.retention_repo import list_expired_tasks, list_task_types
+from ..db.task_artifacts_repo import delete_artifacts, list_artifact_paths
+from ..db.tasks_repo import get_task
+from ..db.time_series_repo import delete_series_for_task
+from ..embedded import revoke_task
+from ..redis_client import get_redis
+from ..serialization import loads
+from .artifact_service import OUTPUT_ROOT, release_blobs
+from .task_event_service import transition_task_state
+
+CANCEL_KEY = "task:cancel:{task_id}"
+CANCEL_FLAG_TTL_SECONDS = int(os.getenv("CANCEL_FLAG_TTL_SECONDS", "86400"))
+CANCEL_CHECK_SECONDS = float(os.getenv("CANCEL_CHECK_SECONDS", "0.5"))
+# (soft, hard) seconds per task type; override with TASK_TIME_LIMITS='{"simulation-run": [300, 330]}'
+DEFAULT_TIME_LIMITS = {
+    "word-analysis": (300, 360),
+    "simulation-run": (900, 960),
+}
+REAPER_GRACE_SECONDS = int(os.getenv("REAPER_GRACE_SECONDS", "60"))
+ACTIVE_STATUSES = ("QUEUED", "RUNNING")
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task body when a cancel was requested or the soft deadline passed."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def task_time_limits(task_type: str) -> tuple[int, int]:
+    limits = dict(DEFAULT_TIME_LIMITS)
+    raw = os.getenv("TASK_TIME_LIMITS")
+    if raw:
+        limits.update({str(k): (int(v[0]), int(v[1])) for k, v in loads(raw).items()})
+    return limits.get(task_type, (0, 0))
+
+
+def time_limit_options(task_type: str) -> dict[str, int]:
+    """``apply_async`` keyword arguments for the task type's deadlines (0 = no limit)."""
+    soft, hard = task_time_limits(task_type)
+    options = {}
+    if soft > 0:
+        options["soft_time_limit"] = soft
+    if hard > 0:
+        options["time_limit"] = hard
+    return options
+
+
+def is_cancel_requested(task_id: str) -> bool:
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        return bool(client.exists(CANCEL_KEY.format(task_id=task_id)))
+    except Exception:
+        return False
+
+
+def _set_cancel_flag(task_id: str) -> bool:
+    """True once the flag is stored; False when Redis is absent or failing."""
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        client.set(CANCEL_KEY.format(task_id=task_id), 1, ex=CANCEL_FLAG_TTL_SECONDS)
+    except Exception:
+        return False
+    return True
+
+
+def clear_cancel_flag(task_id: str) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(CANCEL_KEY.format(task_id=task_id))
+    except Exception:
+        pass
+
+
+class CancellationToken:
+    """Cooperative cancel and soft-deadline check for one running task."""
+
+    def __init__(self, task_id: str, task_type: str):
+        self.task_id = task_id
+        soft, _ = task_time_limits(task_type)
+        now = time.monotonic()
+        self.deadline = now + soft if soft > 0 else None
+        self._next_poll = now
+
+    def check(self) -> None:
+        now = time.monotonic()
+        if self.deadline is not None and now >= self.deadline:
+            raise TaskCancelled("soft time limit exceeded")
+        if now >= self._next_poll:
+            self._next_poll = now + CANCEL_CHECK_SECONDS
+            if is_cancel_requested(self.task_id):
+                raise TaskCancelled("cancel requested")
+
+
+def cleanup_partial_outputs(task_id: str) -> dict[str, int]:
+    """Delete series, artifacts and output files a task wrote before it was cancelled.
+
+    Blobs are content-addressed and may be shared, so only those no other task references go.
+    """
+    blob_keys = list_artifact_paths(task_id)
+    deleted = {"time_series": delete_series_for_task(task_id), "task_artifacts": delete_artifacts(task_id)}
+    deleted["blobs"] = release_blobs(blob_keys)
+    shutil.rmtree(OUTPUT_ROOT / task_id, ignore_errors=True)
+    return deleted
+
+
+def finish_cancelled(task_id: str, task_type: str, reason: str) -> dict[str, int] | None:
+    """Record CANCELLED, then delete partial outputs; ``None`` if the task already finished otherwise."""
+    clear_cancel_flag(task_id)
+    # state first: if the task won the race and finished, its outputs must survive
+    if not transition_task_state(task_id, task_type, "CANCELLED", reason=reason):
+        return None
+    return cleanup_partial_outputs(task_id)
+
+
+def cancel_task(task_id: str) -> dict[str, Any]:
+    row = get_task(task_id)
+    if row is None:
+        return {"error": "task not found", "task_id": task_id}
+    if row["status"] not in ACTIVE_STATUSES:
+        return {"error": "task already finished", "task_id": task_id, "state": row["status"]}
+    flagged = _set_cancel_flag(task_id)
+    # only a task no worker has started may be cancelled from here; if a worker moved it to RUNNING since
+    # the read above, this matches nothing and the worker sees the flag, cleans up and records CANCELLED
+    if row["status"] == "QUEUED" and transition_task_state(
+        task_id, row["task_type"], "CANCELLED", reason="cancel requested", allowed_from=("QUEUED",)
+    ):
+        clear_cancel_flag(task_id)
+        try:
+            # drop the queued message; a worker that still receives it finds CANCELLED and ignores it
+            revoke_task(task_id)
+        except Exception:
+            pass
+        return {"task_id": task_id, "state": "CANCELLED"}
+    if not flagged:
+        # a running worker only learns about the cancel through the flag
+        return {"error": "cancellation unavailable", "task_id": task_id, "state": "RUNNING"}
+    # RUNNING: the worker stops at its next check and records CANCELLED itself
+    return {"task_id": task_id, "state": "CANCELLING"}
+
+
+def reap_overdue_tasks(task_types, now: datetime | None = None, limit: int = 200) -> dict[str, list[str]]:
+    now = now or datetime.utcnow()
+    reaped: dict[str, list[str]] = {}
+    for task_type in task_types:
+        _, hard = task_time_limits(task_type)
+        if hard <= 0:
+            continue
+        cutoff = now - timedelta(seconds=hard + REAPER_GRACE_SECONDS)
+        for task in list_expired_tasks(task_type, ("RUNNING",), cutoff, limit):
+            if finish_cancelled(task["task_id"], task_type, "hard time limit exceeded") is not None:
+                reaped.setdefault(task_type, []).append(task["task_id"])
+    return reaped
+
+
+def fail_interrupted_tasks(now: datetime | None = None, limit: int = 1000) -> dict[str, list[str]]:
+    """Embedded mode startup: anything still QUEUED or RUNNING belonged to the previous process."""
+    now = now or datetime.utcnow()
+    failed: dict[str, list[str]] = {}
+    for task_type in list_task_types():
+        for task in list_expired_tasks(task_type, ACTIVE_STATUSES, now, limit):
+            if transition_task_state(task["task_id"], task_type, "FAILURE", error_text="interrupted by restart"):
+                failed.setdefault(task_type, []).append(task["task_id"])
+    return failed
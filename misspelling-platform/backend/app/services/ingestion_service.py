@@ -0,0 +1,130 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from ..db.data_sources_repo import list_enabled_sources, mark_source_synced
+from ..db.time_series_repo import ensure_source_series, list_terms_with_variants, upsert_series_points
+from ..ingestion import build_adapter
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_BACKFILL_DAYS = 365
+FLUSH_ROWS = 50_000
+
+logger = logging.getLogger(__name__)
+
+
+def _load_config(raw: Any) -> dict[str, Any]:
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, (bytes, str)) and raw:
+        try:
+            value = json.loads(raw)
+        except Exception:
+            return {}
+        return value if isinstance(value, dict) else {}
+    return {}
+
+
+def _sync_start(last_sync_at: datetime | None, latest: date, backfill_days: int) -> date:
+    if last_sync_at is None:
+        return latest - timedelta(days=max(1, backfill_days) - 1)
+    # re-read the last synced day so counts that arrived late are picked up
+    return last_sync_at.date()
+
+
+def _sync_targets() -> list[dict[str, Any]]:
+    targets: list[dict[str, Any]] = []
+    seen_terms: set[int] = set()
+    for row in list_terms_with_variants():
+        term_id = int(row["term_id"])
+        if term_id not in seen_terms:
+            seen_terms.add(term_id)
+            targets.append(
+                {
+                    "term_id": term_id,
+                    "canonical": row["canonical"],
+                    "variant_id": None,
+                    "spelling": row["canonical"],
+                    "label": "correct",
+                }
+            )
+        if row["variant_id"] is not None:
+            targets.append(
+                {
+                    "term_id": term_id,
+                    "canonical": row["canonical"],
+                    "variant_id": int(row["variant_id"]),
+                    "spelling": row["variant"],
+                    "label": row["variant"],
+                }
+            )
+    return targets
+
+
+def sync_source(source) -> dict[str, Any]:
+    name = source["name"]
+    config = _load_config(source["config_json"])
+    adapter = build_adapter(config)
+    if adapter is None:
+        return {"source": name, "status": "skipped", "reason": "no adapter configured"}
+    try:
+        latest = adapter.latest_date()
+        if latest is None:
+            return {"source": name, "status": "empty", "points": 0}
+        backfill_days = int(config.get("backfill_days", DEFAULT_BACKFILL_DAYS))
+        start = _sync_start(source["last_sync_at"], latest, backfill_days)
+        if start > latest:
+            return {"source": name, "status": "up_to_date", "points": 0}
+
+        granularity = source["default_granularity"] or "day"
+        units = str(config.get("units", "count"))
+        max_workers = max(1, int(config.get("max_workers", DEFAULT_MAX_WORKERS)))
+
+        def fetch(target):
+            return target, adapter.fetch_counts(target["spelling"], start, latest)
+
+        written = 0
+        series_count = 0
+        pending: list[dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for target, points in pool.map(fetch, _sync_targets()):
+                if not points:
+                    continue
+                series_id = ensure_source_series(
+                    term_id=target["term_id"],
+                    variant_id=target["variant_id"],
+                    source_id=int(source["id"]),
+                    granularity=granularity,
+                    units=units,
+                    meta={"source": name, "canonical": target["canonical"], "variant": target["label"]},
+                )
+                series_count += 1
+                pending.extend({"series_id": series_id, "t": p["t"], "value": p["value"]} for p in points)
+                if len(pending) >= FLUSH_ROWS:
+                    written += upsert_series_points(pending)
+                    pending = []
+        written += upsert_series_points(pending)
+        mark_source_synced(int(source["id"]), datetime.combine(latest, time.min))
+        return {
+            "source": name,
+            "status": "synced",
+            "window": [str(start), str(latest)],
+            "series": series_count,
+            "points": written,
+        }
+    finally:
+        adapter.close()
+
+
+def sync_all_sources() -> list[dict[str, Any]]:
+    """Sync every enabled source; one failing source is reported and does not stop the others."""
+    results = []
+    for source in list_enabled_sources():
+        try:
+            results.append(sync_source(source))
+        except Exception as exc:
+            logger.exception("data source %s failed to sync", source["name"])
+            results.append({"source": source["name"], "status": "error", "error": str(exc)})
+    return results
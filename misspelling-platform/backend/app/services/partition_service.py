@@ -0,0 +1,82 @@
+import os
+from datetime import date
+from typing import Any
+
+from ..db.partitions_repo import (
+    FUTURE_PARTITION,
+    PARTITIONED_TABLES,
+    drop_partitions,
+    list_partitions,
+    parse_bound,
+    partition_has_rows,
+    split_future_partition,
+)
+
+PARTITION_AHEAD_MONTHS = int(os.getenv("PARTITION_AHEAD_MONTHS", "3"))
+# REORGANIZE of a p_future that holds rows copies all of them; refuse unless explicitly allowed
+PARTITION_SPLIT_NONEMPTY = os.getenv("PARTITION_SPLIT_NONEMPTY", "") == "1"
+# months of data to keep per partitioned table; 0 never drops. Points are dated by observation day
+# (t), events by write time (ts).
+PARTITION_RETENTION_MONTHS = {
+    "time_series_points": int(os.getenv("POINTS_PARTITION_RETENTION_MONTHS", "0")),
+    "task_events": int(os.getenv("EVENTS_PARTITION_RETENTION_MONTHS", "0")),
+}
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def monthly_partitions(first: date, stop: date) -> list[tuple[str, date]]:
+    """``(name, upper bound)`` for each month from ``first`` up to (excluding) ``stop``."""
+    out = []
+    month = month_start(first)
+    while month < stop:
+        upper = add_months(month, 1)
+        out.append((partition_name(month), upper))
+        month = upper
+    return out
+
+
+def maintain_table(table: str, today: date) -> dict[str, Any]:
+    kind = PARTITIONED_TABLES[table]
+    partitions = list_partitions(table)
+    if not partitions:
+        return {"partitioned": False}
+    bounds = [(p["name"], parse_bound(kind, p["description"])) for p in partitions]
+    highest = max((upper for _, upper in bounds if upper is not None), default=month_start(today))
+
+    created = monthly_partitions(highest, add_months(month_start(today), PARTITION_AHEAD_MONTHS + 1))
+    skipped = None
+    if created and not PARTITION_SPLIT_NONEMPTY and partition_has_rows(table, FUTURE_PARTITION):
+        # rows in p_future turn the split into a table copy under a metadata lock; leave it to an
+        # operator (PARTITION_SPLIT_NONEMPTY=1 in a maintenance window)
+        skipped, created = f"{FUTURE_PARTITION} holds rows; set PARTITION_SPLIT_NONEMPTY=1 to split it", []
+    if created:
+        split_future_partition(table, created)
+
+    dropped: list[str] = []
+    months = PARTITION_RETENTION_MONTHS.get(table, 0)
+    if months > 0:
+        cutoff = add_months(month_start(today), -months)
+        dropped = [name for name, upper in bounds if upper is not None and upper <= cutoff]
+        # DROP PARTITION discards the rows as a metadata change, no row-by-row delete
+        drop_partitions(table, [name for name in dropped if name != FUTURE_PARTITION])
+    result = {"partitioned": True, "created": [name for name, _ in created], "dropped": dropped}
+    if skipped:
+        result["skipped"] = skipped
+    return result
+
+
+def maintain_partitions(today: date | None = None) -> dict[str, Any]:
+    today = today or date.today()
+    return {table: maintain_table(table, today) for table in PARTITIONED_TABLES}
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from typing import Any
+
+from ..db.request_profiles_repo import (
+    get_request_profile_report_async,
+    insert_request_profile,
+    list_request_profiles_async,
+)
+from ..db.task_artifacts_repo import list_artifacts_by_kind_async
+from ..profiling import PROFILE_KINDS, Capture
+from ..serialization import dumps, dumps_bytes, raw_json
+from .artifact_service import register_artifact_bytes
+
+
+def save_capture(task_id: str, kind: str, report: dict[str, Any]) -> str:
+    """Store a profiling report as a JSON artifact of the task; returns its blob key."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    filename = f"{kind}-{stamp}.json"
+    return register_artifact_bytes(task_id, kind, filename, dumps_bytes(report, lenient=True), "application/json")
+
+
+def save_request_capture(capture: Capture, kind: str, meta: dict[str, Any]) -> int:
+    """Store a request's report in ``request_profiles``; returns the row id."""
+    return insert_request_profile(
+        kind,
+        meta["method"],
+        meta["path"],
+        meta.get("route"),
+        meta["status_code"],
+        round(capture.duration_ms, 3),
+        dumps(capture.report(**meta), lenient=True),
+    )
+
+
+def _profile_kinds(kind: str | None) -> list[str]:
+    return [kind] if kind in PROFILE_KINDS else list(PROFILE_KINDS)
+
+
+def _task_record(row) -> dict[str, Any]:
+    return {
+        "source": "task",
+        "task_id": row["task_id"],
+        "task_type": row["task_type"],
+        "kind": row["kind"],
+        "filename": row["filename"],
+        "url": f"/api/files/{row['task_id']}/{row['filename']}",
+        "meta_json": row["meta_json"],
+        "created_at": row["created_at"],
+    }
+
+
+def _request_record(row) -> dict[str, Any]:
+    return {
+        "source": "request",
+        "id": row["id"],
+        "kind": row["kind"],
+        "method": row["method"],
+        "path": row["path"],
+        "route": row["route"],
+        "status_code": row["status_code"],
+        "duration_ms": row["duration_ms"],
+        "url": f"/api/admin/profiles/{row['id']}",
+        "created_at": row["created_at"],
+    }
+
+
+async def list_profile_records_payload_async(limit: int = 50, kind: str | None = None) -> dict[str, Any]:
+    kinds = _profile_kinds(kind)
+    limit = max(1, min(int(limit), 500))
+    items = [_task_record(row) for row in await list_artifacts_by_kind_async(kinds, limit)]
+    items += [_request_record(row) for row in await list_request_profiles_async(kinds, limit)]
+    items.sort(key=lambda item: item["created_at"], reverse=True)
+    return {"items": items[:limit]}
+
+
+async def get_request_profile_payload_async(profile_id: int) -> Any:
+    report = await get_request_profile_report_async(profile_id)
+    if report is None:
+        return {"error": "profile not found", "id": profile_id}
+    return raw_json(report)
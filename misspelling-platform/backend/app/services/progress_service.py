@@ -0,0 +1,85 @@
+"""Coalesced task progress in one Redis hash per task (``task:progress:<task_id>``).
+
+Workers call ``ProgressReporter.update`` as often as they like; at most one write per
+``PROGRESS_INTERVAL_SECONDS`` reaches Redis and it always carries the latest values. Readers
+get the hash with a single HGETALL instead of loading and deserializing the Celery result.
+"""
+import os
+import time
+from typing import Any
+
+from ..redis_client import get_redis
+
+PROGRESS_KEY = "task:progress:{task_id}"
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("PROGRESS_INTERVAL_SECONDS", "1.0"))
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", "3600"))
+
+
+class ProgressReporter:
+    def __init__(self, task_id: str, total: int | None = None, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.key = PROGRESS_KEY.format(task_id=task_id)
+        self.interval = interval
+        self._latest: dict[str, Any] = {"total": total} if total is not None else {}
+        self._dirty = False
+        self._next_write = 0.0
+
+    def update(self, step: int, total: int | None = None, **fields: Any) -> None:
+        self._latest["step"] = step
+        if total is not None:
+            self._latest["total"] = total
+        self._latest.update(fields)
+        self._dirty = True
+        if time.monotonic() >= self._next_write:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._next_write = time.monotonic() + self.interval
+        client = get_redis()
+        if client is None:
+            return
+        mapping = {k: v for k, v in self._latest.items() if v is not None}
+        total = mapping.get("total")
+        if total:
+            mapping["percent"] = round(100.0 * mapping.get("step", 0) / total, 1)
+        mapping["updated_at"] = round(time.time(), 3)
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(self.key, mapping=mapping)
+            pipe.expire(self.key, PROGRESS_TTL_SECONDS)
+            pipe.execute()
+        except Exception:
+            # progress is best effort; never fail the task over it
+            pass
+
+    def clear(self) -> None:
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.delete(self.key)
+        except Exception:
+            pass
+
+
+def _decode(value: bytes) -> Any:
+    text = value.decode("utf-8")
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            continue
+    return text
+
+
+def read_progress(task_id: str) -> dict[str, Any] | None:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = client.hgetall(PROGRESS_KEY.format(task_id=task_id))
+    except Exception:
+        return None
+    return {k.decode("utf-8"): _decode(v) for k, v in raw.items()} or None
@@ -0,0 +1,200 @@
+"""Per-task-type retention: archive expired tasks to zstd NDJSON bundles, then delete them.
+
+A bundle is one ``<task_id>.ndjson.zst`` file under ``ARCHIVE_ROOT/<yyyy>/<mm>/``. Each line is
+``{"table": ..., "row": {...}}`` for the task, its events, artifacts, series and points, and
+``{"table": "file", "row": {"filename", "data"}}`` (base64) for every file in the task's
+output directory, and ``{"table": "blob", "row": {"key", "data"}}`` (base64, as stored) for every
+artifact-store blob the task's artifacts point to. Rollups are not archived; they are rebuilt from
+the points on restore.
+"""
+import base64
+import hashlib
+import io
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import zstandard
+
+from ..artifact_store import get_artifact_store
+from ..db.request_profiles_repo import delete_request_profiles_before
+from ..db.retention_repo import (
+    ARCHIVE_TABLES,
+    delete_task_rows,
+    get_archive,
+    list_expired_tasks,
+    list_task_types,
+    load_task_bundle,
+    restore_bundle,
+    upsert_archive,
+)
+from ..db.tasks_repo import get_task
+from ..db.time_series_rollups_repo import rebuild_series_rollups
+from ..serialization import dumps, dumps_bytes, loads
+from .artifact_service import release_blobs, store_blob
+from .task_service import OUTPUT_ROOT
+
+ARCHIVE_ROOT = Path(os.getenv("ARCHIVE_ROOT", "/app/archives"))
+RETENTION_ZSTD_LEVEL = int(os.getenv("RETENTION_ZSTD_LEVEL", "9"))
+RETENTION_BATCH_TASKS = int(os.getenv("RETENTION_BATCH_TASKS", "200"))
+RETENTION_DELETE_BATCH = int(os.getenv("RETENTION_DELETE_BATCH", "5000"))
+# days to keep finished tasks per task type; 0 keeps forever. Override with RETENTION_POLICIES (JSON).
+DEFAULT_POLICIES = {
+    "word-analysis": 180,
+    "simulation-run": 90,
+}
+RETENTION_DEFAULT_DAYS = int(os.getenv("RETENTION_DEFAULT_DAYS", "0"))
+# saved request captures are diagnostics, not tasks: deleted outright, never archived
+REQUEST_PROFILE_RETENTION_DAYS = int(os.getenv("REQUEST_PROFILE_RETENTION_DAYS", "14"))
+TERMINAL_STATUSES = ("SUCCESS", "FAILURE", "CANCELLED")
+
+
+def retention_policies() -> dict[str, int]:
+    policies = dict(DEFAULT_POLICIES)
+    raw = os.getenv("RETENTION_POLICIES")
+    if raw:
+        policies.update({str(k): int(v) for k, v in loads(raw).items()})
+    return policies
+
+
+def _bundle_path(task_id: str, now: datetime) -> Path:
+    return ARCHIVE_ROOT / f"{now:%Y}" / f"{now:%m}" / f"{task_id}.ndjson.zst"
+
+
+def _artifact_blob_keys(tables: dict[str, list[dict]]) -> list[str]:
+    return sorted({row["path"] for row in tables.get("task_artifacts", []) if row["path"].startswith("blobs/")})
+
+
+def _write_bundle(path: Path, tables: dict[str, list[dict]], output_dir: Path) -> tuple[str, int, dict[str, int]]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    counts = {table: len(rows) for table, rows in tables.items()}
+    counts["file"] = 0
+    counts["blob"] = 0
+    store = get_artifact_store()
+    with tmp.open("wb") as raw:
+        with zstandard.ZstdCompressor(level=RETENTION_ZSTD_LEVEL).stream_writer(raw, closefd=False) as out:
+            for table in ARCHIVE_TABLES:
+                for row in tables.get(table, []):
+                    out.write(dumps_bytes({"table": table, "row": row}, lenient=True) + b"\n")
+            if output_dir.is_dir():
+                for file in sorted(p for p in output_dir.iterdir() if p.is_file()):
+                    data = base64.b64encode(file.read_bytes()).decode("ascii")
+                    out.write(dumps_bytes({"table": "file", "row": {"filename": file.name, "data": data}}) + b"\n")
+                    counts["file"] += 1
+            for key in _artifact_blob_keys(tables):
+                stored = store.get(key)
+                if stored is not None:
+                    data = base64.b64encode(stored).decode("ascii")
+                    out.write(dumps_bytes({"table": "blob", "row": {"key": key, "data": data}}) + b"\n")
+                    counts["blob"] += 1
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest(), path.stat().st_size, counts
+
+
+def _read_bundle(path: Path):
+    with path.open("rb") as raw:
+        for line in io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw)):
+            if line.strip():
+                yield loads(line)
+
+
+def archive_task(task: dict[str, Any], now: datetime | None = None) -> dict[str, Any]:
+    """Write the task's bundle, record it in ``task_archives``, then delete the live rows and outputs."""
+    now = now or datetime.utcnow()
+    task_id = task["task_id"]
+    tables = load_task_bundle(task_id)
+    output_dir = OUTPUT_ROOT / task_id
+    path = _bundle_path(task_id, now)
+    sha256, size, counts = _write_bundle(path, tables, output_dir)
+    # the archive row is committed before anything is deleted, so a crash in between only leaves extra data
+    upsert_archive(
+        task_id, task["task_type"], task["status"], str(path), sha256, size, dumps(counts), task.get("created_at")
+    )
+    deleted = delete_task_rows(task_id, [int(s["id"]) for s in tables["time_series"]], RETENTION_DELETE_BATCH)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    release_blobs(_artifact_blob_keys(tables))
+    return {"task_id": task_id, "path": str(path), "size_bytes": size, "counts": counts, "deleted": deleted}
+
+
+def apply_retention(now: datetime | None = None, max_tasks: int | None = None) -> dict[str, Any]:
+    now = now or datetime.utcnow()
+    policies = retention_policies()
+    archived: dict[str, int] = {}
+    failed: dict[str, str] = {}
+    budget = max_tasks
+    for task_type in list_task_types():
+        days = policies.get(task_type, RETENTION_DEFAULT_DAYS)
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        while budget is None or budget > 0:
+            limit = RETENTION_BATCH_TASKS if budget is None else min(budget, RETENTION_BATCH_TASKS)
+            batch = list_expired_tasks(task_type, TERMINAL_STATUSES, cutoff, limit)
+            done = 0
+            for task in batch:
+                try:
+                    archive_task(dict(task), now)
+                    done += 1
+                except Exception as exc:
+                    failed[task["task_id"]] = str(exc)
+            archived[task_type] = archived.get(task_type, 0) + done
+            if budget is not None:
+                budget -= len(batch)
+            if len(batch) < limit or done == 0:
+                break
+    profiles = 0
+    if REQUEST_PROFILE_RETENTION_DAYS > 0:
+        cutoff = now - timedelta(days=REQUEST_PROFILE_RETENTION_DAYS)
+        profiles = delete_request_profiles_before(cutoff, RETENTION_DELETE_BATCH)
+    return {"archived": archived, "failed": failed, "policies": policies, "request_profiles_deleted": profiles}
+
+
+def restore_task(task_id: str) -> dict[str, Any]:
+    archive = get_archive(task_id)
+    if archive is None:
+        return {"error": "archive not found", "task_id": task_id}
+    if get_task(task_id) is not None:
+        return {"error": "task already exists", "task_id": task_id}
+    path = Path(archive["path"])
+    if not path.exists():
+        return {"error": "archive file missing", "task_id": task_id, "path": str(path)}
+
+    tables: dict[str, list[dict]] = {table: [] for table in ARCHIVE_TABLES}
+    files = []
+    blobs = []
+    for record in _read_bundle(path):
+        if record["table"] == "file":
+            files.append(record["row"])
+        elif record["table"] == "blob":
+            blobs.append(record["row"])
+        else:
+            tables[record["table"]].append(record["row"])
+
+    # blobs and files first (both idempotent), so the rows never point at missing content and a
+    # failed restore can be retried: the rows go in with one transaction or not at all
+    store = get_artifact_store()
+    for blob in blobs:
+        store.put(blob["key"], base64.b64decode(blob["data"]))
+    output_dir = OUTPUT_ROOT / task_id
+    if files:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for file in files:
+            (output_dir / Path(file["filename"]).name).write_bytes(base64.b64decode(file["data"]))
+    restored = restore_bundle(task_id, tables, RETENTION_DELETE_BATCH)
+    # a release of shared content may have deleted a blob before our rows were visible; put it back
+    for blob in blobs:
+        store_blob(blob["key"], base64.b64decode(blob["data"]))
+    for series in tables["time_series"]:
+        rebuild_series_rollups(int(series["id"]))
+    restored["file"] = len(files)
+    restored["blob"] = len(blobs)
+    return {"task_id": task_id, "state": "RESTORED", "restored": restored}
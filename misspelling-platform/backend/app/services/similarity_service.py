@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import numpy as np
+
+from ..db.time_series_repo import (
+    describe_series,
+    get_task_series_id,
+    list_points_for_series,
+    list_series_changed_since,
+    list_series_ids,
+)
+from ..redis_client import get_redis
+
+# outside the /app/outputs tree, which /api/files serves
+INDEX_DIR = Path(os.getenv("SIMILARITY_INDEX_DIR", "/app/similarity"))
+SIMILARITY_LOCK_SECONDS = int(os.getenv("SIMILARITY_LOCK_SECONDS", "1800"))
+REFRESH_LOCK_KEY = "similarity:refresh:lock"
+VECTOR_DIM = 64
+REFRESH_BATCH = 2000
+MIN_POINTS = 4
+
+_VECTORS = "vectors.f32"
+_IDS = "ids.i64"
+_STATE = "state.json"
+
+_local_refresh_lock = threading.Lock()
+
+
+def series_vector(t_ordinals: np.ndarray, values: np.ndarray, dim: int = VECTOR_DIM) -> np.ndarray | None:
+    """Resample a series onto ``dim`` evenly spaced points, z-score it and scale to unit norm.
+
+    With unit-norm z-scored vectors a dot product is the Pearson correlation of the
+    resampled series.
+    """
+    if values.size < MIN_POINTS:
+        return None
+    grid = np.linspace(t_ordinals[0], t_ordinals[-1], dim)
+    resampled = np.interp(grid, t_ordinals, values)
+    std = resampled.std()
+    if not np.isfinite(std) or std == 0:
+        return None
+    return ((resampled - resampled.mean()) / (std * np.sqrt(dim))).astype(np.float32)
+
+
+def _vectors_from_rows(rows) -> dict[int, np.ndarray]:
+    out: dict[int, np.ndarray] = {}
+    if not rows:
+        return out
+    sids = np.fromiter((r.series_id for r in rows), dtype=np.int64, count=len(rows))
+    ords = np.fromiter((r._mapping["t"].toordinal() for r in rows), dtype=np.float64, count=len(rows))
+    vals = np.fromiter((float(r.value) for r in rows), dtype=np.float64, count=len(rows))
+    bounds = np.flatnonzero(np.diff(sids)) + 1
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(sids)]):
+        vec = series_vector(ords[lo:hi], vals[lo:hi])
+        if vec is not None:
+            out[int(sids[lo])] = vec
+    return out
+
+
+def _read_state(index_dir: Path) -> dict[str, Any]:
+    try:
+        return json.loads((index_dir / _STATE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {"dim": VECTOR_DIM, "count": 0, "max_series_id": 0, "refreshed_at": None}
+
+
+def _write_state(index_dir: Path, state: dict[str, Any]) -> None:
+    tmp = index_dir / f"{_STATE}.tmp"
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, index_dir / _STATE)
+
+
+def _index_files(index_dir: Path, generation: int) -> tuple[Path, Path]:
+    """Vector and id files of one index generation; compaction writes the next one beside it."""
+    if not generation:
+        return index_dir / _VECTORS, index_dir / _IDS
+    return index_dir / f"{_VECTORS}.{generation}", index_dir / f"{_IDS}.{generation}"
+
+
+@contextmanager
+def _refresh_lock():
+    """Single-flight guard: yields ``False`` when another refresh holds the lock.
+
+    Concurrent refreshes would interleave appends to the same files. The lock is a Redis key when
+    Redis is configured (workers on several hosts), otherwise a process-local lock.
+    """
+    client = get_redis()
+    if client is None:
+        acquired = _local_refresh_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _local_refresh_lock.release()
+        return
+    token = uuid4().hex
+    acquired = bool(client.set(REFRESH_LOCK_KEY, token, ex=SIMILARITY_LOCK_SECONDS, nx=True))
+    try:
+        yield acquired
+    finally:
+        # only release our own lock, not one taken over after ours expired
+        if acquired and client.get(REFRESH_LOCK_KEY) == token.encode():
+            client.delete(REFRESH_LOCK_KEY)
+
+
+def _compact(index_dir: Path, state: dict[str, Any], ids: np.ndarray, keep: np.ndarray) -> dict[str, Any]:
+    """Write the kept rows as the next generation, switch ``state.json`` to it and drop the old files.
+
+    Readers map files by the generation in ``state.json``, so they never see a half-written matrix;
+    mappings of the old generation stay valid after its files are unlinked.
+    """
+    dim, count, generation = int(state["dim"]), int(state["count"]), int(state.get("generation", 0))
+    old_vectors, old_ids = _index_files(index_dir, generation)
+    new_vectors, new_ids = _index_files(index_dir, generation + 1)
+    mm = np.memmap(old_vectors, dtype=np.float32, mode="r", shape=(count, dim))
+    with new_vectors.open("wb") as f:
+        for lo in range(0, count, REFRESH_BATCH):
+            chunk = keep[lo : lo + REFRESH_BATCH]
+            np.ascontiguousarray(mm[lo : lo + REFRESH_BATCH][chunk]).tofile(f)
+    del mm
+    with new_ids.open("wb") as f:
+        ids[keep].astype(np.int64).tofile(f)
+    state = {**state, "count": int(keep.sum()), "generation": generation + 1}
+    _write_state(index_dir, state)
+    old_vectors.unlink(missing_ok=True)
+    old_ids.unlink(missing_ok=True)
+    return state
+
+
+def refresh_similarity_index(index_dir: Path = INDEX_DIR) -> dict[str, Any]:
+    """Append vectors for new series, rewrite updated ones and drop deleted ones; one refresh at a time."""
+    with _refresh_lock() as acquired:
+        if not acquired:
+            return {"skipped": "refresh already running"}
+        return _refresh(index_dir)
+
+
+def _refresh(index_dir: Path) -> dict[str, Any]:
+    index_dir.mkdir(parents=True, exist_ok=True)
+    state = _read_state(index_dir)
+    dim, count = int(state["dim"]), int(state["count"])
+    vectors_path, ids_path = _index_files(index_dir, int(state.get("generation", 0)))
+    started = datetime.utcnow()
+    updated_since = None
+    if state["refreshed_at"]:
+        # small overlap so rows committed while the previous refresh ran are not missed
+        updated_since = datetime.fromisoformat(state["refreshed_at"]) - timedelta(minutes=1)
+
+    # rows appended by a refresh that died before its state write are not in ``count``; cut them off
+    # so new rows land at the positions recorded for them
+    for path, row_bytes in ((vectors_path, dim * 4), (ids_path, 8)):
+        if path.exists() and path.stat().st_size > count * row_bytes:
+            os.truncate(path, count * row_bytes)
+    ids = np.fromfile(ids_path, dtype=np.int64, count=count) if count else np.zeros(0, dtype=np.int64)
+    position = {int(sid): i for i, sid in enumerate(ids)}
+    indexed_id = max_series_id = int(state["max_series_id"])
+    cursor = appended = rewritten = 0
+    # rows of series that were rebuilt into something no longer indexable (too short, constant)
+    unindexable: set[int] = set()
+    while True:
+        batch = list_series_changed_since(cursor, indexed_id, updated_since, limit=REFRESH_BATCH)
+        if not batch:
+            break
+        cursor = int(batch[-1])
+        vectors = _vectors_from_rows(list_points_for_series(batch))
+        unindexable.update(int(sid) for sid in batch if int(sid) in position and int(sid) not in vectors)
+        new_ids = [sid for sid in vectors if sid not in position]
+        old_ids = [sid for sid in vectors if sid in position]
+        if old_ids:
+            mm = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(count, dim))
+            for sid in old_ids:
+                mm[position[sid]] = vectors[sid]
+            mm.flush()
+            del mm
+            rewritten += len(old_ids)
+        if new_ids:
+            with vectors_path.open("ab") as f:
+                np.stack([vectors[sid] for sid in new_ids]).astype(np.float32).tofile(f)
+            with ids_path.open("ab") as f:
+                np.asarray(new_ids, dtype=np.int64).tofile(f)
+            for sid in new_ids:
+                position[sid] = count
+                count += 1
+            appended += len(new_ids)
+            ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+        max_series_id = max(max_series_id, cursor)
+        # commit progress per batch so an interrupted refresh resumes instead of restarting
+        state = {**state, "count": count, "max_series_id": max_series_id}
+        _write_state(index_dir, state)
+        if len(batch) < REFRESH_BATCH:
+            break
+
+    # drop series deleted since they were indexed (cancelled, archived, re-ingested under a new id)
+    keep = np.isin(ids, np.asarray(list_series_ids(max_series_id), dtype=np.int64))
+    if unindexable:
+        keep &= ~np.isin(ids, np.fromiter(unindexable, dtype=np.int64))
+    removed = int(count - keep.sum())
+    if removed:
+        state = _compact(index_dir, state, ids, keep)
+    _write_state(index_dir, {**state, "dim": dim, "refreshed_at": started.isoformat()})
+    return {"count": int(state["count"]), "appended": appended, "rewritten": rewritten, "removed": removed}
+
+
+class SimilarityIndex:
+    """Read side of the on-disk index; reopens the memmap when the refresher grows it."""
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._state_mtime: float | None = None
+        self._vectors = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+
+    def _maybe_reload(self) -> None:
+        try:
+            mtime = (self.index_dir / _STATE).stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._state_mtime:
+            return
+        with self._lock:
+            if mtime == self._state_mtime:
+                return
+            state = _read_state(self.index_dir)
+            count, dim = int(state["count"]), int(state["dim"])
+            vectors_path, ids_path = _index_files(self.index_dir, int(state.get("generation", 0)))
+            if count:
+                self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(count, dim))
+                self._ids = np.memmap(ids_path, dtype=np.int64, mode="r", shape=(count,))
+            else:
+                self._vectors = np.zeros((0, dim), dtype=np.float32)
+                self._ids = np.zeros(0, dtype=np.int64)
+            self._state_mtime = mtime
+
+    def vector_for(self, series_id: int) -> np.ndarray | None:
+        self._maybe_reload()
+        hits = np.flatnonzero(self._ids == series_id)
+        return np.asarray(self._vectors[hits[-1]]) if hits.size else None
+
+    def query(self, vector: np.ndarray, k: int, exclude: int | None = None) -> list[tuple[int, float]]:
+        self._maybe_reload()
+        vectors, ids = self._vectors, self._ids
+        if not len(ids):
+            return []
+        scores = vectors @ vector.astype(np.float32)
+        take = min(len(scores), k + 1)
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if int(ids[i]) != exclude][:k]
+
+
+_index = SimilarityIndex()
+
+
+def _query_vector(series_id: int) -> np.ndarray | None:
+    vec = _index.vector_for(series_id)
+    if vec is not None:
+        return vec
+    # not indexed yet: build the vector on the fly from the raw points
+    return _vectors_from_rows(list_points_for_series([series_id])).get(series_id)
+
+
+def find_similar_series(
+    task_id: str,
+    variant: str = "misspelling_ratio",
+    k: int = 10,
+):
+    k = max(1, min(int(k), 100))
+    series_id = get_task_series_id(task_id, variant)
+    payload: dict[str, Any] = {
+        "task_id": task_id,
+        "variant": variant,
+        "series_id": series_id,
+        "items": [],
+    }
+    if series_id is None:
+        return payload
+    vector = _query_vector(series_id)
+    if vector is None:
+        payload["error"] = "series too short or constant to compare"
+        return payload
+    matches = _index.query(vector, k, exclude=series_id)
+    details = {int(r["series_id"]): r for r in describe_series([sid for sid, _ in matches])}
+    for sid, corr in matches:
+        row = details.get(sid)
+        if row is None:
+            continue
+        payload["items"].append(
+            {
+                "series_id": sid,
+                "task_id": row["task_id"],
+                "word": row["canonical"],
+                "variant": row["variant"],
+                "source": row["source_name"],
+                "window_start": row["window_start"],
+                "window_end": row["window_end"],
+                "correlation": round(corr, 6),
+            }
+        )
+    return payload
@@ -1,7 +1,9 @@
-import json
+from datetime import datetime
 from typing import Any
 
-from ..db.task_events_repo import insert_event, list_events
+from ..db.task_events_repo import insert_event, list_events, list_events_async
+from ..db.tasks_repo import insert_queued_task, transition_task
+from ..serialization import dumps, raw_json
 
 
 def record_task_event(
@@ -10,52 +12,48 @@ def record_task_event(
     message: str | None = None,
     meta: dict[str, Any] | None = None,
 ) -> None:
-    meta_json = json.dumps(meta) if meta is not None else None
+    meta_json = dumps(meta) if meta is not None else None
     insert_event(task_id, event_type, message or event_type, meta_json)
 
 
-def record_task_queued(task_id: str, task_type: str, params: dict[str, Any]) -> None:
-    record_task_event(task_id, "QUEUED", f"{task_type} queued", {"task_type": task_type, "params": params})
-
-
-def record_task_running(task_id: str, task_type: str) -> None:
-    record_task_event(task_id, "RUNNING", f"{task_type} running", {"task_type": task_type})
-
+def create_queued_task(task_id: str, task_type: str, params: dict[str, Any]) -> None:
+    insert_queued_task(
+        task_id, task_type, dumps(params), f"{task_type} queued", dumps({"task_type": task_type, "params": params})
+    )
 
-def record_task_success(task_id: str, task_type: str) -> None:
-    record_task_event(task_id, "SUCCESS", f"{task_type} success", {"task_type": task_type})
 
+def transition_task_state(
+    task_id: str,
+    task_type: str,
+    status: str,
+    result: Any = None,
+    error_text: str | None = None,
+    reason: str | None = None,
+    allowed_from: tuple[str, ...] | None = None,
+) -> bool:
+    """Update ``tasks.status`` and append the lifecycle event in one transaction.
 
-def record_task_failure(task_id: str, task_type: str, error_text: str) -> None:
-    record_task_event(
+    ``False`` means the transition was refused because the task already left the states ``status`` can
+    be entered from (see ``tasks_repo.ALLOWED_TRANSITIONS``, narrowed by ``allowed_from``); nothing was
+    written.
+    """
+    meta: dict[str, Any] = {"task_type": task_type}
+    if error_text is not None:
+        meta["error"] = error_text
+    if reason is not None:
+        meta["reason"] = reason
+    return transition_task(
         task_id,
-        "FAILURE",
-        f"{task_type} failure",
-        {"task_type": task_type, "error": error_text},
+        status,
+        f"{task_type} {status.lower()}",
+        dumps(meta),
+        result_json=dumps(result) if result is not None else None,
+        error_text=error_text,
+        allowed_from=allowed_from,
     )
 
 
-def _normalize_jsonish(value: Any) -> Any:
-    if value is None or isinstance(value, (dict, list, int, float, bool)):
-        return value
-    if isinstance(value, bytes):
-        try:
-            value = value.decode("utf-8")
-        except Exception:
-            return str(value)
-    if isinstance(value, str):
-        text_value = value.strip()
-        if text_value.startswith("{") or text_value.startswith("["):
-            try:
-                return json.loads(text_value)
-            except Exception:
-                return value
-    return value
-
-
-def list_task_events_payload(task_id: str, limit: int = 200) -> dict[str, Any]:
-    safe_limit = max(1, min(int(limit), 500))
-    rows = list_events(task_id, safe_limit)
+def _events_payload(task_id: str, rows) -> dict[str, Any]:
     return {
         "task_id": task_id,
         "items": [
@@ -63,9 +61,22 @@ def list_task_events_payload(task_id: str, limit: int = 200) -> dict[str, Any]:
                 "task_id": row["task_id"],
                 "event_type": row["level"],
                 "message": row["message"],
-                "meta": _normalize_jsonish(row["meta_json"]),
+                "meta": raw_json(row["meta_json"]),
                 "created_at": row["ts"],
             }
             for row in rows
         ],
     }
+
+
+def list_task_events_payload(
+    task_id: str, limit: int = 200, since: datetime | None = None, until: datetime | None = None
+) -> dict[str, Any]:
+    return _events_payload(task_id, list_events(task_id, max(1, min(int(limit), 500)), since, until))
+
+
+async def list_task_events_payload_async(
+    task_id: str, limit: int = 200, since: datetime | None = None, until: datetime | None = None
+) -> dict[str, Any]:
+    rows = await list_events_async(task_id, max(1, min(int(limit), 500)), since, until)
+    return _events_payload(task_id, rows)
@@ -1,13 +1,17 @@
 # ===== compatibility layer for routes_tasks.py imports (M2) =====
-import json
+import asyncio
+import time
 from pathlib import Path
 from typing import Any, Dict
 from uuid import uuid4
 
-from sqlalchemy import text
-
-from ..db.core import get_engine
-from .task_event_service import record_task_failure, record_task_queued
+from ..db.retention_repo import get_archive
+from ..db.tasks_repo import get_task, get_task_async, list_tasks, list_tasks_async
+from ..embedded import enqueue_task
+from ..serialization import normalize_jsonish, raw_json
+from .cancellation_service import time_limit_options
+from .progress_service import read_progress
+from .task_event_service import create_queued_task, transition_task_state
 
 OUTPUT_ROOT = Path("/app/outputs")
 
@@ -15,183 +19,123 @@ OUTPUT_ROOT = Path("/app/outputs")
 def build_output_path(task_id: str, filename: str) -> Path:
     return OUTPUT_ROOT / task_id / filename
 
-def create_word_analysis_task(word: str, celery_task) -> dict:
+def _enqueue_headers(profile: bool) -> dict:
+    headers: dict = {"queued_at": time.time()}
+    if profile:
+        headers["profile"] = True
+    return headers
+
+
+def create_word_analysis_task(word: str, celery_task, profile: bool = False) -> dict:
     """
     Called by routes_tasks.py: create_word_analysis_task(word, demo_analysis)
-    1) enqueue celery task
-    2) persist QUEUED row into MySQL
+    1) persist QUEUED row into the database
+    2) enqueue celery task (or run it on the local executor in embedded mode)
     3) return {"task_id": <id>}
     """
     task_id = str(uuid4())
     params = {"word": word}
 
-    with get_engine().begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO tasks (task_id, task_type, status, params_json)
-                VALUES (:task_id, :task_type, :status, :params_json)
-                ON DUPLICATE KEY UPDATE
-                  status=VALUES(status),
-                  params_json=VALUES(params_json),
-                  updated_at=CURRENT_TIMESTAMP
-            """),
-            {
-                "task_id": task_id,
-                "task_type": "word-analysis",
-                "status": "QUEUED",
-                "params_json": json.dumps(params),
-            },
-        )
-    record_task_queued(task_id, "word-analysis", params)
+    create_queued_task(task_id, "word-analysis", params)
     try:
-        celery_task.apply_async(args=[word], task_id=task_id)
+        enqueue_task(
+            celery_task, [word], task_id, _enqueue_headers(profile), **time_limit_options("word-analysis")
+        )
     except Exception as exc:
-        with get_engine().begin() as conn:
-            conn.execute(
-                text(
-                    """
-                    UPDATE tasks
-                    SET status='FAILURE', error_text=:error_text
-                    WHERE task_id=:task_id
-                    """
-                ),
-                {"task_id": task_id, "error_text": str(exc)},
-            )
-        record_task_failure(task_id, "word-analysis", str(exc))
+        transition_task_state(task_id, "word-analysis", "FAILURE", error_text=str(exc))
         raise
     return {"task_id": task_id}
 
 
-def create_simulation_task(n: int, steps: int, celery_task) -> dict:
+def create_simulation_task(n: int, steps: int, celery_task, profile: bool = False) -> dict:
     """
     Called by routes_tasks.py: create_simulation_task(n, steps, simulation_run)
     """
     task_id = str(uuid4())
     params = {"n": n, "steps": steps}
 
-    with get_engine().begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO tasks (task_id, task_type, status, params_json)
-                VALUES (:task_id, :task_type, :status, :params_json)
-                ON DUPLICATE KEY UPDATE
-                  status=VALUES(status),
-                  params_json=VALUES(params_json),
-                  updated_at=CURRENT_TIMESTAMP
-            """),
-            {
-                "task_id": task_id,
-                "task_type": "simulation-run",
-                "status": "QUEUED",
-                "params_json": json.dumps(params),
-            },
-        )
-    record_task_queued(task_id, "simulation-run", params)
+    create_queued_task(task_id, "simulation-run", params)
     try:
-        celery_task.apply_async(args=[n, steps], task_id=task_id)
+        enqueue_task(
+            celery_task, [n, steps], task_id, _enqueue_headers(profile), **time_limit_options("simulation-run")
+        )
     except Exception as exc:
-        with get_engine().begin() as conn:
-            conn.execute(
-                text(
-                    """
-                    UPDATE tasks
-                    SET status='FAILURE', error_text=:error_text
-                    WHERE task_id=:task_id
-                    """
-                ),
-                {"task_id": task_id, "error_text": str(exc)},
-            )
-        record_task_failure(task_id, "simulation-run", str(exc))
+        transition_task_state(task_id, "simulation-run", "FAILURE", error_text=str(exc))
         raise
     return {"task_id": task_id}
-def _normalize_jsonish(value: Any) -> Any:
-    if value is None:
-        return None
-    if isinstance(value, (dict, list, int, float, bool)):
-        return value
-    if isinstance(value, bytes):
-        try:
-            value = value.decode("utf-8")
-        except Exception:
-            return str(value)
-    if isinstance(value, str):
-        text_value = value.strip()
-        # tolerate single or double JSON encoding from hotfix branches
-        for _ in range(2):
-            if not isinstance(text_value, str):
-                break
-            if not (text_value.startswith("{") or text_value.startswith("[")):
-                break
-            try:
-                decoded = json.loads(text_value)
-            except Exception:
-                break
-            if isinstance(decoded, str):
-                text_value = decoded
-                continue
-            return decoded
-        return text_value
-    return str(value)
-
+def _celery_only_payload(task_id: str, async_result_factory) -> Dict[str, Any]:
+    archive = get_archive(task_id)
+    if archive is not None and archive["restored_at"] is None:
+        return {
+            "task_id": task_id,
+            "state": "ARCHIVED",
+            "task_type": archive["task_type"],
+            "archived_status": archive["status"],
+            "archived_at": archive["archived_at"],
+        }
+    if async_result_factory is None:
+        return {"task_id": task_id, "state": "NOT_FOUND"}
+    res = async_result_factory(task_id)
+    payload = {"task_id": task_id, "state": res.state}
+    if res.successful():
+        payload["result"] = normalize_jsonish(res.result)
+    return payload
 
-def get_task_payload(task_id: str, async_result_factory=None) -> Dict[str, Any]:
-    with get_engine().begin() as conn:
-        row = conn.execute(
-            text("""
-                SELECT task_id, status, params_json, result_json, error_text
-                FROM tasks
-                WHERE task_id=:task_id
-            """),
-            {"task_id": task_id},
-        ).mappings().first()
 
-    if not row:
-        if async_result_factory is None:
-            return {"task_id": task_id, "state": "NOT_FOUND"}
-        res = async_result_factory(task_id)
-        payload = {"task_id": task_id, "state": res.state}
-        if res.successful():
-            payload["result"] = _normalize_jsonish(res.result)
-        return payload
-
-    payload: Dict[str, Any] = {
+def _row_payload(row) -> Dict[str, Any]:
+    return {
         "task_id": row["task_id"],
         "state": row["status"],
-        "params": _normalize_jsonish(row["params_json"]),
-        "result": _normalize_jsonish(row["result_json"]),
-        "error": _normalize_jsonish(row["error_text"]),
+        "params": raw_json(row["params_json"]),
+        "result": raw_json(row["result_json"]),
+        "error": normalize_jsonish(row["error_text"]),
     }
-    if async_result_factory is not None and row["status"] in ("QUEUED", "RUNNING"):
-        res = async_result_factory(task_id)
-        try:
-            if res.info is not None:
-                payload["progress"] = _normalize_jsonish(res.info)
-        except Exception:
-            pass
-    return payload
 
-def list_task_payload(limit: int = 20) -> Dict[str, Any]:
-    limit = max(1, min(int(limit), 200))
-    with get_engine().begin() as conn:
-        rows = conn.execute(
-            text("""
-                SELECT task_id, task_type, status, params_json, created_at, updated_at
-                FROM tasks
-                ORDER BY id DESC
-                LIMIT :limit
-            """),
-            {"limit": limit},
-        ).mappings().all()
+
+def _list_payload(rows) -> Dict[str, Any]:
     return {
         "items": [
             {
                 "task_id": r["task_id"],
                 "task_type": r["task_type"],
                 "status": r["status"],
-                "params_json": _normalize_jsonish(r["params_json"]),
+                "params_json": raw_json(r["params_json"]),
                 "created_at": r["created_at"],
                 "updated_at": r["updated_at"],
             }
             for r in rows
         ]
     }
+
+
+def get_task_payload(task_id: str, async_result_factory=None) -> Dict[str, Any]:
+    row = get_task(task_id)
+    if not row:
+        return _celery_only_payload(task_id, async_result_factory)
+    payload = _row_payload(row)
+    if row["status"] in ("QUEUED", "RUNNING"):
+        progress = read_progress(task_id)
+        if progress is not None:
+            payload["progress"] = progress
+    return payload
+
+
+async def get_task_payload_async(task_id: str, async_result_factory=None) -> Dict[str, Any]:
+    # the Celery result backend and Redis clients are blocking, so they are consulted off the event loop
+    row = await get_task_async(task_id)
+    if not row:
+        return await asyncio.to_thread(_celery_only_payload, task_id, async_result_factory)
+    payload = _row_payload(row)
+    if row["status"] in ("QUEUED", "RUNNING"):
+        progress = await asyncio.to_thread(read_progress, task_id)
+        if progress is not None:
+            payload["progress"] = progress
+    return payload
+
+
+def list_task_payload(limit: int = 20) -> Dict[str, Any]:
+    return _list_payload(list_tasks(max(1, min(int(limit), 200))))
+
+
+async def list_task_payload_async(limit: int = 20) -> Dict[str, Any]:
+    return _list_payload(await list_tasks_async(max(1, min(int(limit), 200))))
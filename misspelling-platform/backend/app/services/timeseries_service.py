@@ -5,12 +5,18 @@ from datetime import date, timedelta
 
 from ..db.data_sources_repo import ensure_data_source
 from ..db.time_series_repo import (
+    count_rollups_by_series,
+    count_rollups_by_series_async,
     create_series,
     ensure_term,
     ensure_variant,
     get_series_points_for_task,
+    get_series_points_for_task_async,
+    get_series_rollups_for_task,
+    get_series_rollups_for_task_async,
     insert_series_points,
     list_series_by_task,
+    list_series_by_task_async,
 )
 
 
@@ -70,11 +76,13 @@ def persist_simulation_stub_timeseries(task_id: str, n: int, steps: int):
     _persist_stub_bundle(task_id, "simulation-run", canonical, count)
 
 
-def get_task_timeseries_summary(task_id: str):
-    rows = list_series_by_task(task_id)
-    if not rows:
+def _summary_payload(task_id: str, items: list[dict], granularity: str, counts: dict[int, int] | None):
+    if not items:
         return {"task_id": task_id, "items": [], "variants": [], "point_count": 0}
-    items = [dict(r) for r in rows]
+    if counts is not None:
+        for item in items:
+            item["granularity"] = granularity
+            item["point_count"] = counts.get(int(item["series_id"]), 0)
     return {
         "task_id": task_id,
         "source": items[0]["source_name"],
@@ -86,11 +94,77 @@ def get_task_timeseries_summary(task_id: str):
     }
 
 
-def get_task_timeseries_points(task_id: str, variant: str = "correct"):
-    series_id, rows = get_series_points_for_task(task_id, variant or "correct")
+def _rollup_points_payload(task_id: str, variant: str, granularity: str, series_id, rollups):
     return {
         "task_id": task_id,
-        "variant": variant or "correct",
+        "variant": variant,
+        "granularity": granularity,
+        "series_id": series_id,
+        "items": [
+            {
+                "time": str(r["t"]),
+                "value": float(r["value_sum"]) / int(r["point_count"]),
+                "count": int(r["point_count"]),
+                "sum": float(r["value_sum"]),
+                "min": float(r["value_min"]),
+                "max": float(r["value_max"]),
+            }
+            for r in rollups
+        ],
+    }
+
+
+def _day_points_payload(task_id: str, variant: str, granularity: str, series_id, rows):
+    return {
+        "task_id": task_id,
+        "variant": variant,
+        "granularity": granularity,
         "series_id": series_id,
         "items": [{"time": str(r["t"]), "value": float(r["value"])} for r in rows],
     }
+
+
+def get_task_timeseries_summary(task_id: str, granularity: str = "day"):
+    items = [dict(r) for r in list_series_by_task(task_id)]
+    counts = None
+    if items and granularity != "day":
+        counts = count_rollups_by_series([int(r["series_id"]) for r in items], granularity)
+    return _summary_payload(task_id, items, granularity, counts)
+
+
+async def get_task_timeseries_summary_async(task_id: str, granularity: str = "day"):
+    items = [dict(r) for r in await list_series_by_task_async(task_id)]
+    counts = None
+    if items and granularity != "day":
+        counts = await count_rollups_by_series_async([int(r["series_id"]) for r in items], granularity)
+    return _summary_payload(task_id, items, granularity, counts)
+
+
+def get_task_timeseries_points(
+    task_id: str,
+    variant: str = "correct",
+    granularity: str = "day",
+    start: date | None = None,
+    end: date | None = None,
+):
+    variant = variant or "correct"
+    if granularity != "day":
+        series_id, rollups = get_series_rollups_for_task(task_id, variant, granularity, start, end)
+        return _rollup_points_payload(task_id, variant, granularity, series_id, rollups)
+    series_id, rows = get_series_points_for_task(task_id, variant, start, end)
+    return _day_points_payload(task_id, variant, granularity, series_id, rows)
+
+
+async def get_task_timeseries_points_async(
+    task_id: str,
+    variant: str = "correct",
+    granularity: str = "day",
+    start: date | None = None,
+    end: date | None = None,
+):
+    variant = variant or "correct"
+    if granularity != "day":
+        series_id, rollups = await get_series_rollups_for_task_async(task_id, variant, granularity, start, end)
+        return _rollup_points_payload(task_id, variant, granularity, series_id, rollups)
+    series_id, rows = await get_series_points_for_task_async(task_id, variant, start, end)
+    return _day_points_payload(task_id, variant, granularity, series_id, rows)
@@ -1,72 +1,106 @@
-import json
 import time
 
-from celery.signals import task_failure, task_success
+from celery import states
+from celery.exceptions import Ignore, SoftTimeLimitExceeded
+from celery.signals import task_postrun, task_prerun, worker_init
 
 from ..celery_app import celery_app
-from ..db.tasks_repo import set_task_failure, set_task_running, set_task_success
+from ..db.core import get_engine
+from ..db.time_series_rollups_repo import rebuild_series_rollups
+from ..metrics import observe_task_transition, start_worker_exporter
+from ..profiling import (
+    SLOW_TASK_MS,
+    capture_kind,
+    install_sql_capture,
+    should_profile_task,
+    start_capture,
+    stop_capture,
+)
+from ..services.analysis_service import run_misspelling_analysis
 from ..services.artifact_service import (
     build_output_dir,
     register_simulation_artifacts,
     write_simulation_csv,
     write_simulation_preview_png,
 )
-from ..services.task_event_service import (
-    record_task_failure,
-    record_task_running,
-    record_task_success,
+from ..services.cancellation_service import (
+    CancellationToken,
+    TaskCancelled,
+    finish_cancelled,
+    reap_overdue_tasks,
 )
+from ..services.ingestion_service import sync_all_sources
+from ..services.partition_service import maintain_partitions
+from ..services.profiling_service import save_capture
+from ..services.progress_service import ProgressReporter
+from ..services.retention_service import apply_retention
+from ..services.similarity_service import refresh_similarity_index
+from ..services.task_event_service import transition_task_state
 from ..services.timeseries_service import (
     persist_simulation_stub_timeseries,
     persist_word_analysis_stub_timeseries,
 )
 
 
+def _start_task(task_id: str, task_type: str) -> CancellationToken:
+    if not transition_task_state(task_id, task_type, "RUNNING"):
+        # redelivered after it already finished or was cancelled (or no such task): keep the recorded outcome
+        raise Ignore()
+    return CancellationToken(task_id, task_type)
+
+
+def _stop_cancelled(task, task_id: str, task_type: str, exc: Exception):
+    reason = exc.reason if isinstance(exc, TaskCancelled) else "soft time limit exceeded"
+    finish_cancelled(task_id, task_type, reason)
+    task.update_state(state=states.REVOKED, meta={"reason": reason})
+    raise Ignore()
+
+
 @celery_app.task(bind=True)
 def demo_analysis(self, word: str):
     task_id = self.request.id
-    set_task_running(task_id)
-    record_task_running(task_id, "word-analysis")
+    token = _start_task(task_id, "word-analysis")
+    progress = ProgressReporter(task_id, total=2)
     try:
-        for i in range(5):
-            time.sleep(1)
-            self.update_state(state="PROGRESS", meta={"step": i + 1, "total": 5})
-        result = {"word": word, "message": "analysis done", "dummy_metric": 42}
+        token.check()
         persist_word_analysis_stub_timeseries(task_id, word)
-        set_task_success(task_id, json.dumps(result))
-        record_task_success(task_id, "word-analysis")
+        progress.update(1)
+        token.check()
+        metrics = run_misspelling_analysis([task_id], "word-analysis")[task_id]
+        progress.update(2)
+        token.check()
+        result = {"word": word, "message": "analysis done", **metrics}
+        transition_task_state(task_id, "word-analysis", "SUCCESS", result=result)
         return result
+    except (TaskCancelled, SoftTimeLimitExceeded) as e:
+        _stop_cancelled(self, task_id, "word-analysis", e)
     except Exception as e:
-        set_task_failure(task_id, str(e))
-        record_task_failure(task_id, "word-analysis", str(e))
+        transition_task_state(task_id, "word-analysis", "FAILURE", error_text=str(e))
         raise
-
-
-@task_success.connect(sender=demo_analysis)
-def _on_success(sender=None, result=None, **kwargs):
-    task_id = kwargs.get("task_id")
-    set_task_success(task_id, json.dumps(result))
-
-
-@task_failure.connect(sender=demo_analysis)
-def _on_failure(sender=None, exception=None, traceback=None, **kwargs):
-    task_id = kwargs.get("task_id")
-    set_task_failure(task_id, str(exception))
+    finally:
+        progress.clear()
 
 
 @celery_app.task(bind=True)
 def simulation_run(self, n: int = 30, steps: int = 50):
     task_id = self.request.id
-    set_task_running(task_id)
-    record_task_running(task_id, "simulation-run")
+    token = _start_task(task_id, "simulation-run")
+    progress = ProgressReporter(task_id, total=steps)
     try:
-        series = [{"t": t, "errors": (t % 10), "correct": (t * 2) % 17} for t in range(steps)]
+        series = []
+        for t in range(steps):
+            token.check()
+            series.append({"t": t, "errors": (t % 10), "correct": (t * 2) % 17})
+            progress.update(t + 1, phase="simulate")
+        progress.update(steps, phase="write")
+        progress.flush()
         out_dir = build_output_dir(task_id)
         out_csv = out_dir / "result.csv"
         out_png = out_dir / "preview.png"
         write_simulation_csv(series, out_csv)
         write_simulation_preview_png(series, out_png)
         register_simulation_artifacts(task_id, out_csv, out_png)
+        token.check()
         result = {
             "n": n,
             "steps": steps,
@@ -74,10 +108,95 @@ def simulation_run(self, n: int = 30, steps: int = 50):
             "preview": series[:5],
         }
         persist_simulation_stub_timeseries(task_id, n, steps)
-        set_task_success(task_id, json.dumps(result))
-        record_task_success(task_id, "simulation-run")
+        token.check()
+        transition_task_state(task_id, "simulation-run", "SUCCESS", result=result)
         return result
+    except (TaskCancelled, SoftTimeLimitExceeded) as e:
+        _stop_cancelled(self, task_id, "simulation-run", e)
     except Exception as e:
-        set_task_failure(task_id, str(e))
-        record_task_failure(task_id, "simulation-run", str(e))
+        transition_task_state(task_id, "simulation-run", "FAILURE", error_text=str(e))
         raise
+    finally:
+        progress.clear()
+
+
+@celery_app.task
+def ingest_data_sources():
+    return sync_all_sources()
+
+
+@celery_app.task
+def rebuild_timeseries_rollups(series_id: int | None = None):
+    return {"series": rebuild_series_rollups(series_id)}
+
+
+@celery_app.task
+def refresh_similarity_vectors():
+    return refresh_similarity_index()
+
+
+@celery_app.task
+def apply_retention_policies(max_tasks: int | None = None):
+    return apply_retention(max_tasks=max_tasks)
+
+
+@celery_app.task
+def maintain_table_partitions():
+    return maintain_partitions()
+
+
+@celery_app.task
+def reap_overdue_task_runs():
+    return reap_overdue_tasks(TASK_TYPES.values())
+
+
+TASK_TYPES = {
+    demo_analysis.name: "word-analysis",
+    simulation_run.name: "simulation-run",
+}
+_started_at: dict[str, float] = {}
+_captures: dict[str, tuple] = {}
+
+
+def _request_header(request, name: str):
+    value = getattr(request, name, None)
+    if value is None:
+        value = (getattr(request, "headers", None) or {}).get(name)
+    return value
+
+
+@task_prerun.connect
+def _on_prerun(sender=None, task_id=None, task=None, **kwargs):
+    now = time.time()
+    _started_at[task_id] = now
+    if task.name in TASK_TYPES:
+        profile = should_profile_task(_request_header(task.request, "profile"))
+        _captures[task_id] = start_capture("task", task.name, profile)
+    queued_at = _request_header(task.request, "queued_at")
+    if queued_at is not None:
+        observe_task_transition(TASK_TYPES.get(task.name, task.name), "QUEUED", "RUNNING", now - float(queued_at))
+
+
+@task_postrun.connect
+def _on_postrun(sender=None, task_id=None, task=None, state=None, **kwargs):
+    started = _started_at.pop(task_id, None)
+    if started is not None:
+        task_type = TASK_TYPES.get(task.name, task.name)
+        observe_task_transition(task_type, "RUNNING", state or "UNKNOWN", time.time() - started)
+    pending = _captures.pop(task_id, None)
+    if pending is not None:
+        capture = stop_capture(*pending)
+        kind = capture_kind(capture, SLOW_TASK_MS, "slow-task")
+        if kind is not None:
+            try:
+                save_capture(task_id, kind, capture.report(task_id=task_id, state=state))
+            except Exception:
+                pass
+
+
+@worker_init.connect
+def _on_worker_init(**kwargs):
+    start_worker_exporter()
+
+
+install_sql_capture(get_engine())
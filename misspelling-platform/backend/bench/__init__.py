@@ -0,0 +1 @@
+"""Reproducible benchmarks for API and worker hot paths (``python -m bench --help``)."""
@@ -0,0 +1,54 @@
+"""Latency summaries and JSON baselines."""
+import json
+from pathlib import Path
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, max(0, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[idx]
+
+
+def summarize(latencies_s: list[float], rows: int) -> dict:
+    ordered = sorted(latencies_s)
+    total = sum(ordered)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "ops_per_s": round(len(ordered) / total, 1) if total else None,
+        "rows_per_s": round(rows / total, 1) if total else None,
+    }
+
+
+def save_baseline(name: str, report: dict) -> Path:
+    BASELINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = BASELINE_DIR / f"{name}.json"
+    path.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    return path
+
+
+def load_baseline(name: str) -> dict:
+    path = Path(name)
+    if not path.exists():
+        path = BASELINE_DIR / f"{name}.json"
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return one line per case whose p95 got slower than ``baseline * (1 + tolerance)``."""
+    regressions = []
+    for case, current in report["cases"].items():
+        before = baseline.get("cases", {}).get(case)
+        if not before or not before.get("p95_ms"):
+            continue
+        ratio = current["p95_ms"] / before["p95_ms"]
+        line = f"{case}: p95 {before['p95_ms']:.3f}ms -> {current['p95_ms']:.3f}ms ({ratio:.2f}x)"
+        print(("REGRESSION " if ratio > 1 + tolerance else "ok         ") + line)
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+    return regressions
@@ -0,0 +1,183 @@
+"""Bulk seeding of benchmark rows (task ids and series are prefixed with ``bench-``)."""
+import json
+import math
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app.db.core import get_engine
+from app.db.data_sources_repo import ensure_data_source
+from app.db.dialect import json_text
+from app.db.time_series_repo import ensure_term
+from app.db.time_series_rollups_repo import rebuild_series_rollups
+
+TASK_PREFIX = "bench-"
+BATCH = 10_000
+
+SCALES = {
+    # tasks, events, points
+    "tiny": (1_000, 10_000, 100_000),
+    "small": (100_000, 1_000_000, 10_000_000),
+    "full": (1_000_000, 10_000_000, 100_000_000),
+}
+POINTS_PER_SERIES = 1_000
+
+
+def bench_task_id(i: int) -> str:
+    return f"{TASK_PREFIX}{i:08d}"
+
+
+def _insert_batches(sql: str, rows_iter, total: int, label: str) -> float:
+    started = time.perf_counter()
+    batch = []
+    done = 0
+    with get_engine().connect() as conn:
+        for row in rows_iter:
+            batch.append(row)
+            if len(batch) >= BATCH:
+                conn.execute(text(sql), batch)
+                conn.commit()
+                done += len(batch)
+                batch = []
+                if done % (BATCH * 50) == 0:
+                    print(f"  {label}: {done}/{total}", flush=True)
+        if batch:
+            conn.execute(text(sql), batch)
+            conn.commit()
+            done += len(batch)
+    elapsed = time.perf_counter() - started
+    print(f"  {label}: {done} rows in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.0f} rows/s)", flush=True)
+    return elapsed
+
+
+def clear_bench_rows() -> None:
+    params = {"prefix": f"{TASK_PREFIX}%"}
+    series_filter = f"{json_text('meta_json', 'task_id')} LIKE :prefix"
+    with get_engine().begin() as conn:
+        # points and events are deleted explicitly: the partitioned schema variant has no FKs to cascade them
+        conn.execute(
+            text(
+                "DELETE FROM time_series_points "
+                f"WHERE series_id IN (SELECT id FROM time_series WHERE {series_filter})"
+            ),
+            params,
+        )
+        conn.execute(text(f"DELETE FROM time_series WHERE {series_filter}"), params)
+        conn.execute(text("DELETE FROM task_events WHERE task_id LIKE :prefix"), params)
+        # task_artifacts cascade from tasks
+        conn.execute(text("DELETE FROM tasks WHERE task_id LIKE :prefix"), params)
+
+
+def seeded_task_count() -> int:
+    with get_engine().begin() as conn:
+        return int(
+            conn.execute(
+                text("SELECT COUNT(*) FROM tasks WHERE task_id LIKE :prefix"), {"prefix": f"{TASK_PREFIX}%"}
+            ).scalar_one()
+        )
+
+
+def seed(scale: str) -> dict:
+    n_tasks, n_events, n_points = SCALES[scale]
+    if seeded_task_count() >= n_tasks:
+        print(f"seed: {n_tasks} bench tasks already present, skipping", flush=True)
+        return {"tasks": n_tasks, "events": n_events, "points": n_points, "skipped": True}
+
+    clear_bench_rows()
+    print(f"seed: scale={scale} tasks={n_tasks} events={n_events} points={n_points}", flush=True)
+    params = json.dumps({"word": "benchmark"})
+    result = json.dumps({"word": "benchmark", "message": "analysis done"})
+    _insert_batches(
+        """
+        INSERT INTO tasks (task_id, task_type, status, params_json, result_json)
+        VALUES (:task_id, :task_type, 'SUCCESS', :params_json, :result_json)
+        """,
+        (
+            {
+                "task_id": bench_task_id(i),
+                "task_type": "word-analysis" if i % 4 else "simulation-run",
+                "params_json": params,
+                "result_json": result,
+            }
+            for i in range(n_tasks)
+        ),
+        n_tasks,
+        "tasks",
+    )
+
+    per_task = max(1, n_events // n_tasks)
+    lifecycle = ("QUEUED", "RUNNING", "SUCCESS")
+    _insert_batches(
+        """
+        INSERT INTO task_events (task_id, level, message, meta_json)
+        VALUES (:task_id, :level, :message, NULL)
+        """,
+        (
+            {
+                "task_id": bench_task_id(i),
+                "level": lifecycle[j] if j < len(lifecycle) else "INFO",
+                "message": f"bench event {j}",
+            }
+            for i in range(n_tasks)
+            for j in range(per_task)
+        ),
+        n_tasks * per_task,
+        "events",
+    )
+
+    source_id = ensure_data_source("bench")
+    term_id = ensure_term("benchmark", category="bench")
+    n_series = max(1, math.ceil(n_points / POINTS_PER_SERIES))
+    start = date(2000, 1, 1)
+    with get_engine().begin() as conn:
+        conn.execute(
+            text(
+                """
+                INSERT INTO time_series (
+                  term_id, variant_id, source_id, granularity, window_start, window_end, units, meta_json
+                ) VALUES (
+                  :term_id, NULL, :source_id, 'day', :window_start, :window_end, 'relative_freq', :meta_json
+                )
+                """
+            ),
+            [
+                {
+                    "term_id": term_id,
+                    "source_id": source_id,
+                    "window_start": start,
+                    "window_end": start + timedelta(days=POINTS_PER_SERIES - 1),
+                    "meta_json": json.dumps({"task_id": bench_task_id(s % n_tasks), "variant": f"bench_{s}"}),
+                }
+                for s in range(n_series)
+            ],
+        )
+        series_ids = (
+            conn.execute(
+                text(
+                    f"""
+                    SELECT id FROM time_series
+                    WHERE source_id = :source_id AND {json_text('meta_json', 'task_id')} LIKE :prefix
+                    ORDER BY id
+                    """
+                ),
+                {"source_id": source_id, "prefix": f"{TASK_PREFIX}%"},
+            )
+            .scalars()
+            .all()
+        )
+    _insert_batches(
+        "INSERT INTO time_series_points (series_id, t, value) VALUES (:series_id, :t, :value)",
+        (
+            {"series_id": sid, "t": start + timedelta(days=d), "value": 1.0 + math.sin(d / 9.0) + (sid % 7) * 0.1}
+            for sid in series_ids
+            for d in range(POINTS_PER_SERIES)
+        ),
+        len(series_ids) * POINTS_PER_SERIES,
+        "points",
+    )
+    started = time.perf_counter()
+    for sid in series_ids:
+        rebuild_series_rollups(int(sid))
+    print(f"  rollups: {len(series_ids)} series in {time.perf_counter() - started:.1f}s", flush=True)
+    return {"tasks": n_tasks, "events": n_tasks * per_task, "points": len(series_ids) * POINTS_PER_SERIES}
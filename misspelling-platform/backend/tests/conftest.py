@@ -0,0 +1,37 @@
+"""Tests run in embedded mode: a throwaway SQLite file, local artifact store and in-process Redis.
+
+The environment is set before ``app`` is imported, since its modules read it at import time.
+"""
+import os
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+
+_ROOT = Path(tempfile.mkdtemp(prefix="misspell-tests-"))
+os.environ.update(
+    {
+        "EMBEDDED_MODE": "1",
+        "EMBEDDED_DB_PATH": str(_ROOT / "embedded.db"),
+        "EMBEDDED_BEAT": "0",
+        "ARTIFACT_STORE": "local",
+        "ARTIFACT_STORE_ROOT": str(_ROOT / "artifacts"),
+        "SIMILARITY_INDEX_DIR": str(_ROOT / "similarity"),
+        "ADMISSION_ENABLED": "0",
+    }
+)
+for _name in ("DATABASE_URL", "DATABASE_READ_URL", "REDIS_URL", "CELERY_BROKER_URL"):
+    os.environ.pop(_name, None)
+
+import pytest  # noqa: E402
+
+from app.db.core import init_embedded_db  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def embedded_db():
+    assert init_embedded_db()
+
+
+@pytest.fixture
+def task_id() -> str:
+    return f"test-{uuid4().hex}"
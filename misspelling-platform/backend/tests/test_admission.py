@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+
+from app.services import admission_service
+from app.services.admission_service import TOKEN_BUCKET_LUA, _take_local_tokens
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+@pytest.fixture(autouse=True)
+def clean_buckets():
+    admission_service._local_buckets.clear()
+    yield
+    admission_service._local_buckets.clear()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission_service.time, "monotonic", clock)
+    return clock
+
+
+def _take(cost, rates=(1.0, 10.0), bursts=(3.0, 100.0)):
+    return _take_local_tokens(["caller", "global"], list(rates), list(bursts), cost)
+
+
+def test_burst_then_wait(clock):
+    assert [_take(1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert _take(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert _take(1) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert _take(1) == 0.0
+
+
+def test_refill_is_capped_at_burst(clock):
+    assert _take(3) == 0.0
+    clock.now += 60
+    assert _take(3) == 0.0
+    assert _take(1) == pytest.approx(1.0)
+
+
+def test_deducts_from_both_buckets_or_neither(clock):
+    # the global bucket is the one short here; the caller bucket must keep its tokens
+    assert _take(2, bursts=(10.0, 2.0)) == 0.0
+    assert _take(2, bursts=(10.0, 2.0)) == pytest.approx(0.2)
+    assert admission_service._local_buckets["caller"][0] == pytest.approx(8.0)
+    assert admission_service._local_buckets["global"][0] == pytest.approx(0.0)
+
+
+def test_wait_is_the_slower_bucket(clock):
+    assert _take(3, rates=(1.0, 0.5), bursts=(3.0, 3.0)) == 0.0
+    assert _take(1, rates=(1.0, 0.5), bursts=(3.0, 3.0)) == pytest.approx(2.0)
+
+
+def test_local_buckets_are_bounded(clock, monkeypatch):
+    monkeypatch.setattr(admission_service, "LOCAL_BUCKETS_MAX", 3)
+    for i in range(5):
+        _take_local_tokens([f"client:{i}", "global"], [1.0, 10.0], [3.0, 100.0], 1)
+    assert len(admission_service._local_buckets) == 3
+    assert "global" in admission_service._local_buckets
+
+
+@pytest.fixture
+def redis_client():
+    if not TEST_REDIS_URL:
+        pytest.skip("TEST_REDIS_URL not set")
+    import redis
+
+    client = redis.Redis.from_url(TEST_REDIS_URL)
+    prefix = f"test:admission:{time.time_ns()}"
+    keys = [f"{prefix}:caller", f"{prefix}:global"]
+    yield client, keys
+    client.delete(*keys)
+    client.close()
+
+
+def test_lua_script_matches_local_bucket(redis_client):
+    client, keys = redis_client
+    script = client.register_script(TOKEN_BUCKET_LUA)
+
+    def take(cost, rate=0.001, burst=3.0, global_burst=100.0):
+        allowed, wait = script(keys=keys, args=[rate, burst, 10.0, global_burst, cost, 60])
+        return int(allowed), float(wait)
+
+    assert [take(1)[0] for _ in range(3)] == [1, 1, 1]
+    allowed, wait = take(1)
+    assert allowed == 0
+    assert wait == pytest.approx(1 / 0.001, rel=0.05)
+    assert client.ttl(keys[0]) > 0
+
+
+def test_lua_script_deducts_from_both_or_neither(redis_client):
+    client, keys = redis_client
+    script = client.register_script(TOKEN_BUCKET_LUA)
+    assert int(script(keys=keys, args=[0.001, 10.0, 0.001, 2.0, 2, 60])[0]) == 1
+    assert int(script(keys=keys, args=[0.001, 10.0, 0.001, 2.0, 2, 60])[0]) == 0
+    assert float(client.hget(keys[0], "tokens")) == pytest.approx(8.0, abs=0.01)
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import bindparam, text
+
+from app.db.core import get_engine
+from app.db.retention_repo import get_archive
+from app.db.task_artifacts_repo import get_artifact
+from app.db.tasks_repo import get_task
+from app.services import retention_service
+from app.services.artifact_service import iter_chunks, open_artifact, register_artifact_bytes
+from app.services.retention_service import archive_task, restore_task
+from app.services.task_event_service import create_queued_task, transition_task_state
+from app.services.timeseries_service import persist_word_analysis_stub_timeseries
+
+ARTIFACT = b"t,errors,correct\n" + b"".join(b"%d,%d,%d\n" % (i, i % 10, i % 17) for i in range(500))
+
+
+@pytest.fixture(autouse=True)
+def roots(tmp_path, monkeypatch):
+    monkeypatch.setattr(retention_service, "ARCHIVE_ROOT", tmp_path / "archives")
+    monkeypatch.setattr(retention_service, "OUTPUT_ROOT", tmp_path / "outputs")
+    return tmp_path
+
+
+def _snapshot(task_id: str) -> dict:
+    """Everything a restore must bring back, ids included."""
+    ids = bindparam("ids", expanding=True)
+    with get_engine().connect() as conn:
+        series = sorted(
+            conn.execute(
+                text("SELECT id, term_id, variant_id, units, meta_json FROM time_series WHERE meta_json LIKE :p"),
+                {"p": f'%"{task_id}"%'},
+            ).all()
+        )
+        series_ids = [s.id for s in series]
+        points = conn.execute(
+            text(
+                "SELECT series_id, t, value FROM time_series_points WHERE series_id IN :ids ORDER BY series_id, t"
+            ).bindparams(ids),
+            {"ids": series_ids},
+        ).all()
+        rollups = conn.execute(
+            text("SELECT COUNT(*) FROM time_series_rollups WHERE series_id IN :ids").bindparams(ids),
+            {"ids": series_ids},
+        ).scalar()
+        events = conn.execute(
+            text("SELECT id, level, message FROM task_events WHERE task_id = :t ORDER BY id"), {"t": task_id}
+        ).all()
+        artifacts = conn.execute(
+            text("SELECT id, filename, path FROM task_artifacts WHERE task_id = :t ORDER BY id"), {"t": task_id}
+        ).all()
+    return {"series": series, "points": points, "rollups": rollups, "events": events, "artifacts": artifacts}
+
+
+def _finished_task(task_id: str, output_root) -> None:
+    create_queued_task(task_id, "word-analysis", {"word": "retain"})
+    transition_task_state(task_id, "word-analysis", "RUNNING")
+    persist_word_analysis_stub_timeseries(task_id, "retain")
+    register_artifact_bytes(task_id, "csv", "series.csv", ARTIFACT, "text/csv")
+    out = output_root / task_id
+    out.mkdir(parents=True)
+    (out / "notes.txt").write_text("kept with the task")
+    transition_task_state(task_id, "word-analysis", "SUCCESS", result={"days": 60})
+
+
+def _read_artifact(task_id: str) -> bytes:
+    return b"".join(iter_chunks(open_artifact(get_artifact(task_id, "series.csv"))))
+
+
+def test_archive_then_restore_round_trip(task_id, roots):
+    output_root = roots / "outputs"
+    _finished_task(task_id, output_root)
+    before = _snapshot(task_id)
+    task_before = dict(get_task(task_id))
+    assert before["points"] and before["rollups"] and before["artifacts"]
+
+    archived = archive_task(task_before, datetime.utcnow() + timedelta(days=365))
+    assert archived["counts"]["time_series_points"] == len(before["points"])
+    assert get_task(task_id) is None
+    gone = _snapshot(task_id)
+    assert not gone["series"] and not gone["points"] and not gone["events"] and not gone["artifacts"]
+    assert not gone["rollups"]
+    assert not (output_root / task_id).exists()
+
+    result = restore_task(task_id)
+    assert result["state"] == "RESTORED"
+    assert result["restored"]["file"] == 1
+    assert result["restored"]["blob"] == 1
+    assert _snapshot(task_id) == before
+    task_after = dict(get_task(task_id))
+    assert {k: task_after[k] for k in ("status", "result_json", "params_json")} == {
+        k: task_before[k] for k in ("status", "result_json", "params_json")
+    }
+    assert (output_root / task_id / "notes.txt").read_text() == "kept with the task"
+    assert _read_artifact(task_id) == ARTIFACT
+    assert get_archive(task_id)["restored_at"] is not None
+
+
+def test_restore_after_newer_rows_were_written(task_id, roots):
+    output_root = roots / "outputs"
+    _finished_task(task_id, output_root)
+    before = _snapshot(task_id)
+    archive_task(dict(get_task(task_id)))
+    # rows written after the archive must not reuse the archived ids
+    _finished_task(f"{task_id}-next", output_root)
+
+    assert restore_task(task_id)["state"] == "RESTORED"
+    assert _snapshot(task_id) == before
+
+
+def test_restore_errors(task_id, roots):
+    assert restore_task(task_id)["error"] == "archive not found"
+    _finished_task(task_id, roots / "outputs")
+    archive_task(dict(get_task(task_id)))
+    assert restore_task(task_id)["state"] == "RESTORED"
+    assert restore_task(task_id)["error"] == "task already exists"
+
+    other = f"{task_id}-missing"
+    _finished_task(other, roots / "outputs")
+    archived = archive_task(dict(get_task(other)))
+    Path(archived["path"]).unlink()
+    assert restore_task(other)["error"] == "archive file missing"
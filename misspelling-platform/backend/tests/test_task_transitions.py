@@ -0,0 +1,98 @@
+import pytest
+
+from app.db.task_events_repo import list_events
+from app.db.tasks_repo import get_task
+from app.services import cancellation_service
+from app.services.cancellation_service import cancel_task, is_cancel_requested
+from app.services.task_event_service import create_queued_task, transition_task_state
+
+
+def _levels(task_id: str) -> list[str]:
+    return [e["level"] for e in list_events(task_id, 100)]
+
+
+@pytest.fixture
+def queued(task_id):
+    create_queued_task(task_id, "word-analysis", {"word": "demo"})
+    return task_id
+
+
+@pytest.fixture
+def running(queued):
+    assert transition_task_state(queued, "word-analysis", "RUNNING")
+    return queued
+
+
+def test_transition_writes_status_and_event(running):
+    assert transition_task_state(running, "word-analysis", "SUCCESS", result={"ok": True})
+    assert get_task(running)["status"] == "SUCCESS"
+    assert _levels(running) == ["QUEUED", "RUNNING", "SUCCESS"]
+
+
+@pytest.mark.parametrize("late", ["RUNNING", "FAILURE", "CANCELLED"])
+def test_finished_task_ignores_late_writes(running, late):
+    assert transition_task_state(running, "word-analysis", "SUCCESS", result={"ok": True})
+    assert not transition_task_state(running, "word-analysis", late, error_text="late")
+    row = get_task(running)
+    assert row["status"] == "SUCCESS"
+    assert row["error_text"] is None
+    assert _levels(running) == ["QUEUED", "RUNNING", "SUCCESS"]
+
+
+def test_allowed_from_narrows_source_states(running):
+    assert not transition_task_state(
+        running, "word-analysis", "CANCELLED", reason="cancel requested", allowed_from=("QUEUED",)
+    )
+    assert get_task(running)["status"] == "RUNNING"
+    assert _levels(running) == ["QUEUED", "RUNNING"]
+
+
+def test_allowed_from_matches_current_state(queued):
+    assert transition_task_state(
+        queued, "word-analysis", "CANCELLED", reason="cancel requested", allowed_from=("QUEUED",)
+    )
+    assert get_task(queued)["status"] == "CANCELLED"
+    assert _levels(queued) == ["QUEUED", "CANCELLED"]
+
+
+def test_transition_of_unknown_task_is_refused(task_id):
+    assert not transition_task_state(task_id, "word-analysis", "RUNNING")
+    assert get_task(task_id) is None
+
+
+def test_cancel_queued_task(queued):
+    assert cancel_task(queued) == {"task_id": queued, "state": "CANCELLED"}
+    assert get_task(queued)["status"] == "CANCELLED"
+    assert not is_cancel_requested(queued)
+
+
+def test_cancel_running_task_sets_flag(running):
+    assert cancel_task(running) == {"task_id": running, "state": "CANCELLING"}
+    assert get_task(running)["status"] == "RUNNING"
+    assert is_cancel_requested(running)
+
+
+def test_cancel_finished_task(running):
+    assert transition_task_state(running, "word-analysis", "SUCCESS", result={})
+    assert cancel_task(running)["error"] == "task already finished"
+
+
+def test_cancel_running_task_without_redis(running, monkeypatch):
+    monkeypatch.setattr(cancellation_service, "get_redis", lambda: None)
+    assert cancel_task(running)["error"] == "cancellation unavailable"
+    assert get_task(running)["status"] == "RUNNING"
+
+
+def test_cancel_running_task_when_redis_fails(running, monkeypatch):
+    class Failing:
+        def set(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cancellation_service, "get_redis", lambda: Failing())
+    assert cancel_task(running)["error"] == "cancellation unavailable"
+
+
+def test_finish_cancelled_loses_to_success(running):
+    assert transition_task_state(running, "word-analysis", "SUCCESS", result={})
+    assert cancellation_service.finish_cancelled(running, "word-analysis", "cancel requested") is None
+    assert get_task(running)["status"] == "SUCCESS"
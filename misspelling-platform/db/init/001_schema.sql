@@ -164,7 +164,8 @@ CREATE TABLE IF NOT EXISTS task_artifacts (
   CONSTRAINT fk_task_artifacts_task FOREIGN KEY (task_id) REFERENCES tasks(task_id) ON DELETE CASCADE,
   UNIQUE KEY uq_task_artifacts_unique (task_id, kind, filename),
   INDEX idx_task_artifacts_task (task_id),
-  INDEX idx_task_artifacts_kind (kind)
+  INDEX idx_task_artifacts_kind (kind),
+  INDEX idx_task_artifacts_path (path)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 CREATE TABLE IF NOT EXISTS time_series (
@@ -179,13 +180,17 @@ CREATE TABLE IF NOT EXISTS time_series (
   meta_json JSON NULL,
   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  -- set only on ingested source series ('<source_id>:<term_id>:<variant_id or ->:<granularity>'); task
+  -- series leave it NULL. The unique key makes concurrent syncs upsert the same series.
+  source_key VARCHAR(128) NULL,
   CONSTRAINT fk_time_series_term FOREIGN KEY (term_id) REFERENCES lexicon_terms(id) ON DELETE CASCADE,
   CONSTRAINT fk_time_series_variant FOREIGN KEY (variant_id) REFERENCES lexicon_variants(id) ON DELETE SET NULL,
   CONSTRAINT fk_time_series_source FOREIGN KEY (source_id) REFERENCES data_sources(id) ON DELETE RESTRICT,
   INDEX idx_time_series_term (term_id),
   INDEX idx_time_series_variant (variant_id),
   INDEX idx_time_series_source (source_id),
-  INDEX idx_time_series_granularity (granularity)
+  INDEX idx_time_series_granularity (granularity),
+  UNIQUE KEY uq_time_series_source_key (source_key)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 CREATE TABLE IF NOT EXISTS time_series_points (
@@ -198,6 +203,74 @@ CREATE TABLE IF NOT EXISTS time_series_points (
   INDEX idx_time_series_points_t (t)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+CREATE TABLE IF NOT EXISTS time_series_rollups (
+  series_id BIGINT NOT NULL,
+  granularity VARCHAR(16) NOT NULL,
+  bucket_start DATE NOT NULL,
+  point_count INT NOT NULL,
+  value_sum DOUBLE NOT NULL,
+  value_min DOUBLE NOT NULL,
+  value_max DOUBLE NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (series_id, granularity, bucket_start),
+  CONSTRAINT fk_time_series_rollups_series FOREIGN KEY (series_id) REFERENCES time_series(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS task_archives (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  task_id VARCHAR(255) NOT NULL UNIQUE,
+  task_type VARCHAR(64) NOT NULL,
+  status VARCHAR(32) NOT NULL,
+  path VARCHAR(512) NOT NULL,
+  sha256 CHAR(64) NOT NULL,
+  size_bytes BIGINT NOT NULL,
+  counts_json JSON NULL,
+  task_created_at TIMESTAMP NULL,
+  archived_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  restored_at TIMESTAMP NULL,
+  INDEX idx_task_archives_type (task_type),
+  INDEX idx_task_archives_archived (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS request_profiles (
+  id BIGINT PRIMARY KEY AUTO_INCREMENT,
+  kind VARCHAR(32) NOT NULL,
+  method VARCHAR(16) NOT NULL,
+  path VARCHAR(512) NOT NULL,
+  route VARCHAR(255) NULL,
+  status_code INT NOT NULL,
+  duration_ms DOUBLE NOT NULL,
+  report_json JSON NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_request_profiles_kind (kind),
+  INDEX idx_request_profiles_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- databases created before time_series.source_key: add it once and key the first source series of each
+-- (term, variant, source, granularity), the one ingestion used to pick
+SET @add_source_key := (
+  SELECT COUNT(*) = 0 FROM information_schema.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'time_series' AND COLUMN_NAME = 'source_key'
+);
+SET @ddl := IF(@add_source_key,
+  'ALTER TABLE time_series ADD COLUMN source_key VARCHAR(128) NULL, ADD UNIQUE KEY uq_time_series_source_key (source_key)',
+  'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+SET @ddl := IF(@add_source_key,
+  'UPDATE time_series ts
+   JOIN (
+     SELECT MIN(id) AS id FROM time_series
+     WHERE JSON_EXTRACT(meta_json, ''$.task_id'') IS NULL
+     GROUP BY term_id, variant_id, source_id, granularity
+   ) first_series ON first_series.id = ts.id
+   SET ts.source_key = CONCAT(ts.source_id, '':'', ts.term_id, '':'', IFNULL(ts.variant_id, ''-''), '':'', ts.granularity)',
+  'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
 INSERT IGNORE INTO data_sources (name, default_granularity, is_enabled) VALUES
   ('GDELT', 'day', 1),
   ('GBNC', 'year', 1);
@@ -0,0 +1,151 @@
+-- Partitioned schema variant for large installs. Apply once, after 001_schema.sql:
+--   mysql -h mysql -uroot -proot -D misspell < db/partitioned/002_partitioning.sql
+-- Not idempotent and not run by db-init. On a populated database every ALTER rebuilds the table.
+--
+-- MySQL partitioned tables cannot take part in foreign keys and every unique key must contain the
+-- partitioning column, so the two FKs below are dropped (the app deletes events and points
+-- explicitly instead of relying on ON DELETE CASCADE) and task_events' PK becomes (id, ts).
+--
+-- Monthly partitions are created here through 2027 (the ALTERs rebuild the table anyway, so this costs
+-- nothing extra) and p_future starts empty. The maintain_partitions beat job then splits p_future
+-- ahead of time while it is still empty, which is a metadata-only change, and drops expired months
+-- (app/services/partition_service.py). When applying this after 2027, extend both lists to the
+-- current month + 1 so no live rows land in p_future.
+
+ALTER TABLE time_series_points DROP FOREIGN KEY fk_time_series_points_series;
+
+ALTER TABLE time_series_points
+  PARTITION BY RANGE COLUMNS (t) (
+    PARTITION p_history VALUES LESS THAN ('2020-01-01'),
+    PARTITION p202001 VALUES LESS THAN ('2020-02-01'),
+    PARTITION p202002 VALUES LESS THAN ('2020-03-01'),
+    PARTITION p202003 VALUES LESS THAN ('2020-04-01'),
+    PARTITION p202004 VALUES LESS THAN ('2020-05-01'),
+    PARTITION p202005 VALUES LESS THAN ('2020-06-01'),
+    PARTITION p202006 VALUES LESS THAN ('2020-07-01'),
+    PARTITION p202007 VALUES LESS THAN ('2020-08-01'),
+    PARTITION p202008 VALUES LESS THAN ('2020-09-01'),
+    PARTITION p202009 VALUES LESS THAN ('2020-10-01'),
+    PARTITION p202010 VALUES LESS THAN ('2020-11-01'),
+    PARTITION p202011 VALUES LESS THAN ('2020-12-01'),
+    PARTITION p202012 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p202101 VALUES LESS THAN ('2021-02-01'),
+    PARTITION p202102 VALUES LESS THAN ('2021-03-01'),
+    PARTITION p202103 VALUES LESS THAN ('2021-04-01'),
+    PARTITION p202104 VALUES LESS THAN ('2021-05-01'),
+    PARTITION p202105 VALUES LESS THAN ('2021-06-01'),
+    PARTITION p202106 VALUES LESS THAN ('2021-07-01'),
+    PARTITION p202107 VALUES LESS THAN ('2021-08-01'),
+    PARTITION p202108 VALUES LESS THAN ('2021-09-01'),
+    PARTITION p202109 VALUES LESS THAN ('2021-10-01'),
+    PARTITION p202110 VALUES LESS THAN ('2021-11-01'),
+    PARTITION p202111 VALUES LESS THAN ('2021-12-01'),
+    PARTITION p202112 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p202201 VALUES LESS THAN ('2022-02-01'),
+    PARTITION p202202 VALUES LESS THAN ('2022-03-01'),
+    PARTITION p202203 VALUES LESS THAN ('2022-04-01'),
+    PARTITION p202204 VALUES LESS THAN ('2022-05-01'),
+    PARTITION p202205 VALUES LESS THAN ('2022-06-01'),
+    PARTITION p202206 VALUES LESS THAN ('2022-07-01'),
+    PARTITION p202207 VALUES LESS THAN ('2022-08-01'),
+    PARTITION p202208 VALUES LESS THAN ('2022-09-01'),
+    PARTITION p202209 VALUES LESS THAN ('2022-10-01'),
+    PARTITION p202210 VALUES LESS THAN ('2022-11-01'),
+    PARTITION p202211 VALUES LESS THAN ('2022-12-01'),
+    PARTITION p202212 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p202301 VALUES LESS THAN ('2023-02-01'),
+    PARTITION p202302 VALUES LESS THAN ('2023-03-01'),
+    PARTITION p202303 VALUES LESS THAN ('2023-04-01'),
+    PARTITION p202304 VALUES LESS THAN ('2023-05-01'),
+    PARTITION p202305 VALUES LESS THAN ('2023-06-01'),
+    PARTITION p202306 VALUES LESS THAN ('2023-07-01'),
+    PARTITION p202307 VALUES LESS THAN ('2023-08-01'),
+    PARTITION p202308 VALUES LESS THAN ('2023-09-01'),
+    PARTITION p202309 VALUES LESS THAN ('2023-10-01'),
+    PARTITION p202310 VALUES LESS THAN ('2023-11-01'),
+    PARTITION p202311 VALUES LESS THAN ('2023-12-01'),
+    PARTITION p202312 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p202401 VALUES LESS THAN ('2024-02-01'),
+    PARTITION p202402 VALUES LESS THAN ('2024-03-01'),
+    PARTITION p202403 VALUES LESS THAN ('2024-04-01'),
+    PARTITION p202404 VALUES LESS THAN ('2024-05-01'),
+    PARTITION p202405 VALUES LESS THAN ('2024-06-01'),
+    PARTITION p202406 VALUES LESS THAN ('2024-07-01'),
+    PARTITION p202407 VALUES LESS THAN ('2024-08-01'),
+    PARTITION p202408 VALUES LESS THAN ('2024-09-01'),
+    PARTITION p202409 VALUES LESS THAN ('2024-10-01'),
+    PARTITION p202410 VALUES LESS THAN ('2024-11-01'),
+    PARTITION p202411 VALUES LESS THAN ('2024-12-01'),
+    PARTITION p202412 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p202501 VALUES LESS THAN ('2025-02-01'),
+    PARTITION p202502 VALUES LESS THAN ('2025-03-01'),
+    PARTITION p202503 VALUES LESS THAN ('2025-04-01'),
+    PARTITION p202504 VALUES LESS THAN ('2025-05-01'),
+    PARTITION p202505 VALUES LESS THAN ('2025-06-01'),
+    PARTITION p202506 VALUES LESS THAN ('2025-07-01'),
+    PARTITION p202507 VALUES LESS THAN ('2025-08-01'),
+    PARTITION p202508 VALUES LESS THAN ('2025-09-01'),
+    PARTITION p202509 VALUES LESS THAN ('2025-10-01'),
+    PARTITION p202510 VALUES LESS THAN ('2025-11-01'),
+    PARTITION p202511 VALUES LESS THAN ('2025-12-01'),
+    PARTITION p202512 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p202601 VALUES LESS THAN ('2026-02-01'),
+    PARTITION p202602 VALUES LESS THAN ('2026-03-01'),
+    PARTITION p202603 VALUES LESS THAN ('2026-04-01'),
+    PARTITION p202604 VALUES LESS THAN ('2026-05-01'),
+    PARTITION p202605 VALUES LESS THAN ('2026-06-01'),
+    PARTITION p202606 VALUES LESS THAN ('2026-07-01'),
+    PARTITION p202607 VALUES LESS THAN ('2026-08-01'),
+    PARTITION p202608 VALUES LESS THAN ('2026-09-01'),
+    PARTITION p202609 VALUES LESS THAN ('2026-10-01'),
+    PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+    PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+    PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p202701 VALUES LESS THAN ('2027-02-01'),
+    PARTITION p202702 VALUES LESS THAN ('2027-03-01'),
+    PARTITION p202703 VALUES LESS THAN ('2027-04-01'),
+    PARTITION p202704 VALUES LESS THAN ('2027-05-01'),
+    PARTITION p202705 VALUES LESS THAN ('2027-06-01'),
+    PARTITION p202706 VALUES LESS THAN ('2027-07-01'),
+    PARTITION p202707 VALUES LESS THAN ('2027-08-01'),
+    PARTITION p202708 VALUES LESS THAN ('2027-09-01'),
+    PARTITION p202709 VALUES LESS THAN ('2027-10-01'),
+    PARTITION p202710 VALUES LESS THAN ('2027-11-01'),
+    PARTITION p202711 VALUES LESS THAN ('2027-12-01'),
+    PARTITION p202712 VALUES LESS THAN ('2028-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+  );
+
+ALTER TABLE task_events DROP FOREIGN KEY fk_task_events_task;
+
+ALTER TABLE task_events DROP PRIMARY KEY, ADD PRIMARY KEY (id, ts);
+
+ALTER TABLE task_events
+  PARTITION BY RANGE (UNIX_TIMESTAMP(ts)) (
+    PARTITION p_history VALUES LESS THAN (UNIX_TIMESTAMP('2026-01-01 00:00:00')),
+    PARTITION p202601 VALUES LESS THAN (UNIX_TIMESTAMP('2026-02-01 00:00:00')),
+    PARTITION p202602 VALUES LESS THAN (UNIX_TIMESTAMP('2026-03-01 00:00:00')),
+    PARTITION p202603 VALUES LESS THAN (UNIX_TIMESTAMP('2026-04-01 00:00:00')),
+    PARTITION p202604 VALUES LESS THAN (UNIX_TIMESTAMP('2026-05-01 00:00:00')),
+    PARTITION p202605 VALUES LESS THAN (UNIX_TIMESTAMP('2026-06-01 00:00:00')),
+    PARTITION p202606 VALUES LESS THAN (UNIX_TIMESTAMP('2026-07-01 00:00:00')),
+    PARTITION p202607 VALUES LESS THAN (UNIX_TIMESTAMP('2026-08-01 00:00:00')),
+    PARTITION p202608 VALUES LESS THAN (UNIX_TIMESTAMP('2026-09-01 00:00:00')),
+    PARTITION p202609 VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION p202701 VALUES LESS THAN (UNIX_TIMESTAMP('2027-02-01 00:00:00')),
+    PARTITION p202702 VALUES LESS THAN (UNIX_TIMESTAMP('2027-03-01 00:00:00')),
+    PARTITION p202703 VALUES LESS THAN (UNIX_TIMESTAMP('2027-04-01 00:00:00')),
+    PARTITION p202704 VALUES LESS THAN (UNIX_TIMESTAMP('2027-05-01 00:00:00')),
+    PARTITION p202705 VALUES LESS THAN (UNIX_TIMESTAMP('2027-06-01 00:00:00')),
+    PARTITION p202706 VALUES LESS THAN (UNIX_TIMESTAMP('2027-07-01 00:00:00')),
+    PARTITION p202707 VALUES LESS THAN (UNIX_TIMESTAMP('2027-08-01 00:00:00')),
+    PARTITION p202708 VALUES LESS THAN (UNIX_TIMESTAMP('2027-09-01 00:00:00')),
+    PARTITION p202709 VALUES LESS THAN (UNIX_TIMESTAMP('2027-10-01 00:00:00')),
+    PARTITION p202710 VALUES LESS THAN (UNIX_TIMESTAMP('2027-11-01 00:00:00')),
+    PARTITION p202711 VALUES LESS THAN (UNIX_TIMESTAMP('2027-12-01 00:00:00')),
+    PARTITION p202712 VALUES LESS THAN (UNIX_TIMESTAMP('2028-01-01 00:00:00')),
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+  );